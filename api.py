@@ -0,0 +1,438 @@
+import argparse
+import json
+import re
+import sqlite3
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from backup import start_persistence
+from db import ensure_latest_schema
+from fishlink import (
+    DELIVERY_METHODS,
+    FISH_CONDITIONS,
+    TIME_SLOTS,
+    RequestStatus,
+    local_today,
+    slot_date,
+    slot_is_full,
+    window_is_full,
+    windows_for_slot,
+)
+from metrics import render_text
+from repo import (
+    events_since,
+    get_listing,
+    get_request,
+    get_requests,
+    get_restaurant,
+    get_review_by_request,
+    list_listing_slot_usage,
+    list_listings,
+    list_request_events,
+    list_requests,
+    list_slot_usage,
+    listings_version,
+    requests_version,
+)
+from ui_data import listing_delivery_methods, listing_time_slots
+from writer import bulk_update_request_status, create_request, create_review
+
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _to_json(value):
+    if hasattr(value, "keys"):
+        return dict(value)
+    if hasattr(value, "__dataclass_fields__"):
+        return {name: getattr(value, name) for name in value.__dataclass_fields__}
+    return value
+
+
+def _int_param(query, name, default=None):
+    values = query.get(name)
+    if not values:
+        return default
+    try:
+        return int(values[0])
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer") from None
+
+
+def _page(query):
+    limit = _int_param(query, "limit", DEFAULT_PAGE_SIZE)
+    offset = _int_param(query, "offset", 0)
+    if limit < 1 or limit > MAX_PAGE_SIZE or offset < 0:
+        raise ApiError(
+            HTTPStatus.BAD_REQUEST,
+            f"limit must be 1-{MAX_PAGE_SIZE} and offset non-negative",
+        )
+    return limit, offset
+
+
+def _paged_body(items, limit, offset):
+    return {
+        "items": items,
+        "limit": limit,
+        "offset": offset,
+        "next_offset": offset + limit if len(items) == limit else None,
+    }
+
+
+def _status(value):
+    try:
+        return RequestStatus(value).value
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"unknown status: {value}") from None
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _bad_request(message):
+    return ApiError(HTTPStatus.BAD_REQUEST, message)
+
+
+def _validate_new_request(body):
+    if not _is_int(body["listing_id"]) or not _is_int(body["restaurant_id"]):
+        raise _bad_request("listing_id and restaurant_id must be integers")
+    listing = get_listing(body["listing_id"])
+    if listing is None or listing.expired_at is not None:
+        raise _bad_request("listing not found")
+    if get_restaurant(body["restaurant_id"]) is None:
+        raise _bad_request("restaurant not found")
+    quantity_kg = body["quantity_kg"]
+    if not (_is_int(quantity_kg) or isinstance(quantity_kg, float)):
+        raise _bad_request("quantity_kg must be a number")
+    if quantity_kg <= 0:
+        raise _bad_request("quantity_kg must be greater than 0")
+    time_slot = body["time_slot"]
+    if time_slot not in TIME_SLOTS:
+        raise _bad_request(f"time_slot must be one of: {', '.join(TIME_SLOTS)}")
+    if time_slot not in listing_time_slots(listing):
+        raise _bad_request(f"listing does not offer {time_slot}")
+    fish_condition = body["fish_condition"]
+    if fish_condition not in FISH_CONDITIONS:
+        raise _bad_request(
+            f"fish_condition must be one of: {', '.join(FISH_CONDITIONS)}"
+        )
+    if not (listing.allow_live if fish_condition == "Live" else listing.allow_fresh):
+        raise _bad_request(f"listing does not offer {fish_condition} fish")
+    delivery_method = body["delivery_method"]
+    if delivery_method not in DELIVERY_METHODS:
+        raise _bad_request(
+            f"delivery_method must be one of: {', '.join(DELIVERY_METHODS)}"
+        )
+    if delivery_method not in listing_delivery_methods(listing):
+        raise _bad_request(f"listing does not offer {delivery_method}")
+    windows = windows_for_slot(time_slot)
+    window = body.get("preferred_time_window") or windows[-1]
+    if window not in windows:
+        raise _bad_request(
+            f"preferred_time_window must be one of: {', '.join(windows)}"
+        )
+    today = local_today()
+    day = slot_date(time_slot, today)
+    usage = list_slot_usage(listing.farm_id, [day])
+    if slot_is_full(
+        usage,
+        list_listing_slot_usage(listing.id, [day]),
+        today,
+        time_slot,
+        listing.quantity_kg,
+    ):
+        raise _bad_request(f"{time_slot} is full")
+    if window_is_full(usage, today, time_slot, window):
+        raise _bad_request(f"{time_slot} {window} is full")
+    return window
+
+
+class FishLinkApiHandler(BaseHTTPRequestHandler):
+    server_version = "FishLinkAPI/1.0"
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        for route_method, pattern, handler in ROUTES:
+            if route_method != method:
+                continue
+            match = pattern.fullmatch(url.path.rstrip("/") or "/")
+            if match is None:
+                continue
+            try:
+                handler(self, query, *match.groups())
+            except ApiError as exc:
+                self._send_json(exc.status, {"error": exc.message})
+            except sqlite3.IntegrityError as exc:
+                self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(exc)})
+            except (TypeError, ValueError, AttributeError) as exc:
+                self._send_json(
+                    HTTPStatus.BAD_REQUEST,
+                    {"error": f"invalid request: {exc}"},
+                )
+            except Exception as exc:
+                self.log_error("%s %s failed: %r", method, url.path, exc)
+                self._send_json(
+                    HTTPStatus.INTERNAL_SERVER_ERROR,
+                    {"error": "internal error"},
+                )
+            return
+        self._send_json(HTTPStatus.NOT_FOUND, {"error": "not found"})
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "invalid JSON body") from None
+
+    def _send_json(self, status, body, etag=None):
+        payload = json.dumps(body, default=_to_json).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_text(self, status, text, content_type):
+        payload = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _not_modified(self, etag):
+        if self.headers.get("If-None-Match") != etag:
+            return False
+        self.send_response(HTTPStatus.NOT_MODIFIED)
+        self.send_header("ETag", etag)
+        self.end_headers()
+        return True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def get_metrics(self, query):
+        self._send_text(
+            HTTPStatus.OK,
+            render_text(),
+            "text/plain; version=0.0.4; charset=utf-8",
+        )
+
+    def get_listings(self, query):
+        limit, offset = _page(query)
+        etag = f'W/"listings-{listings_version()}-{limit}-{offset}"'
+        if self._not_modified(etag):
+            return
+        items = list_listings(limit=limit, offset=offset)
+        self._send_json(HTTPStatus.OK, _paged_body(items, limit, offset), etag)
+
+    def get_listing(self, query, listing_id):
+        listing = get_listing(int(listing_id))
+        if listing is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, "listing not found")
+        self._send_json(HTTPStatus.OK, listing)
+
+    def get_requests(self, query):
+        etag = f'W/"requests-{requests_version()}-{urlsplit(self.path).query}"'
+        if self._not_modified(etag):
+            return
+        if "ids" in query:
+            try:
+                ids = [int(value) for value in query["ids"][0].split(",") if value]
+            except ValueError:
+                raise ApiError(HTTPStatus.BAD_REQUEST, "ids must be integers") from None
+            if len(ids) > MAX_PAGE_SIZE:
+                raise ApiError(HTTPStatus.BAD_REQUEST, "too many ids")
+            self._send_json(HTTPStatus.OK, {"items": get_requests(ids)}, etag)
+            return
+        limit, offset = _page(query)
+        statuses = None
+        if "status" in query:
+            statuses = [_status(value) for value in query["status"][0].split(",")]
+        items = list_requests(
+            restaurant_id=_int_param(query, "restaurant_id"),
+            farm_id=_int_param(query, "farm_id"),
+            statuses=statuses,
+            limit=limit,
+            offset=offset,
+        )
+        self._send_json(HTTPStatus.OK, _paged_body(items, limit, offset), etag)
+
+    def get_request(self, query, request_id):
+        request = get_request(int(request_id))
+        if request is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, "request not found")
+        self._send_json(HTTPStatus.OK, request)
+
+    def get_request_events(self, query, request_id):
+        self._send_json(
+            HTTPStatus.OK,
+            {"items": list_request_events(int(request_id))},
+        )
+
+    def get_events(self, query):
+        limit, _ = _page(query)
+        items = events_since(_int_param(query, "since", 0), limit=limit)
+        self._send_json(HTTPStatus.OK, {"items": items})
+
+    def post_request(self, query):
+        body = self._read_json()
+        missing = [
+            name
+            for name in (
+                "listing_id",
+                "restaurant_id",
+                "quantity_kg",
+                "fish_condition",
+                "time_slot",
+                "delivery_method",
+            )
+            if name not in body
+        ]
+        if missing:
+            raise ApiError(
+                HTTPStatus.BAD_REQUEST,
+                f"missing fields: {', '.join(missing)}",
+            )
+        preferred_time_window = _validate_new_request(body)
+        request_id = create_request(
+            body["listing_id"],
+            body["restaurant_id"],
+            body["quantity_kg"],
+            body.get("preferred_size"),
+            body["fish_condition"],
+            body["time_slot"],
+            preferred_time_window,
+            body["delivery_method"],
+            body.get("notes"),
+        )
+        self._send_json(HTTPStatus.CREATED, get_request(request_id))
+
+    def post_request_status(self, query, request_id):
+        body = self._read_json()
+        result = bulk_update_request_status(
+            [int(request_id)],
+            _status(body.get("status")),
+        )[0]
+        if not result.ok:
+            status = (
+                HTTPStatus.NOT_FOUND
+                if result.error == "request not found"
+                else HTTPStatus.CONFLICT
+            )
+            raise ApiError(status, result.error)
+        self._send_json(HTTPStatus.OK, get_request(int(request_id)))
+
+    def post_requests_status(self, query):
+        body = self._read_json()
+        ids = body.get("ids")
+        if not isinstance(ids, list) or len(ids) > MAX_PAGE_SIZE:
+            raise ApiError(
+                HTTPStatus.BAD_REQUEST,
+                f"ids must be a list of at most {MAX_PAGE_SIZE} request ids",
+            )
+        if not all(_is_int(value) for value in ids):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "ids must be integers")
+        results = bulk_update_request_status(ids, _status(body.get("status")))
+        self._send_json(HTTPStatus.OK, {"results": results})
+
+    def get_review(self, query):
+        request_id = _int_param(query, "request_id")
+        if request_id is None:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "request_id is required")
+        review = get_review_by_request(request_id)
+        if review is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, "review not found")
+        self._send_json(HTTPStatus.OK, review)
+
+    def post_review(self, query):
+        body = self._read_json()
+        request = get_request(body.get("request_id"))
+        if request is None:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "request not found")
+        if request.status != RequestStatus.COMPLETED.value:
+            raise ApiError(HTTPStatus.CONFLICT, "request is not completed")
+        if get_review_by_request(request.id) is not None:
+            raise ApiError(HTTPStatus.CONFLICT, "request already reviewed")
+        listing = get_listing(request.listing_id)
+        review_id = create_review(
+            request.id,
+            listing.farm_id,
+            request.restaurant_id,
+            body.get("stars"),
+            (body.get("comment") or "").strip(),
+        )
+        self._send_json(HTTPStatus.CREATED, {"id": review_id})
+
+
+ROUTES = [
+    ("GET", re.compile(r"/metrics"), FishLinkApiHandler.get_metrics),
+    ("GET", re.compile(r"/listings"), FishLinkApiHandler.get_listings),
+    ("GET", re.compile(r"/listings/(\d+)"), FishLinkApiHandler.get_listing),
+    ("GET", re.compile(r"/requests"), FishLinkApiHandler.get_requests),
+    ("GET", re.compile(r"/requests/(\d+)"), FishLinkApiHandler.get_request),
+    (
+        "GET",
+        re.compile(r"/requests/(\d+)/events"),
+        FishLinkApiHandler.get_request_events,
+    ),
+    ("GET", re.compile(r"/events"), FishLinkApiHandler.get_events),
+    ("GET", re.compile(r"/reviews"), FishLinkApiHandler.get_review),
+    ("POST", re.compile(r"/requests"), FishLinkApiHandler.post_request),
+    ("POST", re.compile(r"/requests/status"), FishLinkApiHandler.post_requests_status),
+    (
+        "POST",
+        re.compile(r"/requests/(\d+)/status"),
+        FishLinkApiHandler.post_request_status,
+    ),
+    ("POST", re.compile(r"/reviews"), FishLinkApiHandler.post_review),
+]
+
+
+def make_server(host="127.0.0.1", port=8502, verbose=False):
+    server = ThreadingHTTPServer((host, port), FishLinkApiHandler)
+    server.verbose = verbose
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FishLink JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    start_persistence()
+    ensure_latest_schema()
+    server = make_server(args.host, args.port, args.verbose)
+    print(f"FishLink API listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,73 @@
-import math
+import os
 import re
-from datetime import datetime, timezone
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 from urllib.parse import quote
 
 import streamlit as st
 
+from backup import start_persistence
 from db import ensure_latest_schema
+from export import FORMATS, export
 from fishlink import (
+    DELIVERY_METHODS,
+    FISH_CONDITIONS,
+    TIME_SLOTS,
     FarmerListing,
     Request,
     RequestStatus,
     _ALLOWED_TRANSITIONS,
+    haversine_km,
+    local_today,
+    slot_date,
+    slot_is_full,
+    window_is_full,
+    windows_for_slot,
 )
+from metrics import RERUN_SECONDS, start_textfile_writer, touch_session
 from repo import (
+    EXPORT_ENTITIES,
     avg_rating_for_farm,
+    count_requests_since,
     create_farm,
-    create_listing,
-    create_review,
     get_farm,
     get_listing,
     get_review_by_request,
-    list_listings,
+    latest_request_id,
+    list_daily_sales,
+    list_farms,
+    list_listing_slot_usage,
+    list_ready_deliveries,
+    list_request_history,
     list_requests,
-    update_request_status,
-    create_request,
+    list_requests_columns,
+    list_restaurants,
+    list_slot_usage,
+    ranked_listing_ids,
+    rollover_listings,
     get_restaurant,
+)
+from quotes import invalidate_restaurant_quotes, quote_listing_fees
+from ranking import (
+    refresh_all_scores,
+    refresh_scores_for_restaurant,
+)
+from routing import plan_delivery_runs
+from tracing import current_trace, section, start_trace, stop_trace
+from ui_data import build_listing_cards
+from writer import (
+    bulk_update_request_status,
+    create_listing,
+    create_request,
+    create_review,
+    update_request_status,
     upsert_restaurant,
 )
 
+start_persistence()
 ensure_latest_schema()
 
 TRANSLATIONS = {
@@ -39,6 +78,8 @@ TRANSLATIONS = {
         "nav.operations_monitor": "Operations Monitor",
         "nav.farmer_listing": "Farmer Listing",
         "nav.farmer_actions": "Farmer Accept / Reject / Ready (Farmer)",
+        "nav.delivery_runs": "Delivery runs",
+        "nav.sales": "Sales",
         "nav.monitor": "Monitor",
         "btn.switch_role": "Switch role",
         "btn.reset_ui": "Reset UI",
@@ -51,12 +92,15 @@ TRANSLATIONS = {
         "btn.start_preparing": "Start Preparing",
         "btn.ready": "Ready",
         "btn.complete": "Complete",
+        "btn.bulk_all": "{action} all ({count})",
         "btn.submit_request": "Submit request",
         "btn.open_farm_map": "Open farm map",
         "btn.open_restaurant_map": "Open restaurant map",
         "btn.open_google_maps": "Open in Google Maps",
         "btn.leave_review": "Leave a review",
         "btn.submit_review": "Submit review",
+        "btn.prepare_export": "Prepare export",
+        "btn.download": "Download",
         "lbl.restaurant": "Restaurant",
         "lbl.farm": "Farm",
         "lbl.address": "Address",
@@ -98,6 +142,7 @@ TRANSLATIONS = {
         ),
         "sort.default": "Default",
         "sort.distance_if_available": "Distance (if available)",
+        "sort.recommended": "Recommended",
         "opt.delivery": "Delivery",
         "opt.pickup": "Pickup",
         "opt.today_morning": "Today Morning",
@@ -127,6 +172,25 @@ TRANSLATIONS = {
             "Request sent. Check status in ‘Request Status’."
         ),
         "msg.review_submitted": "Review submitted.",
+        "msg.new_requests": "New requests: {count}",
+        "lbl.your_farm": "Your farm",
+        "lbl.your_restaurant": "Your restaurant",
+        "lbl.table_view": "Table view",
+        "lbl.include_archived": "Include archived",
+        "lbl.export": "Export",
+        "lbl.period_days": "Last N days",
+        "lbl.date": "Date",
+        "lbl.revenue": "Revenue",
+        "lbl.orders": "Orders",
+        "lbl.median_lead_hours": "Median lead time (h)",
+        "msg.no_sales": "No completed orders in this period.",
+        "msg.export_ready": "{count} rows ready.",
+        "lbl.delivery_fee": "Delivery fee",
+        "msg.slots_full": "All time slots for this farm are full.",
+        "lbl.stops": "Stops",
+        "msg.no_delivery_runs": "No Ready delivery requests.",
+        "opt.new_restaurant": "New restaurant",
+        "msg.select_farm": "Select your farm in the sidebar to see its requests.",
     },
     "km": {
         "nav.restaurant_settings": "ការកំណត់ភោជនីយដ្ឋាន",
@@ -135,6 +199,8 @@ TRANSLATIONS = {
         "nav.operations_monitor": "ផ្ទាំងត្រួតពិនិត្យប្រតិបត្តិការ",
         "nav.farmer_listing": "ការបង្ហោះរបស់កសិករ",
         "nav.farmer_actions": "ការទទួល / បដិសេធ / រួចរាល់ (កសិករ)",
+        "nav.delivery_runs": "ជុំដឹកជញ្ជូន",
+        "nav.sales": "ការលក់",
         "nav.monitor": "ត្រួតពិនិត្យ",
         "btn.switch_role": "ប្តូរតួនាទី",
         "btn.reset_ui": "កំណត់ឡើងវិញ UI",
@@ -147,12 +213,15 @@ TRANSLATIONS = {
         "btn.start_preparing": "ចាប់ផ្តើមរៀបចំ",
         "btn.ready": "រួចរាល់",
         "btn.complete": "បញ្ចប់",
+        "btn.bulk_all": "{action} ទាំងអស់ ({count})",
         "btn.submit_request": "ផ្ញើការបញ្ជាទិញ",
         "btn.open_farm_map": "បើកផែនទីកសិដ្ឋាន",
         "btn.open_restaurant_map": "បើកផែនទីភោជនីយដ្ឋាន",
         "btn.open_google_maps": "បើកក្នុង Google Maps",
         "btn.leave_review": "ទុកមតិយោបល់",
         "btn.submit_review": "ផ្ញើមតិយោបល់",
+        "btn.prepare_export": "រៀបចំការនាំចេញ",
+        "btn.download": "ទាញយក",
         "lbl.restaurant": "ភោជនីយដ្ឋាន",
         "lbl.farm": "កសិដ្ឋាន",
         "lbl.address": "អាសយដ្ឋាន",
@@ -190,6 +259,7 @@ TRANSLATIONS = {
         ),
         "sort.default": "លំនាំដើម",
         "sort.distance_if_available": "ចម្ងាយ (ប្រសិនបើមាន)",
+        "sort.recommended": "ណែនាំ",
         "opt.delivery": "ដឹកជញ្ជូន",
         "opt.pickup": "ទៅយក",
         "opt.today_morning": "ព្រឹកថ្ងៃនេះ",
@@ -221,6 +291,25 @@ TRANSLATIONS = {
             "“ស្ថានភាពការបញ្ជាទិញ”。"
         ),
         "msg.review_submitted": "បានផ្ញើមតិយោបល់។",
+        "msg.new_requests": "សំណើថ្មី: {count}",
+        "lbl.your_farm": "កសិដ្ឋានរបស់អ្នក",
+        "lbl.your_restaurant": "ភោជនីយដ្ឋានរបស់អ្នក",
+        "lbl.table_view": "ទិដ្ឋភាពតារាង",
+        "lbl.stops": "ចំណតឈប់",
+        "msg.no_delivery_runs": "មិនមានការបញ្ជាទិញដឹកជញ្ជូនដែលរួចរាល់ទេ។",
+        "lbl.period_days": "N ថ្ងៃចុងក្រោយ",
+        "lbl.date": "កាលបរិច្ឆេទ",
+        "lbl.revenue": "ចំណូល",
+        "lbl.orders": "ការបញ្ជាទិញ",
+        "lbl.median_lead_hours": "រយៈពេលរង់ចាំមេដ្យាន (ម៉ោង)",
+        "msg.no_sales": "មិនមានការបញ្ជាទិញដែលបានបញ្ចប់ក្នុងរយៈពេលនេះទេ។",
+        "lbl.export": "នាំចេញ",
+        "msg.export_ready": "{count} ជួររួចរាល់។",
+        "lbl.include_archived": "រួមបញ្ចូលទិន្នន័យបណ្ណសារ",
+        "opt.new_restaurant": "ភោជនីយដ្ឋានថ្មី",
+        "msg.select_farm": "សូមជ្រើសរើសកសិដ្ឋានរបស់អ្នកនៅរបារចំហៀង ដើម្បីមើលការបញ្ជាទិញរបស់វា។",
+        "msg.slots_full": "ពេលវេលាទាំងអស់សម្រាប់កសិដ្ឋាននេះពេញហើយ។",
+        "lbl.delivery_fee": "ថ្លៃដឹកជញ្ជូន",
     },
 }
 
@@ -272,25 +361,18 @@ def translate_fish_condition(value: str) -> str:
     return t(mapping.get(value, value))
 
 
-TIME_SLOTS = [
-    "Today Morning",
-    "Today Evening",
-    "Next-day Morning",
-    "Next-day Evening",
-]
-DELIVERY_METHODS = [
-    "Delivery",
-    "Pickup",
+FARMER_ACTIONABLE_STATUSES = [
+    RequestStatus.REQUESTED.value,
+    RequestStatus.ACCEPTED.value,
+    RequestStatus.PREPARING.value,
+    RequestStatus.READY.value,
 ]
-FISH_CONDITIONS = [
-    "Live",
-    "Chilled",
-    "Frozen",
+FARMER_BULK_ACTIONS = [
+    (RequestStatus.REQUESTED, RequestStatus.ACCEPTED, "btn.accept"),
+    (RequestStatus.ACCEPTED, RequestStatus.PREPARING, "btn.start_preparing"),
+    (RequestStatus.PREPARING, RequestStatus.READY, "btn.ready"),
+    (RequestStatus.READY, RequestStatus.COMPLETED, "btn.complete"),
 ]
-MORNING_WINDOWS = ["7–8", "8–9", "Any morning"]
-EVENING_WINDOWS = ["15–16", "16–17", "Any evening"]
-
-
 
 
 def ensure_state():
@@ -318,6 +400,47 @@ def ensure_state():
         st.session_state.request_submit_message = ""
     if "lang" not in st.session_state:
         st.session_state.lang = "English"
+    if "restaurant_id" not in st.session_state:
+        st.session_state.restaurant_id = None
+    if "farm_id" not in st.session_state:
+        st.session_state.farm_id = None
+    if "last_seen_request_ids" not in st.session_state:
+        st.session_state.last_seen_request_ids = {}
+
+
+@st.cache_data(show_spinner=False)
+def cached_restaurant(restaurant_id):
+    if restaurant_id is None:
+        return None
+    return get_restaurant(restaurant_id)
+
+
+def save_restaurant(name, location_text, lat, lng, maps_url, contact):
+    restaurant_id = upsert_restaurant(
+        name,
+        location_text,
+        lat,
+        lng,
+        maps_url,
+        contact,
+        restaurant_id=st.session_state.restaurant_id,
+    )
+    cached_restaurant.clear()
+    invalidate_restaurant_quotes(restaurant_id)
+    st.session_state.restaurant_id = restaurant_id
+    return restaurant_id
+
+
+def select_restaurant():
+    restaurant_id = st.session_state.restaurant_picker
+    st.session_state.restaurant_id = restaurant_id
+    restaurant = cached_restaurant(restaurant_id) or {}
+    st.session_state.restaurant_name = restaurant.get("name") or ""
+    st.session_state.restaurant_location_text = (
+        restaurant.get("location_text") or ""
+    )
+    st.session_state.restaurant_maps_url = restaurant.get("maps_url") or ""
+    st.session_state.restaurant_contact = restaurant.get("contact") or ""
 
 
 def reset_demo_data():
@@ -353,25 +476,23 @@ def parse_optional_float(text):
         return None
 
 
-def haversine_km(lat1, lng1, lat2, lng2):
-    radius_km = 6371.0
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    delta_phi = math.radians(lat2 - lat1)
-    delta_lambda = math.radians(lng2 - lng1)
-    a = (
-        math.sin(delta_phi / 2) ** 2
-        + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
-    )
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return radius_km * c
-
-
 def build_maps_search_url(text):
     query = quote(text)
     return f"https://www.google.com/maps/search/?api=1&query={query}"
 
 
+def build_maps_route_url(depot, stops):
+    points = [f"{lat},{lng}" for lat, lng in stops]
+    url = (
+        "https://www.google.com/maps/dir/?api=1"
+        f"&origin={depot[0]},{depot[1]}"
+        f"&destination={points[-1]}"
+    )
+    if len(points) > 1:
+        url += f"&waypoints={quote('|'.join(points[:-1]))}"
+    return url
+
+
 def format_status_badge(status):
     color_map = {
         RequestStatus.REQUESTED.value: "#d97706",
@@ -401,55 +522,37 @@ def format_cambodia_time(value):
         return value
 
 
+@st.cache_data(show_spinner=False)
+def rollover_listings_once(day):
+    result = rollover_listings(day)
+    if result["expired"] or result["rolled"]:
+        refresh_all_scores()
+    return result
 
 
 def build_listings_for_ui():
-    listings = []
-    for listing in list_listings():
-        farm = get_farm(listing["farm_id"])
-        if not farm:
-            continue
-        time_slots = []
-        if listing["slot_today_morning"]:
-            time_slots.append("Today Morning")
-        if listing["slot_today_evening"]:
-            time_slots.append("Today Evening")
-        if listing["slot_next_morning"]:
-            time_slots.append("Next-day Morning")
-        if listing["slot_next_evening"]:
-            time_slots.append("Next-day Evening")
-        delivery_methods = []
-        if listing["allow_delivery"]:
-            delivery_methods.append("Delivery")
-        if listing["allow_pickup"]:
-            delivery_methods.append("Pickup")
-        conditions = st.session_state.listing_conditions.get(listing["id"])
-        if conditions is None:
-            conditions = []
-            if listing["allow_live"]:
-                conditions.append("Live")
-            if listing["allow_fresh"]:
-                conditions.append("Chilled")
-        listings.append(
-            {
-                "id": listing["id"],
-                "farm_id": listing["farm_id"],
-                "name": farm["name"],
-                "farm_location_text": farm["location_text"],
-                "farm_lat": farm["lat"],
-                "farm_lng": farm["lng"],
-                "farm_maps_url": farm["maps_url"],
-                "farm_contact": farm.get("contact") or "",
-                "fish_name": listing["fish_name"],
-                "quantity_kg": listing["quantity_kg"],
-                "price_per_kg": listing["price_per_kg"],
-                "time_slots": time_slots,
-                "delivery_methods": delivery_methods,
-                "fish_conditions": conditions,
-                "approx_time": listing["approx_time"] or "",
-            }
-        )
-    return listings
+    rollover_listings_once(local_today())
+    return build_listing_cards(st.session_state.listing_conditions)
+
+
+NEW_REQUEST_POLL_SECONDS = 5
+
+
+def last_seen_request_id(farm_id):
+    seen = st.session_state.last_seen_request_ids
+    if farm_id not in seen:
+        seen[farm_id] = latest_request_id(farm_id=farm_id)
+    return seen[farm_id]
+
+
+@st.fragment(run_every=NEW_REQUEST_POLL_SECONDS)
+def render_new_request_badge():
+    farm_id = st.session_state.get("farm_id")
+    if farm_id is None:
+        return
+    count = count_requests_since(last_seen_request_id(farm_id), farm_id=farm_id)
+    if count:
+        st.info(t("msg.new_requests").format(count=count))
 
 
 def screen_farmer_listing(farmer_listings):
@@ -587,6 +690,18 @@ def render_farm_detail_inline(selected):
         st.write(f"{t('lbl.contact')}: {selected['farm_contact']}")
 
     st.subheader(t("btn.submit_request"))
+    today = local_today()
+    slot_dates = [slot_date("Today Morning", today), slot_date("Next-day Morning", today)]
+    usage = list_slot_usage(selected["farm_id"], slot_dates)
+    listing_usage = list_listing_slot_usage(selected["id"], slot_dates)
+    time_slots = [
+        slot
+        for slot in selected["time_slots"]
+        if not slot_is_full(usage, listing_usage, today, slot, selected["quantity_kg"])
+    ]
+    if not time_slots:
+        st.warning(t("msg.slots_full"))
+        return
     with st.form(f"create_request_{selected['id']}"):
         quantity_kg = st.number_input(
             t("lbl.quantity"),
@@ -607,19 +722,24 @@ def render_farm_detail_inline(selected):
         )
         time_slot = st.selectbox(
             t("lbl.time_slot"),
-            selected["time_slots"],
+            time_slots,
             key=f"time_slot_{selected['id']}",
             format_func=translate_time_slot,
         )
-        if "Morning" in time_slot:
-            window_options = MORNING_WINDOWS
-        else:
-            window_options = EVENING_WINDOWS
+        window_options = [
+            window
+            for window in windows_for_slot(time_slot)
+            if not window_is_full(usage, today, time_slot, window)
+        ]
         default_window = "Any morning" if "Morning" in time_slot else "Any evening"
         preferred_time_window = st.selectbox(
             t("lbl.preferred_window"),
             window_options,
-            index=window_options.index(default_window),
+            index=(
+                window_options.index(default_window)
+                if default_window in window_options
+                else 0
+            ),
             key=f"preferred_time_window_{selected['id']}",
             format_func=translate_preferred_window,
         )
@@ -637,16 +757,6 @@ def render_farm_detail_inline(selected):
 
     if submitted:
         st.toast("Submitting...")
-        restaurant = get_restaurant(1)
-        if restaurant is None:
-            upsert_restaurant(
-                st.session_state.restaurant_name,
-                st.session_state.restaurant_location_text,
-                None,
-                None,
-                st.session_state.restaurant_maps_url,
-                st.session_state.restaurant_contact.strip(),
-            )
         errors = []
         if quantity_kg <= 0:
             errors.append("Quantity must be greater than 0.")
@@ -660,6 +770,19 @@ def render_farm_detail_inline(selected):
             errors.append("Select a time slot.")
         if not delivery_method:
             errors.append("Select a delivery method.")
+        restaurant_id = st.session_state.restaurant_id
+        if restaurant_id is None:
+            if st.session_state.restaurant_name.strip():
+                restaurant_id = save_restaurant(
+                    st.session_state.restaurant_name,
+                    st.session_state.restaurant_location_text,
+                    None,
+                    None,
+                    st.session_state.restaurant_maps_url,
+                    st.session_state.restaurant_contact.strip(),
+                )
+            else:
+                errors.append(t("msg.restaurant_not_set"))
 
         if errors:
             st.error(" ".join(errors))
@@ -667,7 +790,7 @@ def render_farm_detail_inline(selected):
             try:
                 request_id = create_request(
                     selected["id"],
-                    1,
+                    restaurant_id,
                     quantity_kg,
                     preferred_size,
                     fish_condition,
@@ -694,10 +817,11 @@ def screen_todays_farms(farmer_listings):
     if not farmer_listings:
         st.write(t("msg.no_listings"))
         return
-    restaurant = get_restaurant(1)
+    restaurant = cached_restaurant(st.session_state.restaurant_id)
     restaurant_lat = restaurant.get("lat") if restaurant else None
     restaurant_lng = restaurant.get("lng") if restaurant else None
     restaurant_coords_missing = restaurant_lat is None or restaurant_lng is None
+    delivery_fees = quote_listing_fees(restaurant, farmer_listings)
 
     indexed_listings = list(enumerate(farmer_listings))
     distances = {}
@@ -727,6 +851,19 @@ def screen_todays_farms(farmer_listings):
                 unsortable.append((index, listing))
         sortable.sort(key=lambda item: item[0])
         ordered = [(index, listing) for _, index, listing in sortable] + unsortable
+    elif (
+        st.session_state.sort_option == "Recommended"
+        and st.session_state.restaurant_id is not None
+    ):
+        ranked_ids = ranked_listing_ids(st.session_state.restaurant_id)
+        if not ranked_ids:
+            refresh_scores_for_restaurant(st.session_state.restaurant_id)
+            ranked_ids = ranked_listing_ids(st.session_state.restaurant_id)
+        positions = {listing_id: rank for rank, listing_id in enumerate(ranked_ids)}
+        ordered = sorted(
+            indexed_listings,
+            key=lambda item: (positions.get(item[1]["id"], len(positions)), item[0]),
+        )
     else:
         ordered = indexed_listings
 
@@ -754,6 +891,9 @@ def screen_todays_farms(farmer_listings):
                 st.write(" / ".join(map(translate_delivery_method, listing["delivery_methods"])))
             if index in distances:
                 st.write(f"📏 {distances[index]:.1f} km")
+            delivery_fee = delivery_fees.get(listing["id"])
+            if delivery_fee is not None and "Delivery" in listing["delivery_methods"]:
+                st.write(f"🚚 {t('lbl.delivery_fee')}: ${delivery_fee:.2f}")
             if listing.get("farm_maps_url"):
                 st.link_button(t("btn.open_farm_map"), listing["farm_maps_url"])
             is_selected = st.session_state.selected_listing_id == listing["id"]
@@ -774,10 +914,44 @@ def screen_todays_farms(farmer_listings):
 
 def screen_farmer_actions(requests):
     st.header(t("nav.farmer_actions"))
-    requests = list_requests()
+    farm_id = st.session_state.farm_id
+    if farm_id is None:
+        st.write(t("msg.select_farm"))
+        return
+    farm = get_farm(farm_id)
+    requests = list_requests(
+        farm_id=farm_id,
+        statuses=FARMER_ACTIONABLE_STATUSES,
+    )
     if not requests:
         st.write("No requests yet.")
         return
+    st.session_state.last_seen_request_ids[farm_id] = max(
+        last_seen_request_id(farm_id),
+        max(request["id"] for request in requests),
+    )
+    bulk_columns = st.columns(len(FARMER_BULK_ACTIONS))
+    for column, (current, next_status, label_key) in zip(
+        bulk_columns,
+        FARMER_BULK_ACTIONS,
+    ):
+        request_ids = [
+            request["id"]
+            for request in requests
+            if request["status"] == current.value
+        ]
+        if not request_ids:
+            continue
+        label = t("btn.bulk_all").format(action=t(label_key), count=len(request_ids))
+        if column.button(label, key=f"bulk_{current.value}"):
+            results = bulk_update_request_status(request_ids, next_status.value)
+            failed = [result for result in results if not result.ok]
+            if failed:
+                st.error(
+                    " ".join(f"{result.request_id}: {result.error}" for result in failed)
+                )
+            else:
+                st.rerun()
 
     for request in requests:
         st.write(
@@ -787,9 +961,7 @@ def screen_farmer_actions(requests):
             f"{t('lbl.status')}: {format_status_badge(request['status'])}",
             unsafe_allow_html=True,
         )
-        restaurant = get_restaurant(1)
-        listing = get_listing(request["listing_id"])
-        farm = get_farm(listing["farm_id"]) if listing else None
+        restaurant = cached_restaurant(request["restaurant_id"])
         restaurant_name = restaurant.get("name") if restaurant else ""
         if restaurant_name:
             st.write(f"{t('lbl.restaurant')}: {restaurant_name}")
@@ -866,19 +1038,92 @@ def screen_farmer_actions(requests):
                     st.rerun()
                 except ValueError:
                     st.error("Unable to complete request.")
-        if request["status"] == RequestStatus.COMPLETED.value:
-            review = get_review_by_request(request["id"])
-            if review:
-                stars = "★" * review["stars"] + "☆" * (5 - review["stars"])
-                st.write(f"{t('lbl.review')}: {stars}")
-                if review.get("comment"):
-                    st.write(f"{t('lbl.comment')}: {review['comment']}")
         st.divider()
 
 
+def screen_delivery_runs():
+    st.header(t("nav.delivery_runs"))
+    farm_id = st.session_state.farm_id
+    if farm_id is None:
+        st.write(t("msg.select_farm"))
+        return
+    runs = plan_delivery_runs(list_ready_deliveries(farm_id=farm_id))
+    if not runs:
+        st.write(t("msg.no_delivery_runs"))
+        return
+    for run in runs:
+        stops = run.stops + run.unlocated
+        st.subheader(
+            f"{translate_time_slot(run.time_slot)} · {t('lbl.stops')}: {len(stops)}"
+        )
+        if run.depot and run.stops:
+            st.write(f"📏 {run.distance_km:.1f} km")
+        for position, stop in enumerate(stops, start=1):
+            st.write(
+                f"{position}. {stop.restaurant_name or t('msg.restaurant_not_set')}"
+                f" — {stop.restaurant_location_text or ''}"
+                f" · {stop.fish_name or 'Fish'}"
+                f" {format_quantity_kg(stop.quantity_kg)} kg"
+                f" (Request {stop.request_id})"
+            )
+        if run.depot and run.stops:
+            st.link_button(
+                t("btn.open_google_maps"),
+                build_maps_route_url(
+                    run.depot,
+                    [(stop.restaurant_lat, stop.restaurant_lng) for stop in run.stops],
+                ),
+            )
+        st.divider()
+
+
+def screen_sales():
+    st.header(t("nav.sales"))
+    farm_id = st.session_state.farm_id
+    if farm_id is None:
+        st.write(t("msg.select_farm"))
+        return
+    days = st.selectbox(t("lbl.period_days"), [7, 30, 90], key="sales_days")
+    sales = list_daily_sales(
+        farm_id=farm_id,
+        since=local_today() - timedelta(days=days - 1),
+    )
+    if not sales:
+        st.write(t("msg.no_sales"))
+        return
+    kg_column, revenue_column, orders_column = st.columns(3)
+    kg_column.metric("kg", format_quantity_kg(sum(day.kg for day in sales)))
+    revenue_column.metric(t("lbl.revenue"), f"{sum(day.revenue for day in sales):.2f}")
+    orders_column.metric(t("lbl.orders"), sum(day.order_count for day in sales))
+    st.dataframe(
+        [
+            {
+                t("lbl.date"): day.sale_date,
+                "kg": day.kg,
+                t("lbl.revenue"): round(day.revenue, 2),
+                t("lbl.orders"): day.order_count,
+                t("lbl.median_lead_hours"): (
+                    None
+                    if day.median_lead_minutes is None
+                    else round(day.median_lead_minutes / 60, 1)
+                ),
+            }
+            for day in reversed(sales)
+        ],
+        hide_index=True,
+    )
+
+
 def screen_request_status(requests):
     st.header(t("nav.request_status"))
-    requests = list_requests(restaurant_id=1)
+    restaurant_id = st.session_state.restaurant_id
+    if restaurant_id is None:
+        st.write(t("msg.restaurant_not_set"))
+        return
+    if st.toggle(t("lbl.include_archived"), key="request_history"):
+        requests = list_request_history(restaurant_id=restaurant_id)
+    else:
+        requests = list_requests(restaurant_id=restaurant_id)
     if not requests:
         st.write("No requests yet.")
         return
@@ -983,7 +1228,7 @@ def screen_request_status(requests):
                             create_review(
                                 request["id"],
                                 farm_id,
-                                1,
+                                restaurant_id,
                                 stars,
                                 comment.strip(),
                             )
@@ -992,9 +1237,60 @@ def screen_request_status(requests):
                 st.divider()
 
 
+def render_export():
+    with st.expander(t("lbl.export")):
+        entity = st.selectbox(
+            t("lbl.export"),
+            list(EXPORT_ENTITIES),
+            key="export_entity",
+        )
+        fmt = st.radio("Format", FORMATS, key="export_format", horizontal=True)
+        statuses = None
+        include_archived = False
+        if entity == "requests":
+            statuses = st.multiselect(
+                t("lbl.status"),
+                [status.value for status in RequestStatus],
+                key="export_statuses",
+            ) or None
+            include_archived = st.checkbox(
+                t("lbl.include_archived"),
+                key="export_include_archived",
+            )
+        farm_id = (
+            st.session_state.farm_id if st.session_state.role == "Farmer" else None
+        )
+        if st.button(t("btn.prepare_export")):
+            # Stream rows to a temp file and keep only its path in the session.
+            previous = st.session_state.get("export_file")
+            if previous and os.path.exists(previous[1]):
+                os.remove(previous[1])
+            fd, path = tempfile.mkstemp(prefix="fishlink-export-", suffix=f".{fmt}")
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as handle:
+                count = export(
+                    entity,
+                    handle,
+                    fmt,
+                    statuses=statuses,
+                    farm_id=farm_id,
+                    include_archived=include_archived,
+                )
+            st.session_state.export_file = (f"fishlink-{entity}.{fmt}", path, count)
+        export_file = st.session_state.get("export_file")
+        if export_file and os.path.exists(export_file[1]):
+            file_name, path, count = export_file
+            st.caption(t("msg.export_ready").format(count=count))
+            with open(path, "rb") as handle:
+                st.download_button(t("btn.download"), handle, file_name=file_name)
+
+
 def screen_monitor():
     st.header(t("nav.operations_monitor"))
     st.write(t("msg.operations_monitor_desc"))
+    render_export()
+    if st.toggle(t("lbl.table_view"), key="monitor_table_view"):
+        st.dataframe(list_requests_columns(), hide_index=True)
+        return
     requests = list_requests()
     if not requests:
         st.write("No requests yet.")
@@ -1002,7 +1298,7 @@ def screen_monitor():
     for request in requests:
         listing = get_listing(request["listing_id"])
         farm = get_farm(listing["farm_id"]) if listing else None
-        restaurant = get_restaurant(1)
+        restaurant = cached_restaurant(request["restaurant_id"])
         with st.container():
             st.markdown(
                 f"{t('lbl.status')}: {format_status_badge(request['status'])}",
@@ -1077,10 +1373,10 @@ def screen_restaurant_settings():
         if not name.strip() or not location_text.strip():
             st.error("Restaurant name and address are required.")
             return
-        existing = get_restaurant(1)
+        existing = cached_restaurant(st.session_state.restaurant_id)
         existing_lat = existing.get("lat") if existing else None
         existing_lng = existing.get("lng") if existing else None
-        upsert_restaurant(
+        save_restaurant(
             name,
             location_text,
             existing_lat,
@@ -1091,7 +1387,50 @@ def screen_restaurant_settings():
         st.success("Restaurant settings saved.")
 
 
+DEBUG_ENV_VAR = "FISHLINK_DEBUG"
+
+
+def render_debug_panel(trace):
+    summary = trace.summary()
+    with st.sidebar.expander("Debug: this rerun", expanded=True):
+        st.write(
+            f"Queries: {summary['query_count']} · "
+            f"DB time: {summary['db_seconds'] * 1000:.1f} ms · "
+            f"Total: {summary['total_seconds'] * 1000:.1f} ms"
+        )
+        st.caption("Screens")
+        for name, seconds in summary["sections"]:
+            st.write(f"{name}: {seconds * 1000:.1f} ms")
+        st.caption("Repo calls")
+        for name, count, seconds in summary["calls_by_function"]:
+            st.write(f"{name} ×{count}: {seconds * 1000:.1f} ms")
+        st.caption("Slowest statements")
+        for name, sql, seconds in summary["slowest_statements"]:
+            st.write(f"{seconds * 1000:.2f} ms · {name}")
+            st.code(sql, language="sql")
+
+
 def main():
+    start_textfile_writer()
+    if "metrics_session_id" not in st.session_state:
+        st.session_state.metrics_session_id = uuid.uuid4().hex
+    touch_session(st.session_state.metrics_session_id)
+    trace = None
+    if st.session_state.get("debug_trace") or os.environ.get(DEBUG_ENV_VAR):
+        trace = start_trace()
+    started = time.perf_counter()
+    try:
+        run_app()
+    finally:
+        RERUN_SECONDS.observe(
+            time.perf_counter() - started,
+            st.session_state.get("nav") or "role_select",
+        )
+        if trace is not None:
+            stop_trace()
+
+
+def run_app():
     st.title("FishLink MVP")
     ensure_state()
     st.sidebar.selectbox("Language", ["English", "ខ្មែរ"], key="lang")
@@ -1108,6 +1447,8 @@ def main():
         screens = [
             "nav.farmer_listing",
             "nav.farmer_actions",
+            "nav.delivery_runs",
+            "nav.sales",
             "nav.operations_monitor",
         ]
     else:
@@ -1128,44 +1469,92 @@ def main():
     )
     if st.sidebar.button(t("btn.switch_role")):
         st.session_state.role = None
+        st.session_state.farm_id = None
         st.session_state.pop("nav", None)
         st.rerun()
+    if st.session_state.role == "Farmer":
+        farms = list_farms()
+        farm_names = {farm["id"]: farm["name"] for farm in farms}
+        farm_options = [None] + list(farm_names)
+        if st.session_state.farm_id not in farm_options:
+            st.session_state.farm_id = None
+        st.sidebar.selectbox(
+            t("lbl.your_farm"),
+            farm_options,
+            key="farm_id",
+            format_func=lambda value: (
+                "—" if value is None else f"{farm_names[value]} [{value}]"
+            ),
+        )
     if st.session_state.role == "Restaurant":
+        restaurant_names = {
+            restaurant["id"]: restaurant["name"]
+            for restaurant in list_restaurants()
+        }
+        restaurant_options = [None] + list(restaurant_names)
+        if st.session_state.restaurant_id not in restaurant_options:
+            st.session_state.restaurant_id = None
+        if st.session_state.get("restaurant_picker") != st.session_state.restaurant_id:
+            st.session_state.restaurant_picker = st.session_state.restaurant_id
+        st.sidebar.selectbox(
+            t("lbl.your_restaurant"),
+            restaurant_options,
+            key="restaurant_picker",
+            on_change=select_restaurant,
+            format_func=lambda value: (
+                t("opt.new_restaurant")
+                if value is None
+                else f"{restaurant_names[value]} [{value}]"
+            ),
+        )
         st.sidebar.markdown("### Sort")
         st.sidebar.selectbox(
             "Sort Today’s Farms",
-            ["Default", "Distance (if available)"],
+            ["Default", "Distance (if available)", "Recommended"],
             key="sort_option",
-            format_func=lambda value: (
-                t("sort.default")
-                if value == "Default"
-                else t("sort.distance_if_available")
-            ),
+            format_func=lambda value: {
+                "Default": t("sort.default"),
+                "Distance (if available)": t("sort.distance_if_available"),
+                "Recommended": t("sort.recommended"),
+            }[value],
         )
-    farmer_listings = build_listings_for_ui()
+    with section("build_listings_for_ui"):
+        farmer_listings = build_listings_for_ui()
     st.session_state.listings = farmer_listings
     if st.session_state.demo_reset_message:
         st.sidebar.success("UI state reset.")
         st.session_state.demo_reset_message = False
 
-    if selection == "nav.farmer_listing":
-        screen_farmer_listing(farmer_listings)
-    elif selection == "nav.restaurant_settings":
-        screen_restaurant_settings()
-    elif selection == "nav.todays_farms":
-        screen_todays_farms(farmer_listings)
-    elif selection == "nav.farmer_actions":
-        screen_farmer_actions(None)
-    elif selection == "nav.request_status":
-        screen_request_status(None)
-    elif selection == "nav.operations_monitor":
-        screen_monitor()
+    with section(selection):
+        if selection == "nav.farmer_listing":
+            screen_farmer_listing(farmer_listings)
+        elif selection == "nav.restaurant_settings":
+            screen_restaurant_settings()
+        elif selection == "nav.todays_farms":
+            screen_todays_farms(farmer_listings)
+        elif selection == "nav.farmer_actions":
+            screen_farmer_actions(None)
+        elif selection == "nav.delivery_runs":
+            screen_delivery_runs()
+        elif selection == "nav.sales":
+            screen_sales()
+        elif selection == "nav.request_status":
+            screen_request_status(None)
+        elif selection == "nav.operations_monitor":
+            screen_monitor()
 
+    if st.session_state.role == "Farmer":
+        with st.sidebar:
+            render_new_request_badge()
     st.sidebar.markdown("---")
     if st.sidebar.button(t("btn.reset_ui")):
         reset_demo_data()
         st.rerun()
     st.sidebar.caption("Does not delete database records.")
+    st.sidebar.toggle("Debug panel", key="debug_trace")
+    trace = current_trace()
+    if trace is not None:
+        render_debug_panel(trace)
 
 
 if __name__ == "__main__":
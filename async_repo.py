@@ -0,0 +1,95 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import repo
+from db import pin_thread_connection
+
+
+DEFAULT_MAX_WORKERS = 8
+ASYNC_FUNCTIONS = (
+    "avg_rating_for_farm",
+    "bulk_update_request_status",
+    "count_requests_since",
+    "create_farm",
+    "create_listing",
+    "create_request",
+    "create_review",
+    "events_since",
+    "get_archived_request",
+    "get_farm",
+    "get_listing",
+    "get_request",
+    "get_restaurant",
+    "get_review_by_request",
+    "latest_request_id",
+    "list_daily_sales",
+    "list_farms",
+    "list_listing_slot_usage",
+    "list_listings",
+    "list_listings_columns",
+    "list_ready_deliveries",
+    "list_request_history",
+    "list_request_events",
+    "list_requests",
+    "list_requests_columns",
+    "list_requests_since",
+    "list_restaurants",
+    "list_slot_usage",
+    "ranked_listing_ids",
+    "update_request_status",
+    "upsert_restaurant",
+)
+
+
+class AsyncRepo:
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        self._connections = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="fishlink-db",
+            initializer=self._init_worker,
+        )
+
+    def _init_worker(self):
+        conn = pin_thread_connection()
+        with self._lock:
+            self._connections.append(conn)
+
+    async def run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            functools.partial(func, *args, **kwargs),
+        )
+
+    async def gather(self, *calls):
+        return await asyncio.gather(
+            *(getattr(self, name)(*args) for name, *args in calls)
+        )
+
+    def __getattr__(self, name):
+        if name not in ASYNC_FUNCTIONS:
+            raise AttributeError(name)
+        func = getattr(repo, name)
+
+        async def call(*args, **kwargs):
+            return await self.run(func, *args, **kwargs)
+
+        call.__name__ = name
+        return call
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
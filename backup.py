@@ -0,0 +1,259 @@
+import argparse
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from db import connect, ensure_latest_schema, is_memory_db
+
+
+BACKUP_DIR = "backups"
+BACKUP_PREFIX = "fishlink-"
+PAGES_PER_STEP = 1024
+STEP_SLEEP_SECONDS = 0.005
+DEFAULT_RETENTION = 7
+DEFAULT_INTERVAL_SECONDS = 3600
+MAX_RESTARTS = 3
+PERSIST_ENV_VAR = "FISHLINK_PERSIST_PATH"
+PERSIST_INTERVAL_ENV_VAR = "FISHLINK_PERSIST_INTERVAL"
+DEFAULT_PERSIST_INTERVAL_SECONDS = 60
+
+
+class BackupError(Exception):
+    pass
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def check_integrity(path, quick=False):
+    pragma = "quick_check" if quick else "integrity_check"
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        problems = [row[0] for row in conn.execute(f"PRAGMA {pragma}").fetchall()]
+    except sqlite3.DatabaseError as exc:
+        problems = [str(exc)]
+    finally:
+        conn.close()
+    if problems != ["ok"]:
+        raise BackupError(f"{path} failed {pragma}: {'; '.join(problems[:5])}")
+
+
+def _copy(source, dest, pages, sleep, max_restarts, progress):
+    state = {"remaining": None, "restarts": 0}
+
+    def on_step(status, remaining, total):
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+            if state["restarts"] > max_restarts:
+                raise _TooManyRestarts()
+        state["remaining"] = remaining
+        if progress is not None:
+            progress(status, remaining, total)
+
+    try:
+        source.backup(dest, pages=pages, progress=on_step, sleep=sleep)
+    except _TooManyRestarts:
+        source.backup(dest, pages=-1, progress=progress)
+
+
+def backup_database(
+    dest_path,
+    pages=PAGES_PER_STEP,
+    sleep=STEP_SLEEP_SECONDS,
+    max_restarts=MAX_RESTARTS,
+    quick_check=False,
+    progress=None,
+):
+    temporary_path = f"{dest_path}.partial"
+    if os.path.exists(temporary_path):
+        os.remove(temporary_path)
+    source = connect()
+    dest = sqlite3.connect(temporary_path)
+    try:
+        _copy(source, dest, pages, sleep, max_restarts, progress)
+        # The copy inherits WAL mode from the live database. Snapshots are
+        # standalone files, so switch back to a rollback journal to keep
+        # readers from leaving -wal/-shm files next to them.
+        dest.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        dest.close()
+        source.close()
+    try:
+        check_integrity(temporary_path, quick=quick_check)
+    except BackupError:
+        os.remove(temporary_path)
+        raise
+    os.replace(temporary_path, dest_path)
+    return dest_path
+
+
+def list_snapshots(directory=BACKUP_DIR):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.startswith(BACKUP_PREFIX) and name.endswith(".db")
+    )
+
+
+def prune_snapshots(directory=BACKUP_DIR, keep=DEFAULT_RETENTION):
+    snapshots = list_snapshots(directory)
+    removed = snapshots[:-keep] if keep > 0 else snapshots
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+def snapshot(directory=BACKUP_DIR, keep=DEFAULT_RETENTION, **backup_options):
+    os.makedirs(directory, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    path = backup_database(
+        os.path.join(directory, f"{BACKUP_PREFIX}{timestamp}.db"),
+        **backup_options,
+    )
+    prune_snapshots(directory, keep)
+    return path
+
+
+def _read_header(path):
+    with open(path, "rb") as handle:
+        header = handle.read(100)
+    if len(header) < 100 or not header.startswith(b"SQLite format 3\x00"):
+        raise BackupError(f"{path} is not a SQLite database")
+    page_size = int.from_bytes(header[16:18], "big")
+    return (65536 if page_size == 1 else page_size), header[18] == 2
+
+
+def _check_restorable(snapshot_path, dest):
+    # SQLite cannot copy into a WAL-mode or in-memory database with a
+    # different page size, and an in-memory database cannot take a WAL file.
+    page_size, wal = _read_header(snapshot_path)
+    live_page_size = dest.execute("PRAGMA page_size").fetchone()[0]
+    if page_size != live_page_size:
+        raise BackupError(
+            f"{snapshot_path} uses {page_size}-byte pages, "
+            f"the live database {live_page_size}-byte pages"
+        )
+    if wal and is_memory_db():
+        raise BackupError(f"{snapshot_path} is in WAL mode and cannot load in memory")
+
+
+def restore(snapshot_path, pages=PAGES_PER_STEP, sleep=STEP_SLEEP_SECONDS):
+    check_integrity(snapshot_path)
+    source = sqlite3.connect(f"file:{snapshot_path}?mode=ro", uri=True)
+    dest = connect()
+    try:
+        _check_restorable(snapshot_path, dest)
+        source.backup(dest, pages=pages, sleep=sleep)
+    finally:
+        dest.close()
+        source.close()
+
+
+def run_schedule(
+    interval=DEFAULT_INTERVAL_SECONDS,
+    directory=BACKUP_DIR,
+    keep=DEFAULT_RETENTION,
+):
+    while True:
+        started = time.monotonic()
+        try:
+            path = snapshot(directory, keep)
+            print(f"{datetime.now():%Y-%m-%d %H:%M:%S} wrote {path}", flush=True)
+        except (BackupError, sqlite3.Error, OSError) as exc:
+            print(f"{datetime.now():%Y-%m-%d %H:%M:%S} backup failed: {exc}", flush=True)
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+_persist_started = False
+_persist_lock = threading.Lock()
+_persist_write_lock = threading.Lock()
+
+
+def start_persistence(path=None, interval=None):
+    global _persist_started
+    path = path or os.environ.get(PERSIST_ENV_VAR)
+    if not path or not is_memory_db():
+        return False
+    if interval is None:
+        interval = float(
+            os.environ.get(PERSIST_INTERVAL_ENV_VAR, DEFAULT_PERSIST_INTERVAL_SECONDS)
+        )
+    with _persist_lock:
+        if _persist_started:
+            return True
+        _persist_started = True
+    if os.path.exists(path):
+        try:
+            restore(path)
+        except (BackupError, sqlite3.Error, OSError) as exc:
+            # Keep the unreadable file out of the way so the next persist
+            # cannot overwrite it with an empty database.
+            rejected_path = f"{path}.rejected-{datetime.now():%Y%m%d-%H%M%S}"
+            os.replace(path, rejected_path)
+            print(
+                f"{datetime.now():%Y-%m-%d %H:%M:%S} could not load {path} "
+                f"(moved to {rejected_path}): {exc}",
+                flush=True,
+            )
+
+    def persist():
+        with _persist_write_lock:
+            try:
+                backup_database(path, quick_check=True)
+            except (BackupError, sqlite3.Error, OSError) as exc:
+                print(
+                    f"{datetime.now():%Y-%m-%d %H:%M:%S} persist failed: {exc}",
+                    flush=True,
+                )
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            persist()
+
+    atexit.register(persist)
+    threading.Thread(target=loop, name="fishlink-persist", daemon=True).start()
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FishLink online backups")
+    parser.add_argument("--dir", default=BACKUP_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    snapshot_parser = commands.add_parser("snapshot", help="write one snapshot")
+    snapshot_parser.add_argument("--keep", type=int, default=DEFAULT_RETENTION)
+    schedule_parser = commands.add_parser(
+        "schedule",
+        help="write a snapshot every --interval seconds",
+    )
+    schedule_parser.add_argument("--interval", type=int, default=DEFAULT_INTERVAL_SECONDS)
+    schedule_parser.add_argument("--keep", type=int, default=DEFAULT_RETENTION)
+    commands.add_parser("list", help="list snapshots, oldest first")
+    restore_parser = commands.add_parser(
+        "restore",
+        help="copy a snapshot back into the live database",
+    )
+    restore_parser.add_argument("snapshot")
+    args = parser.parse_args()
+    if args.command == "snapshot":
+        ensure_latest_schema()
+        print(snapshot(args.dir, args.keep))
+    elif args.command == "schedule":
+        ensure_latest_schema()
+        run_schedule(args.interval, args.dir, args.keep)
+    elif args.command == "list":
+        for path in list_snapshots(args.dir):
+            print(path)
+    elif args.command == "restore":
+        restore(args.snapshot)
+        print(f"restored {args.snapshot}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import repo
+from async_repo import AsyncRepo
+from db import DB_ENV_VAR, init_db
+
+
+CALLERS = 200
+CALLS_PER_CALLER = 20
+FARM_COUNT = 20
+REQUESTS_PER_FARM = 50
+
+
+def _seed():
+    for farm_index in range(FARM_COUNT):
+        farm_id = repo.create_farm(f"Farm {farm_index}", "Port Town", None, None, "", "")
+        listing_id = repo.create_listing(
+            farm_id, "Tilapia", 500.0, 3.0, 1, 1, 1, 1, 1, 1, 1, 1, ""
+        )
+        for _ in range(REQUESTS_PER_FARM):
+            repo.create_request(
+                listing_id,
+                1,
+                5.0,
+                "",
+                "Live",
+                "Today Morning",
+                "Any morning",
+                "Delivery",
+                "",
+            )
+
+
+def _sync(callers, calls):
+    for caller in range(callers):
+        for call in range(calls):
+            repo.get_request(caller * calls + call + 1)
+            repo.count_requests_since(0, farm_id=caller % FARM_COUNT + 1)
+
+
+async def _async(callers, calls, workers):
+    async with AsyncRepo(max_workers=workers) as arepo:
+
+        async def caller_task(caller):
+            for call in range(calls):
+                await arepo.gather(
+                    ("get_request", caller * calls + call + 1),
+                    ("count_requests_since", 0, caller % FARM_COUNT + 1),
+                )
+
+        await asyncio.gather(*(caller_task(caller) for caller in range(callers)))
+
+
+def main(callers=CALLERS):
+    calls = CALLS_PER_CALLER
+    operations = callers * calls * 2
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ[DB_ENV_VAR] = os.path.join(tmp, "bench.db")
+        init_db()
+        _seed()
+        started = time.perf_counter()
+        _sync(callers, calls)
+        elapsed = time.perf_counter() - started
+        print(f"sync sequential:      {operations / elapsed:9.0f} ops/s")
+        for workers in (4, 8, 16):
+            started = time.perf_counter()
+            asyncio.run(_async(callers, calls, workers))
+            elapsed = time.perf_counter() - started
+            print(
+                f"async {callers} callers, {workers:2d} workers: "
+                f"{operations / elapsed:9.0f} ops/s"
+            )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else CALLERS)
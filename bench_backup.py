@@ -0,0 +1,83 @@
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import repo
+from backup import backup_database, check_integrity, restore
+from db import DB_ENV_VAR
+from synthetic import generate, scale_for
+
+
+DEFAULT_REQUESTS = 1_000_000
+WRITE_INTERVAL_SECONDS = 0.02
+PAGE_STEPS = (-1, 1024, 16384)
+
+
+def _writer(stop, latencies):
+    while not stop.is_set():
+        started = time.perf_counter()
+        repo.create_request(
+            1, 1, 5.0, "", "Live", "Today Morning", "Any morning", "Delivery", ""
+        )
+        latencies.append(time.perf_counter() - started)
+        time.sleep(WRITE_INTERVAL_SECONDS)
+
+
+def _run(path, pages):
+    latencies = []
+    steps = []
+    stop = threading.Event()
+    writer = threading.Thread(target=_writer, args=(stop, latencies))
+    writer.start()
+    started = time.perf_counter()
+    try:
+        backup_database(
+            path,
+            pages=pages,
+            progress=lambda status, remaining, total: steps.append(remaining),
+        )
+    finally:
+        elapsed = time.perf_counter() - started
+        stop.set()
+        writer.join()
+    restarts = sum(1 for before, after in zip(steps, steps[1:]) if after > before)
+    return elapsed, restarts, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Online backup throughput and writer stalls"
+    )
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ[DB_ENV_VAR] = os.path.join(tmp, "bench.db")
+        generate(**scale_for(args.requests))
+        size_mb = os.path.getsize(os.environ[DB_ENV_VAR]) / 1e6
+        print(f"database: {args.requests} requests, {size_mb:.0f} MB")
+        copy_path = os.path.join(tmp, "copy.db")
+        for pages in PAGE_STEPS:
+            elapsed, restarts, latencies = _run(copy_path, pages)
+            label = "all" if pages < 0 else str(pages)
+            worst = max(latencies) * 1000 if latencies else 0.0
+            print(
+                f"pages/step {label:>6}: {elapsed:6.2f}s "
+                f"({size_mb / elapsed:7.1f} MB/s, incl. integrity check), "
+                f"restarts {restarts}, writes {len(latencies)}, "
+                f"worst write {worst:7.1f} ms"
+            )
+        started = time.perf_counter()
+        check_integrity(copy_path)
+        print(f"integrity_check alone: {time.perf_counter() - started:.2f}s")
+        started = time.perf_counter()
+        check_integrity(copy_path, quick=True)
+        print(f"quick_check alone:     {time.perf_counter() - started:.2f}s")
+        started = time.perf_counter()
+        restore(copy_path)
+        print(f"restore:               {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
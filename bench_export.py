@@ -0,0 +1,39 @@
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from db import DB_ENV_VAR
+from export import export
+from synthetic import generate, scale_for
+
+
+DEFAULT_REQUESTS = 200_000
+
+
+class _NullWriter(io.TextIOBase):
+    def write(self, text):
+        return len(text)
+
+
+def main(request_count=DEFAULT_REQUESTS):
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ[DB_ENV_VAR] = os.path.join(tmp, "bench.db")
+        generate(**scale_for(request_count))
+        for entity in ("requests", "listings"):
+            for fmt in ("csv", "jsonl"):
+                started = time.perf_counter()
+                count = export(entity, _NullWriter(), fmt)
+                elapsed = time.perf_counter() - started
+                print(f"{entity:>9} {fmt:>5}: {count / elapsed:10.0f} rows/s")
+        tracemalloc.start()
+        export("requests", _NullWriter(), "csv")
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"peak Python memory, requests csv: {peak / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REQUESTS)
@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+import repo
+from db import DB_ENV_VAR
+from fishlink import local_today, slot_date
+from quotes import invalidate_restaurant_quotes, quote_listing_fees
+from routing import plan_delivery_runs
+from synthetic import generate, scale_for
+from ui_data import build_listing_cards
+
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_REPEAT = 5
+BULK_SIZE = 100
+
+
+def _cases(counts):
+    farm_id = counts["farms"] // 2 or 1
+    restaurant_id = counts["restaurants"] // 2 or 1
+    request_id = counts["requests"] // 2 or 1
+    listing_id = counts["listings"] // 2 or 1
+    restaurant = repo.get_restaurant(restaurant_id)
+    cards = build_listing_cards()
+    return {
+        "list_requests": lambda: repo.list_requests(),
+        "list_requests[farm]": lambda: repo.list_requests(farm_id=farm_id),
+        "list_requests[farm, active]": lambda: repo.list_requests(
+            farm_id=farm_id,
+            statuses=["Requested", "Accepted", "Preparing", "Ready"],
+        ),
+        "list_requests[restaurant]": lambda: repo.list_requests(
+            restaurant_id=restaurant_id
+        ),
+        "list_requests[page]": lambda: repo.list_requests(limit=100),
+        "list_requests_columns": lambda: repo.list_requests_columns(),
+        "list_requests_since[farm]": lambda: repo.list_requests_since(
+            request_id,
+            farm_id=farm_id,
+        ),
+        "count_requests_since[farm]": lambda: repo.count_requests_since(
+            0,
+            farm_id=farm_id,
+        ),
+        "get_request": lambda: repo.get_request(request_id),
+        "list_listings": lambda: repo.list_listings(),
+        "get_listing": lambda: repo.get_listing(listing_id),
+        "list_farms": lambda: repo.list_farms(),
+        "get_farm": lambda: repo.get_farm(farm_id),
+        "list_restaurants": lambda: repo.list_restaurants(),
+        "avg_rating_for_farm": lambda: repo.avg_rating_for_farm(farm_id),
+        "events_since[second half]": lambda: repo.events_since(request_id),
+        "list_ready_deliveries[farm]": lambda: repo.list_ready_deliveries(
+            farm_id=farm_id
+        ),
+        "build_listing_cards": lambda: build_listing_cards(),
+        "ranked_listing_ids": lambda: repo.ranked_listing_ids(restaurant_id),
+        "quote_listing_fees[uncached]": lambda: _quote_fees(restaurant, cards),
+        "order form slot usage": lambda: _slot_usage(farm_id, listing_id),
+        "delivery runs[farm]": lambda: plan_delivery_runs(
+            repo.list_ready_deliveries(farm_id=farm_id)
+        ),
+        "daily sales[farm, 30 days]": lambda: repo.list_daily_sales(
+            farm_id=farm_id,
+            since=local_today() - timedelta(days=29),
+        ),
+        "request history[restaurant]": lambda: repo.list_request_history(
+            restaurant_id=restaurant_id
+        ),
+    }
+
+
+def _quote_fees(restaurant, cards):
+    invalidate_restaurant_quotes(restaurant.id)
+    return quote_listing_fees(restaurant, cards)
+
+
+def _slot_usage(farm_id, listing_id):
+    today = local_today()
+    slot_dates = [
+        slot_date("Today Morning", today),
+        slot_date("Next-day Morning", today),
+    ]
+    return (
+        repo.list_slot_usage(farm_id, slot_dates),
+        repo.list_listing_slot_usage(listing_id, slot_dates),
+    )
+
+
+def _write_cases(counts, repeat):
+    restaurant_id = counts["restaurants"] // 2 or 1
+    listing_id = counts["listings"] // 2 or 1
+
+    def create_request():
+        return repo.create_request(
+            listing_id,
+            restaurant_id,
+            1.0,
+            "",
+            "Live",
+            "Today Morning",
+            "Any morning",
+            "Delivery",
+            "",
+        )
+
+    # Status changes need fresh Requested rows; create them before timing.
+    single_ids = iter([create_request() for _ in range(repeat)])
+    bulk_ids = iter(
+        [[create_request() for _ in range(BULK_SIZE)] for _ in range(repeat)]
+    )
+    return {
+        "create_request": create_request,
+        "update_request_status": lambda: repo.update_request_status(
+            next(single_ids), "Accepted"
+        ),
+        f"bulk_update_request_status[{BULK_SIZE}]": lambda: (
+            repo.bulk_update_request_status(next(bulk_ids), "Accepted")
+        ),
+    }
+
+
+def _time(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _run_cases(size, cases, repeat):
+    results = []
+    for name, func in cases.items():
+        samples = _time(func, repeat)
+        results.append(
+            {
+                "size": size,
+                "function": name,
+                "median_s": statistics.median(samples),
+                "min_s": min(samples),
+                "repeat": repeat,
+            }
+        )
+        print(
+            f"{size:>9} {name:<36} {statistics.median(samples) * 1000:10.2f} ms",
+            file=sys.stderr,
+        )
+    return results
+
+
+def run(sizes=DEFAULT_SIZES, repeat=DEFAULT_REPEAT, seed=0):
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ[DB_ENV_VAR] = os.path.join(tmp, "bench.db")
+            counts = scale_for(size)
+            started = time.perf_counter()
+            generate(**counts, seed=seed)
+            print(
+                f"seeded {size} requests in {time.perf_counter() - started:.1f}s",
+                file=sys.stderr,
+            )
+            # Reads run first so the rows the write cases add do not skew them.
+            results.extend(_run_cases(size, _cases(counts), repeat))
+            results.extend(_run_cases(size, _write_cases(counts, repeat), repeat))
+            os.environ.pop(DB_ENV_VAR, None)
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time repo reads, screen builders and writes at scale"
+    )
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="comma-separated request counts, e.g. 1000,10000,100000,1000000",
+    )
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args()
+    report = run(
+        [int(size) for size in args.sizes.split(",")],
+        args.repeat,
+        args.seed,
+    )
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(payload + "\n")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import random
+import sys
+import time
+
+from routing import plan_route
+
+
+STOP_COUNTS = (50, 100, 200, 300, 500)
+
+
+def main(seed=7):
+    rng = random.Random(seed)
+    depot = (11.55, 104.92)
+    for count in STOP_COUNTS:
+        stops = [
+            (depot[0] + rng.uniform(-0.3, 0.3), depot[1] + rng.uniform(-0.3, 0.3))
+            for _ in range(count)
+        ]
+        started = time.perf_counter()
+        order, distance_km = plan_route(depot, stops)
+        elapsed = time.perf_counter() - started
+        assert sorted(order) == list(range(count))
+        print(f"{count:4d} stops: {elapsed * 1000:8.1f} ms  {distance_km:8.1f} km")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 7)
@@ -0,0 +1,103 @@
+import gc
+import os
+import sqlite3
+import sys
+import tempfile
+import tracemalloc
+
+from db import DB_ENV_VAR, init_db
+from repo import list_listings
+
+
+ROW_COUNT = 100_000
+
+
+def _seed(path, count):
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            """
+            INSERT INTO farms (name, location_text, lat, lng, maps_url, contact)
+            VALUES ('Bench Farm', 'Port Town', 11.5, 104.9, '', '')
+            """
+        )
+        conn.executemany(
+            """
+            INSERT INTO listings (
+                farm_id,
+                fish_name,
+                quantity_kg,
+                price_per_kg,
+                slot_today_morning,
+                slot_today_evening,
+                slot_next_morning,
+                slot_next_evening,
+                allow_delivery,
+                allow_pickup,
+                allow_live,
+                allow_fresh,
+                approx_time
+            )
+            VALUES (1, ?, ?, ?, 1, 0, 1, 0, 1, 1, 0, 1, 'Ready by 9 AM')
+            """,
+            (
+                (f"Fish {index % 50}", 10.0 + index % 100, 2.5 + index % 7)
+                for index in range(count)
+            ),
+        )
+
+
+def _dict_rows(path):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = conn.execute(
+            """
+            SELECT
+                id,
+                farm_id,
+                fish_name,
+                quantity_kg,
+                price_per_kg,
+                slot_today_morning,
+                slot_today_evening,
+                slot_next_morning,
+                slot_next_evening,
+                allow_delivery,
+                allow_pickup,
+                allow_live,
+                allow_fresh,
+                approx_time
+            FROM listings
+            ORDER BY id
+            """
+        ).fetchall()
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+
+def _measure(loader):
+    gc.collect()
+    tracemalloc.start()
+    rows = loader()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(rows), current
+
+
+def main(count=ROW_COUNT):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        os.environ[DB_ENV_VAR] = path
+        init_db()
+        _seed(path, count)
+        dict_count, dict_bytes = _measure(lambda: _dict_rows(path))
+        slot_count, slot_bytes = _measure(list_listings)
+    print(f"rows: {dict_count} dict / {slot_count} slotted")
+    print(f"dict(row):    {dict_bytes / dict_count:8.1f} bytes/row")
+    print(f"Listing row:  {slot_bytes / slot_count:8.1f} bytes/row")
+    print(f"saved:        {(dict_bytes - slot_bytes) / dict_count:8.1f} bytes/row")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else ROW_COUNT)
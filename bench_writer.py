@@ -0,0 +1,84 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import repo
+from db import DB_ENV_VAR, init_db
+from writer import DEFAULT_MAX_DELAY_SECONDS, GroupCommitWriter
+
+
+CALLERS = 50
+WRITES_PER_CALLER = 40
+
+
+def _seed():
+    farm_id = repo.create_farm("Farm", "Port Town", None, None, "", "")
+    return repo.create_listing(
+        farm_id, "Tilapia", 500.0, 3.0, 1, 1, 1, 1, 1, 1, 1, 1, ""
+    )
+
+
+def _run(callers, max_delay=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ[DB_ENV_VAR] = os.path.join(tmp, "bench.db")
+        init_db()
+        listing_id = _seed()
+        writer = None
+        if max_delay is None:
+            create_request = repo.create_request
+            update_request_status = repo.update_request_status
+        else:
+            writer = GroupCommitWriter(max_delay=max_delay)
+            create_request = writer.create_request
+            update_request_status = writer.update_request_status
+        errors = []
+
+        def caller():
+            try:
+                for _ in range(WRITES_PER_CALLER):
+                    request_id = create_request(
+                        listing_id,
+                        1,
+                        5.0,
+                        "",
+                        "Live",
+                        "Today Morning",
+                        "7–8",
+                        "Delivery",
+                        "",
+                    )
+                    update_request_status(request_id, "Accepted")
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=caller) for _ in range(callers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if writer is not None:
+            writer.close()
+    return callers * WRITES_PER_CALLER * 2 / elapsed, len(errors)
+
+
+def main(callers=CALLERS):
+    print(f"{callers} threads x {WRITES_PER_CALLER} create + update each")
+    for label, delay in (
+        ("direct", None),
+        ("group commit, max_delay 0 ms", 0.0),
+        (
+            f"group commit, default {DEFAULT_MAX_DELAY_SECONDS * 1000:g} ms",
+            DEFAULT_MAX_DELAY_SECONDS,
+        ),
+        ("group commit, max_delay 5 ms", 0.005),
+    ):
+        writes, errors = _run(callers, max_delay=delay)
+        print(f"{label:<30} {writes:8.0f} writes/s, {errors} failed callers")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else CALLERS)
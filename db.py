@@ -1,25 +1,232 @@
+import functools
 import os
 import sqlite3
+import threading
 from datetime import datetime
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from fishlink import local_today
+from metrics import DB_CONNECTIONS
+from tracing import statement_callback
 
 
 DB_PATH = "fishlink.db"
 DB_ENV_VAR = "FISHLINK_DB_PATH"
+READ_CACHE_KIB = 65536
+READ_MMAP_BYTES = 256 * 1024 * 1024
 
 
 def _get_db_path():
     return os.environ.get(DB_ENV_VAR, DB_PATH)
 
 
-def get_conn():
+_thread_state = threading.local()
+_memory_keepers = {}
+_memory_lock = threading.Lock()
+
+
+MEMORY_DB_NAME = "fishlink-memory"
+
+
+def is_memory_db(path=None):
+    path = path or _get_db_path()
+    if not path.startswith("file:"):
+        return False
+    parts = urlsplit(path)
+    query = parse_qs(parts.query)
+    return (
+        parts.path == ":memory:"
+        or query.get("mode") == ["memory"]
+        or query.get("vfs") == ["memdb"]
+    )
+
+
+def _memory_uri(path):
+    # Shared-cache memory databases use table-level locks that fail with
+    # SQLITE_LOCKED instead of waiting, so every in-memory form is served
+    # from the memdb VFS, which keeps normal locking and the busy timeout.
+    parts = urlsplit(path)
+    if parse_qs(parts.query).get("vfs") == ["memdb"]:
+        return path
+    name = MEMORY_DB_NAME if parts.path == ":memory:" else parts.path.lstrip("/")
+    return f"file:/{name}?vfs=memdb"
+
+
+def _keep_memory_db(path):
+    # A memdb database is freed when its last connection closes, so hold
+    # one open for the life of the process.
+    uri = _memory_uri(path)
+    with _memory_lock:
+        keeper = _memory_keepers.get(uri)
+        if keeper is None:
+            keeper = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            keeper.isolation_level = None
+            _memory_keepers[uri] = keeper
+    return uri, keeper
+
+
+def reset_memory_db(path=None):
+    path = path or _get_db_path()
+    if not is_memory_db(path):
+        raise ValueError(f"{path} is not an in-memory database")
+    _, keeper = _keep_memory_db(path)
+    with _memory_lock:
+        tables = [
+            row[0]
+            for row in keeper.execute(
+                """
+                SELECT name FROM sqlite_master
+                WHERE type = 'table' AND name NOT LIKE 'sqlite_%'
+                """
+            ).fetchall()
+        ]
+        for table in tables:
+            keeper.execute(f'DROP TABLE IF EXISTS "{table}"')
+
+
+def connect(check_same_thread=True, factory=sqlite3.Connection):
     path = _get_db_path()
-    conn = sqlite3.connect(path)
+    if is_memory_db(path):
+        path, _ = _keep_memory_db(path)
+    conn = sqlite3.connect(
+        path,
+        check_same_thread=check_same_thread,
+        factory=factory,
+        uri=path.startswith("file:"),
+    )
     conn.row_factory = sqlite3.Row
+    DB_CONNECTIONS.inc()
     return conn
 
 
+def connect_readonly():
+    path = _get_db_path()
+    if is_memory_db(path):
+        uri, _ = _keep_memory_db(path)
+        conn = sqlite3.connect(uri, uri=True)
+    elif path.startswith("file:"):
+        separator = "&" if "?" in path else "?"
+        conn = sqlite3.connect(f"{path}{separator}mode=ro", uri=True)
+    else:
+        conn = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA query_only = ON")
+    conn.execute(f"PRAGMA cache_size = -{READ_CACHE_KIB}")
+    conn.execute(f"PRAGMA mmap_size = {READ_MMAP_BYTES}")
+    DB_CONNECTIONS.inc()
+    return conn
+
+
+def _read_conn():
+    path = _get_db_path()
+    if is_memory_db(path):
+        key = (_memory_uri(path),)
+    else:
+        file_path = urlsplit(path).path if path.startswith("file:") else path
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return None
+        key = (os.path.abspath(file_path), stat.st_dev, stat.st_ino)
+    cached = getattr(_thread_state, "read_conn", None)
+    if cached is not None:
+        if cached[0] == key:
+            return cached[1]
+        cached[1].close()
+    conn = connect_readonly()
+    _thread_state.read_conn = (key, conn)
+    return conn
+
+
+def read_only(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if getattr(_thread_state, "read_only", False):
+            return func(*args, **kwargs)
+        _thread_state.read_only = True
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _thread_state.read_only = False
+
+    return wrapper
+
+
+def get_conn():
+    callback = statement_callback()
+    conn = None
+    if getattr(_thread_state, "read_only", False):
+        conn = _read_conn()
+    if conn is None:
+        conn = getattr(_thread_state, "conn", None)
+    if conn is not None:
+        conn.set_trace_callback(callback)
+        return conn
+    conn = connect()
+    if callback is not None:
+        conn.set_trace_callback(callback)
+    return conn
+
+
+def pin_thread_connection(factory=sqlite3.Connection):
+    conn = connect(check_same_thread=False, factory=factory)
+    _thread_state.conn = conn
+    return conn
+
+
+def _add_missing_columns(conn, table, columns):
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    added = []
+    for name, definition in columns:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+            added.append(name)
+    return added
+
+
+def _migrate_slot_periods(conn, table, key_columns, sum_columns):
+    # Older counters were keyed by the relative slot label ("Today Morning"),
+    # which stops matching once the daily rollover moves Next-day slots to
+    # today. Fold them into the morning/evening period of the same date.
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if "time_slot" not in existing:
+        return
+    conn.execute(f"ALTER TABLE {table} RENAME COLUMN time_slot TO period")
+    keys = ", ".join(key_columns)
+    sums = ", ".join(f"SUM({column})" for column in sum_columns)
+    updates = ", ".join(
+        f"{column} = {column} + excluded.{column}" for column in sum_columns
+    )
+    grouped = ", ".join(
+        "CASE WHEN period LIKE '%Morning' THEN 'Morning' ELSE 'Evening' END"
+        if column == "period"
+        else column
+        for column in key_columns
+    )
+    conn.execute(
+        f"""
+        INSERT INTO {table} ({keys}, {", ".join(sum_columns)})
+        SELECT {grouped}, {sums}
+        FROM {table}
+        WHERE period NOT IN ('Morning', 'Evening')
+        GROUP BY {grouped}
+        ON CONFLICT({keys}) DO UPDATE SET {updates}
+        """
+    )
+    conn.execute(f"DELETE FROM {table} WHERE period NOT IN ('Morning', 'Evening')")
+
+
+def remove_database(path):
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(f"{path}{suffix}"):
+            os.remove(f"{path}{suffix}")
+
+
 def init_db():
     with get_conn() as conn:
+        # WAL lets readers and long exports run while writers commit.
+        conn.execute("PRAGMA journal_mode = WAL")
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS farms (
@@ -63,10 +270,22 @@ def init_db():
                 allow_live INTEGER NOT NULL,
                 allow_fresh INTEGER NOT NULL,
                 approx_time TEXT,
+                available_date TEXT,
+                expired_at TEXT,
                 FOREIGN KEY (farm_id) REFERENCES farms(id)
             )
             """
         )
+        added = _add_missing_columns(
+            conn,
+            "listings",
+            (("available_date", "TEXT"), ("expired_at", "TEXT")),
+        )
+        if "available_date" in added:
+            conn.execute(
+                "UPDATE listings SET available_date = ? WHERE available_date IS NULL",
+                (local_today().isoformat(),),
+            )
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS requests (
@@ -96,6 +315,28 @@ def init_db():
             )
             """
         )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS requests_archive (
+                archive_seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id INTEGER NOT NULL UNIQUE,
+                listing_id INTEGER NOT NULL,
+                restaurant_id INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                quantity_kg REAL NOT NULL,
+                preferred_size_text TEXT,
+                fish_condition TEXT NOT NULL,
+                time_slot TEXT NOT NULL,
+                delivery_method TEXT NOT NULL,
+                preferred_time_window TEXT,
+                notes TEXT,
+                distance_km REAL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                archived_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS reviews (
@@ -109,10 +350,164 @@ def init_db():
             )
             """
         )
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_listings_farm
+            ON listings (farm_id)
+            """
+        )
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_listings_live
+            ON listings (id)
+            WHERE expired_at IS NULL
+            """
+        )
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_requests_listing
+            ON requests (listing_id, id)
+            """
+        )
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_requests_restaurant
+            ON requests (restaurant_id, updated_at)
+            """
+        )
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_requests_status_updated
+            ON requests (status, updated_at)
+            """
+        )
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_requests_archive_restaurant
+            ON requests_archive (restaurant_id, updated_at)
+            """
+        )
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_requests_archive_listing
+            ON requests_archive (listing_id, id)
+            """
+        )
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_reviews_farm
+            ON reviews (farm_id)
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS listing_scores (
+                restaurant_id INTEGER NOT NULL,
+                listing_id INTEGER NOT NULL,
+                score REAL NOT NULL,
+                computed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (restaurant_id, listing_id)
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_listing_scores_rank
+            ON listing_scores (restaurant_id, score DESC)
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS slot_usage (
+                farm_id INTEGER NOT NULL,
+                slot_date TEXT NOT NULL,
+                period TEXT NOT NULL,
+                time_window TEXT NOT NULL,
+                committed_kg REAL NOT NULL DEFAULT 0,
+                order_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (farm_id, slot_date, period, time_window)
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS listing_slot_usage (
+                listing_id INTEGER NOT NULL,
+                slot_date TEXT NOT NULL,
+                period TEXT NOT NULL,
+                committed_kg REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (listing_id, slot_date, period)
+            )
+            """
+        )
+        _migrate_slot_periods(
+            conn,
+            "slot_usage",
+            ("farm_id", "slot_date", "period", "time_window"),
+            ("committed_kg", "order_count"),
+        )
+        _migrate_slot_periods(
+            conn,
+            "listing_slot_usage",
+            ("listing_id", "slot_date", "period"),
+            ("committed_kg",),
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS daily_farm_sales (
+                farm_id INTEGER NOT NULL,
+                sale_date TEXT NOT NULL,
+                kg REAL NOT NULL DEFAULT 0,
+                revenue REAL NOT NULL DEFAULT 0,
+                order_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (farm_id, sale_date)
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS daily_lead_times (
+                farm_id INTEGER NOT NULL,
+                sale_date TEXT NOT NULL,
+                lead_minutes INTEGER NOT NULL,
+                order_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (farm_id, sale_date, lead_minutes)
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rollup_state (
+                name TEXT PRIMARY KEY,
+                last_seq INTEGER NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS request_events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                request_id INTEGER NOT NULL,
+                from_status TEXT,
+                to_status TEXT NOT NULL,
+                created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (request_id) REFERENCES requests(id)
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_request_events_request
+            ON request_events (request_id, seq)
+            """
+        )
 
 
 def ensure_latest_schema():
     path = _get_db_path()
+    if is_memory_db(path) or path.startswith("file:"):
+        init_db()
+        return
     if not os.path.exists(path):
         init_db()
         return
@@ -136,6 +531,7 @@ def ensure_latest_schema():
         and "contact" in farm_columns
         and "contact" in restaurant_columns
     ):
+        init_db()
         return
     timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
     backup_path = f"{path}.bak-{timestamp}"
@@ -0,0 +1,77 @@
+import argparse
+import csv
+import json
+import sys
+import time
+
+from db import ensure_latest_schema
+from repo import EXPORT_ENTITIES, iter_export_rows
+
+
+FORMATS = ("csv", "jsonl")
+
+
+def write_csv(rows, handle):
+    writer = csv.writer(handle)
+    writer.writerow(next(rows))
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_jsonl(rows, handle):
+    columns = next(rows)
+    count = 0
+    for row in rows:
+        handle.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+        handle.write("\n")
+        count += 1
+    return count
+
+
+def export(entity, handle, fmt="csv", **filters):
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown export format: {fmt}")
+    rows = iter_export_rows(entity, **filters)
+    if fmt == "csv":
+        return write_csv(rows, handle)
+    return write_jsonl(rows, handle)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream FishLink data to CSV or JSONL")
+    parser.add_argument("entity", choices=sorted(EXPORT_ENTITIES))
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--output", help="file path (default: stdout)")
+    parser.add_argument("--since", help="first created_at date, YYYY-MM-DD")
+    parser.add_argument("--until", help="last created_at date, YYYY-MM-DD")
+    parser.add_argument("--status", action="append", dest="statuses")
+    parser.add_argument("--farm", type=int, dest="farm_id")
+    parser.add_argument("--include-archived", action="store_true")
+    args = parser.parse_args()
+    ensure_latest_schema()
+    filters = {
+        "since": args.since,
+        "until": args.until,
+        "statuses": args.statuses,
+        "farm_id": args.farm_id,
+        "include_archived": args.include_archived,
+    }
+    started = time.perf_counter()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as handle:
+            count = export(args.entity, handle, args.format, **filters)
+    else:
+        count = export(args.entity, sys.stdout, args.format, **filters)
+    elapsed = time.perf_counter() - started
+    print(
+        f"exported {count} {args.entity} in {elapsed:.2f}s "
+        f"({count / elapsed if elapsed else 0:.0f} rows/s)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,89 @@
 from __future__ import annotations
 
+import math
 from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
 from enum import Enum
+from typing import Iterable, Mapping
+from zoneinfo import ZoneInfo
 
 
 DELIVERY_RATE = 2.5
+LOCAL_TIMEZONE = ZoneInfo("Asia/Phnom_Penh")
+
+
+def local_today() -> date:
+    return datetime.now(LOCAL_TIMEZONE).date()
+
+
+def slot_date(time_slot: str, today: date) -> date:
+    if time_slot.startswith("Next-day"):
+        return today + timedelta(days=1)
+    return today
+
+
+TIME_SLOTS = [
+    "Today Morning",
+    "Today Evening",
+    "Next-day Morning",
+    "Next-day Evening",
+]
+DELIVERY_METHODS = [
+    "Delivery",
+    "Pickup",
+]
+FISH_CONDITIONS = [
+    "Live",
+    "Chilled",
+    "Frozen",
+]
+MORNING_WINDOWS = ["7–8", "8–9", "Any morning"]
+EVENING_WINDOWS = ["15–16", "16–17", "Any evening"]
+MAX_ORDERS_PER_WINDOW = 10
+
+
+def slot_period(time_slot: str) -> str:
+    return "Morning" if "Morning" in time_slot else "Evening"
+
+
+def windows_for_slot(time_slot: str) -> list[str]:
+    return MORNING_WINDOWS if slot_period(time_slot) == "Morning" else EVENING_WINDOWS
+
+
+def window_is_full(usage: Mapping, today: date, time_slot: str, window: str) -> bool:
+    day = slot_date(time_slot, today).isoformat()
+    row = usage.get((day, slot_period(time_slot), window))
+    return row is not None and row.order_count >= MAX_ORDERS_PER_WINDOW
+
+
+def slot_is_full(
+    usage: Mapping,
+    listing_usage: Mapping,
+    today: date,
+    time_slot: str,
+    capacity_kg: float,
+) -> bool:
+    day = slot_date(time_slot, today).isoformat()
+    if listing_usage.get((day, slot_period(time_slot)), 0.0) >= capacity_kg:
+        return True
+    return all(
+        window_is_full(usage, today, time_slot, window)
+        for window in windows_for_slot(time_slot)
+    )
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    radius_km = 6371.0
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    delta_phi = math.radians(lat2 - lat1)
+    delta_lambda = math.radians(lng2 - lng1)
+    a = (
+        math.sin(delta_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
+    )
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    return radius_km * c
 
 
 class RequestStatus(str, Enum):
@@ -23,6 +102,19 @@ _ALLOWED_TRANSITIONS = {
     RequestStatus.COMPLETED: set(),
 }
 
+_TRANSITION_PAIRS = frozenset(
+    (current, next_status)
+    for current, allowed in _ALLOWED_TRANSITIONS.items()
+    for next_status in allowed
+)
+
+
+def can_transition(
+    current: RequestStatus | str,
+    next_status: RequestStatus | str,
+) -> bool:
+    return (current, next_status) in _TRANSITION_PAIRS
+
 
 @dataclass(frozen=True)
 class FarmerListing:
@@ -49,9 +141,37 @@ class Request:
         return self.distance_km * DELIVERY_RATE
 
     def transition_to(self, next_status: RequestStatus) -> None:
-        allowed = _ALLOWED_TRANSITIONS[self.status]
-        if next_status not in allowed:
+        if not can_transition(self.status, next_status):
             raise ValueError(
                 f"invalid status transition: {self.status.value} -> {next_status.value}"
             )
         self.status = next_status
+
+
+@dataclass(frozen=True)
+class TransitionResult:
+    request_id: str | int
+    ok: bool
+    error: str | None = None
+
+
+def transition_many(
+    requests: Iterable[Request],
+    next_status: RequestStatus,
+) -> list[TransitionResult]:
+    next_status = RequestStatus(next_status)
+    results = []
+    for request in requests:
+        if can_transition(request.status, next_status):
+            request.status = next_status
+            results.append(TransitionResult(request.request_id, True))
+        else:
+            results.append(
+                TransitionResult(
+                    request.request_id,
+                    False,
+                    f"invalid status transition: "
+                    f"{RequestStatus(request.status).value} -> {next_status.value}",
+                )
+            )
+    return results
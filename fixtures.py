@@ -0,0 +1,30 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from db import DB_ENV_VAR, init_db, reset_memory_db
+
+
+def memory_db_path(name):
+    return f"file:/{name}?vfs=memdb"
+
+
+class DatabaseTestCase(unittest.TestCase):
+    on_disk = False
+    create_schema = True
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(prefix="fishlink-test-")
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        if self.on_disk:
+            self.db_path = os.path.join(self.tmp_dir, "fishlink.db")
+        else:
+            self.db_name = f"fishlink_{type(self).__name__}"
+            self.db_path = memory_db_path(self.db_name)
+            reset_memory_db(self.db_path)
+            self.addCleanup(reset_memory_db, self.db_path)
+        os.environ[DB_ENV_VAR] = self.db_path
+        self.addCleanup(os.environ.pop, DB_ENV_VAR, None)
+        if self.create_schema:
+            init_db()
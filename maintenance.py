@@ -0,0 +1,49 @@
+import argparse
+
+from db import ensure_latest_schema
+from ranking import refresh_all_scores
+from repo import (
+    ARCHIVE_BATCH_SIZE,
+    archive_completed_requests,
+    refresh_sales_rollups,
+    rollover_listings,
+)
+
+
+DEFAULT_ARCHIVE_DAYS = 90
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FishLink maintenance jobs")
+    commands = parser.add_subparsers(dest="command", required=True)
+    archive = commands.add_parser(
+        "archive",
+        help="move Completed requests older than --days into requests_archive",
+    )
+    archive.add_argument("--days", type=int, default=DEFAULT_ARCHIVE_DAYS)
+    archive.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    commands.add_parser(
+        "rollups",
+        help="catch daily sales rollups up with the request event log",
+    )
+    commands.add_parser(
+        "rollover",
+        help="move yesterday's Next-day slots to today and expire stale listings",
+    )
+    args = parser.parse_args()
+    ensure_latest_schema()
+    if args.command == "archive":
+        archived = archive_completed_requests(args.days, args.batch_size)
+        print(f"archived {archived} requests")
+    elif args.command == "rollups":
+        processed = refresh_sales_rollups()
+        print(f"rolled up {processed} request events")
+    elif args.command == "rollover":
+        result = rollover_listings()
+        if result["expired"] or result["rolled"]:
+            refresh_all_scores()
+        print(f"rolled over {result['rolled']} listings, expired {result['expired']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+import bisect
+import os
+import threading
+import time
+
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TEXTFILE_ENV_VAR = "FISHLINK_METRICS_FILE"
+TEXTFILE_INTERVAL_SECONDS = 15.0
+SESSION_TTL_SECONDS = 300.0
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._values = {}
+
+    def inc(self, amount=1.0, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0.0)
+
+    def _samples(self):
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labels=(), callback=None):
+        super().__init__(name, documentation, labels)
+        self._values = {}
+        self._callback = callback
+
+    def set(self, value, *label_values):
+        with self._lock:
+            self._values[label_values] = float(value)
+
+    def _samples(self):
+        if self._callback is not None:
+            self._values[()] = float(self._callback())
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        self._values = {}
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(label_values)
+            if state is None:
+                state = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._values[label_values] = state
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, *label_values):
+        state = self._values.get(label_values)
+        return state[2] if state else 0
+
+    def _samples(self):
+        lines = []
+        for key, (bucket_counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(
+                    self.label_names,
+                    key,
+                    [("le", _format_value(bound))],
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def touch_session(session_id):
+    with _sessions_lock:
+        _sessions[session_id] = time.monotonic()
+
+
+def active_session_count():
+    cutoff = time.monotonic() - SESSION_TTL_SECONDS
+    with _sessions_lock:
+        for session_id in [key for key, seen in _sessions.items() if seen < cutoff]:
+            del _sessions[session_id]
+        return len(_sessions)
+
+
+REQUESTS_CREATED = Counter(
+    "fishlink_requests_created_total",
+    "Requests created.",
+)
+REQUEST_TRANSITIONS = Counter(
+    "fishlink_request_transitions_total",
+    "Request status transitions applied.",
+    ("to_status",),
+)
+TRANSITION_SECONDS = Histogram(
+    "fishlink_transition_duration_seconds",
+    "Latency of status transition writes.",
+)
+REPO_CALL_SECONDS = Histogram(
+    "fishlink_repo_call_duration_seconds",
+    "Latency of repository calls, including their queries.",
+    ("function",),
+)
+DB_CONNECTIONS = Counter(
+    "fishlink_db_connections_opened_total",
+    "SQLite connections opened.",
+)
+DB_LOCKED_ERRORS = Counter(
+    "fishlink_db_locked_errors_total",
+    "Repository calls that failed with 'database is locked'.",
+    ("function",),
+)
+SLOW_QUERIES = Counter(
+    "fishlink_slow_queries_total",
+    "Statements slower than the slow-query threshold.",
+    ("function",),
+)
+GROUP_COMMIT_BATCH_SIZE = Histogram(
+    "fishlink_group_commit_batch_size",
+    "Writes committed per group-commit transaction.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+RERUN_SECONDS = Histogram(
+    "fishlink_rerun_duration_seconds",
+    "Streamlit rerun duration by screen.",
+    ("screen",),
+)
+ACTIVE_SESSIONS = Gauge(
+    "fishlink_active_sessions",
+    "Streamlit sessions seen in the last five minutes.",
+    callback=active_session_count,
+)
+
+
+def render_text():
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path):
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as handle:
+        handle.write(render_text())
+    os.replace(temporary_path, path)
+
+
+_writer_started = False
+_writer_lock = threading.Lock()
+
+
+def start_textfile_writer(path=None, interval=TEXTFILE_INTERVAL_SECONDS):
+    global _writer_started
+    path = path or os.environ.get(TEXTFILE_ENV_VAR)
+    if not path:
+        return False
+    with _writer_lock:
+        if _writer_started:
+            return True
+        _writer_started = True
+
+    def loop():
+        while True:
+            try:
+                write_textfile(path)
+            except OSError:
+                pass
+            time.sleep(interval)
+
+    threading.Thread(target=loop, name="fishlink-metrics", daemon=True).start()
+    return True
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from fishlink import DELIVERY_RATE, haversine_km
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+EARTH_RADIUS_KM = 6371.0
+QUOTE_CACHE_SIZE = 10_000
+
+
+@dataclass(frozen=True)
+class RateCard:
+    version: int = 1
+    base_rate: float = DELIVERY_RATE
+    minimum_fee: float = 0.0
+    tiers: tuple[tuple[float, float], ...] = ()
+    farm_rates: dict = field(default_factory=dict, compare=False, hash=False)
+
+    def fee(self, distance_km: float, farm_id=None) -> float:
+        override = self.farm_rates.get(farm_id)
+        if override is not None:
+            fee = distance_km * override
+        else:
+            fee = 0.0
+            start = 0.0
+            for up_to_km, rate in self.tiers:
+                if distance_km <= start:
+                    break
+                fee += (min(distance_km, up_to_km) - start) * rate
+                start = up_to_km
+            if distance_km > start:
+                fee += (distance_km - start) * self.base_rate
+        return max(fee, self.minimum_fee)
+
+
+DEFAULT_RATE_CARD = RateCard()
+
+_quote_cache: OrderedDict[tuple, float] = OrderedDict()
+_quote_cache_lock = threading.Lock()
+
+
+def _quote_key(restaurant_id, farm_id, rate_card: RateCard) -> tuple:
+    # farm_rates is left out of the card's hash, so key on this farm's rate.
+    return (restaurant_id, farm_id, rate_card, rate_card.farm_rates.get(farm_id))
+
+
+def _cached_fee(key: tuple) -> float | None:
+    with _quote_cache_lock:
+        fee = _quote_cache.get(key)
+        if fee is not None:
+            _quote_cache.move_to_end(key)
+        return fee
+
+
+def _store_fee(key: tuple, fee: float) -> None:
+    with _quote_cache_lock:
+        _quote_cache[key] = fee
+        _quote_cache.move_to_end(key)
+        while len(_quote_cache) > QUOTE_CACHE_SIZE:
+            _quote_cache.popitem(last=False)
+
+
+def _distances_km(lat, lng, farm_points):
+    if np is not None:
+        points = np.asarray(farm_points, dtype=float)
+        phi1 = np.radians(lat)
+        phi2 = np.radians(points[:, 0])
+        delta_phi = phi2 - phi1
+        delta_lambda = np.radians(points[:, 1] - lng)
+        a = (
+            np.sin(delta_phi / 2) ** 2
+            + np.cos(phi1) * np.cos(phi2) * np.sin(delta_lambda / 2) ** 2
+        )
+        c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+        return (EARTH_RADIUS_KM * c).tolist()
+    return [
+        haversine_km(lat, lng, farm_lat, farm_lng) for farm_lat, farm_lng in farm_points
+    ]
+
+
+def quote_farm_fees(restaurant, farms, rate_card=DEFAULT_RATE_CARD):
+    if restaurant is None or restaurant.lat is None or restaurant.lng is None:
+        return {}
+    fees = {}
+    missing = []
+    for farm_id, farm_lat, farm_lng in farms:
+        if farm_lat is None or farm_lng is None:
+            continue
+        cached = _cached_fee(_quote_key(restaurant.id, farm_id, rate_card))
+        if cached is None:
+            missing.append((farm_id, farm_lat, farm_lng))
+        else:
+            fees[farm_id] = cached
+    if missing:
+        distances = _distances_km(
+            restaurant.lat,
+            restaurant.lng,
+            [(farm_lat, farm_lng) for _, farm_lat, farm_lng in missing],
+        )
+        for (farm_id, _, _), distance_km in zip(missing, distances):
+            fee = rate_card.fee(distance_km, farm_id)
+            _store_fee(_quote_key(restaurant.id, farm_id, rate_card), fee)
+            fees[farm_id] = fee
+    return fees
+
+
+def quote_listing_fees(restaurant, listings, rate_card=DEFAULT_RATE_CARD):
+    farms = {
+        listing.farm_id: (listing.farm_id, listing.farm_lat, listing.farm_lng)
+        for listing in listings
+    }
+    farm_fees = quote_farm_fees(restaurant, farms.values(), rate_card)
+    return {
+        listing.id: farm_fees[listing.farm_id]
+        for listing in listings
+        if listing.farm_id in farm_fees
+    }
+
+
+def invalidate_restaurant_quotes(restaurant_id) -> None:
+    with _quote_cache_lock:
+        for key in [key for key in _quote_cache if key[0] == restaurant_id]:
+            del _quote_cache[key]
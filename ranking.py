@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from fishlink import haversine_km
+from repo import (
+    get_restaurant,
+    list_restaurants,
+    list_score_inputs,
+    save_listing_scores,
+)
+
+
+SCORE_WEIGHTS = {
+    "distance": 0.35,
+    "price": 0.25,
+    "rating": 0.2,
+    "slots": 0.1,
+    "quantity": 0.1,
+}
+DISTANCE_SCALE_KM = 10.0
+PRICE_SCALE = 10.0
+QUANTITY_SCALE_KG = 50.0
+NEUTRAL_COMPONENT = 0.5
+
+
+def score_listing(item, restaurant) -> float:
+    if (
+        restaurant is not None
+        and restaurant.lat is not None
+        and restaurant.lng is not None
+        and item.farm_lat is not None
+        and item.farm_lng is not None
+    ):
+        distance_km = haversine_km(
+            restaurant.lat,
+            restaurant.lng,
+            item.farm_lat,
+            item.farm_lng,
+        )
+        distance = 1.0 / (1.0 + distance_km / DISTANCE_SCALE_KM)
+    else:
+        distance = NEUTRAL_COMPONENT
+    price = 1.0 / (1.0 + max(item.price_per_kg, 0.0) / PRICE_SCALE)
+    if item.avg_stars is None:
+        rating = NEUTRAL_COMPONENT
+    else:
+        rating = (item.avg_stars - 1.0) / 4.0
+    slots = (
+        2 * (item.slot_today_morning + item.slot_today_evening)
+        + item.slot_next_morning
+        + item.slot_next_evening
+    ) / 6.0
+    quantity = min(max(item.quantity_kg, 0.0) / QUANTITY_SCALE_KG, 1.0)
+    return (
+        SCORE_WEIGHTS["distance"] * distance
+        + SCORE_WEIGHTS["price"] * price
+        + SCORE_WEIGHTS["rating"] * rating
+        + SCORE_WEIGHTS["slots"] * slots
+        + SCORE_WEIGHTS["quantity"] * quantity
+    )
+
+
+def _save_scores(items, restaurants) -> int:
+    scores = [
+        (restaurant.id, item.listing_id, score_listing(item, restaurant))
+        for restaurant in restaurants
+        for item in items
+    ]
+    save_listing_scores(scores)
+    return len(scores)
+
+
+def refresh_scores_for_restaurant(restaurant_id) -> int:
+    restaurant = get_restaurant(restaurant_id)
+    if restaurant is None:
+        return 0
+    return _save_scores(list_score_inputs(), [restaurant])
+
+
+def refresh_scores_for_listing(listing_id) -> int:
+    return _save_scores(list_score_inputs(listing_id=listing_id), list_restaurants())
+
+
+def refresh_scores_for_farm(farm_id) -> int:
+    return _save_scores(list_score_inputs(farm_id=farm_id), list_restaurants())
+
+
+def refresh_all_scores() -> int:
+    return _save_scores(list_score_inputs(), list_restaurants())
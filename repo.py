@@ -1,14 +1,130 @@
-from db import get_conn
+import time
+from datetime import datetime
 
+from db import connect, connect_readonly, get_conn, read_only
+from fishlink import (
+    LOCAL_TIMEZONE,
+    RequestStatus,
+    TransitionResult,
+    can_transition,
+    local_today,
+    slot_date,
+    slot_period,
+)
+from metrics import REQUEST_TRANSITIONS, REQUESTS_CREATED, TRANSITION_SECONDS
+from rows import (
+    DailySales,
+    DeliveryStop,
+    Farm,
+    Listing,
+    RequestEvent,
+    RequestRow,
+    Restaurant,
+    Review,
+    ScoreInput,
+    SlotUsage,
+)
+from tracing import traced
 
-def _row_to_dict(row):
-    if row is None:
-        return None
-    return dict(row)
+
+COLUMN_BATCH_SIZE = 5000
+ARCHIVE_BATCH_SIZE = 500
+SALES_ROLLUP = "daily_farm_sales"
+LISTING_ROLLOVER = "listing_rollover"
+EXPORT_BATCH_SIZE = 2000
+REQUEST_COLUMNS = (
+    "id",
+    "listing_id",
+    "restaurant_id",
+    "status",
+    "quantity_kg",
+    "preferred_size_text",
+    "fish_condition",
+    "time_slot",
+    "delivery_method",
+    "preferred_time_window",
+    "notes",
+    "distance_km",
+    "created_at",
+    "updated_at",
+)
+EXPORT_ENTITIES = {
+    "requests": {
+        "table": "requests",
+        "date_column": "created_at",
+        "status_column": "status",
+        "farm_condition": "listing_id IN (SELECT id FROM listings WHERE farm_id = ?)",
+    },
+    "listings": {"table": "listings", "farm_condition": "farm_id = ?"},
+    "farms": {"table": "farms", "farm_condition": "id = ?"},
+    "reviews": {"table": "reviews", "farm_condition": "farm_id = ?"},
+}
+
+
+def _fetch_one(conn, row_type, sql, params=()):
+    cursor = conn.cursor()
+    cursor.row_factory = row_type.row_factory
+    return cursor.execute(sql, params).fetchone()
+
+
+def _fetch_all(conn, row_type, sql, params=()):
+    cursor = conn.cursor()
+    cursor.row_factory = row_type.row_factory
+    return cursor.execute(sql, params).fetchall()
+
+
+def _fetch_columns(
+    conn,
+    sql,
+    params=(),
+    batch_size=COLUMN_BATCH_SIZE,
+    as_numpy=False,
+):
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute(sql, params)
+    names = [column[0] for column in cursor.description]
+    values = [[] for _ in names]
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            break
+        for column, batch_values in zip(values, zip(*batch)):
+            column.extend(batch_values)
+    if as_numpy:
+        import numpy as np
+
+        return {name: np.asarray(column) for name, column in zip(names, values)}
+    return {name: tuple(column) for name, column in zip(names, values)}
 
 
-def upsert_restaurant(name, location_text, lat, lng, maps_url, contact):
+@traced
+def upsert_restaurant(
+    name,
+    location_text,
+    lat,
+    lng,
+    maps_url,
+    contact,
+    restaurant_id=None,
+):
     with get_conn() as conn:
+        if restaurant_id is None:
+            cursor = conn.execute(
+                """
+                INSERT INTO restaurants (
+                    name,
+                    location_text,
+                    lat,
+                    lng,
+                    maps_url,
+                    contact
+                )
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (name, location_text, lat, lng, maps_url, contact),
+            )
+            return cursor.lastrowid
         conn.execute(
             """
             INSERT INTO restaurants (
@@ -20,7 +136,7 @@ def upsert_restaurant(name, location_text, lat, lng, maps_url, contact):
                 maps_url,
                 contact
             )
-            VALUES (1, ?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
             ON CONFLICT(id) DO UPDATE SET
                 name = excluded.name,
                 location_text = excluded.location_text,
@@ -29,24 +145,45 @@ def upsert_restaurant(name, location_text, lat, lng, maps_url, contact):
                 maps_url = excluded.maps_url,
                 contact = excluded.contact
             """,
-            (name, location_text, lat, lng, maps_url, contact),
+            (restaurant_id, name, location_text, lat, lng, maps_url, contact),
         )
-    return 1
+    return restaurant_id
 
 
-def get_restaurant(restaurant_id=1):
+@traced
+@read_only
+def get_restaurant(restaurant_id):
     with get_conn() as conn:
-        row = conn.execute(
+        row = _fetch_one(
+            conn,
+            Restaurant,
             """
             SELECT id, name, location_text, lat, lng, maps_url, contact
             FROM restaurants
             WHERE id = ?
             """,
             (restaurant_id,),
-        ).fetchone()
-    return _row_to_dict(row)
+        )
+    return row
+
+
+@traced
+@read_only
+def list_restaurants():
+    with get_conn() as conn:
+        rows = _fetch_all(
+            conn,
+            Restaurant,
+            """
+            SELECT id, name, location_text, lat, lng, maps_url, contact
+            FROM restaurants
+            ORDER BY id
+            """
+        )
+    return rows
 
 
+@traced
 def create_farm(name, location_text, lat, lng, maps_url, contact):
     with get_conn() as conn:
         cursor = conn.execute(
@@ -59,31 +196,40 @@ def create_farm(name, location_text, lat, lng, maps_url, contact):
     return cursor.lastrowid
 
 
+@traced
+@read_only
 def get_farm(farm_id):
     with get_conn() as conn:
-        row = conn.execute(
+        row = _fetch_one(
+            conn,
+            Farm,
             """
             SELECT id, name, location_text, lat, lng, maps_url, contact
             FROM farms
             WHERE id = ?
             """,
             (farm_id,),
-        ).fetchone()
-    return _row_to_dict(row)
+        )
+    return row
 
 
+@traced
+@read_only
 def list_farms():
     with get_conn() as conn:
-        rows = conn.execute(
+        rows = _fetch_all(
+            conn,
+            Farm,
             """
             SELECT id, name, location_text, lat, lng, maps_url, contact
             FROM farms
             ORDER BY id
             """
-        ).fetchall()
-    return [dict(row) for row in rows]
+        )
+    return rows
 
 
+@traced
 def create_listing(
     farm_id,
     fish_name,
@@ -115,9 +261,10 @@ def create_listing(
                 allow_pickup,
                 allow_live,
                 allow_fresh,
-                approx_time
+                approx_time,
+                available_date
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
             (
                 farm_id,
@@ -133,14 +280,52 @@ def create_listing(
                 int(bool(allow_live)),
                 int(bool(allow_fresh)),
                 approx_time,
+                local_today().isoformat(),
             ),
         )
     return cursor.lastrowid
 
 
-def list_listings():
+@traced
+@read_only
+def list_listings(limit=None, offset=0):
+    sql, params = _paginate(
+        """
+        SELECT
+            id,
+            farm_id,
+            fish_name,
+            quantity_kg,
+            price_per_kg,
+            slot_today_morning,
+            slot_today_evening,
+            slot_next_morning,
+            slot_next_evening,
+            allow_delivery,
+            allow_pickup,
+            allow_live,
+            allow_fresh,
+            approx_time,
+            available_date,
+            expired_at
+        FROM listings
+        WHERE expired_at IS NULL
+        ORDER BY id
+        """,
+        [],
+        limit,
+        offset,
+    )
     with get_conn() as conn:
-        rows = conn.execute(
+        return _fetch_all(conn, Listing, sql, params)
+
+
+@traced
+@read_only
+def list_listings_columns(batch_size=COLUMN_BATCH_SIZE, as_numpy=False):
+    with get_conn() as conn:
+        return _fetch_columns(
+            conn,
             """
             SELECT
                 id,
@@ -156,17 +341,25 @@ def list_listings():
                 allow_pickup,
                 allow_live,
                 allow_fresh,
-                approx_time
+                approx_time,
+                available_date
             FROM listings
+            WHERE expired_at IS NULL
             ORDER BY id
-            """
-        ).fetchall()
-    return [dict(row) for row in rows]
+            """,
+            (),
+            batch_size,
+            as_numpy,
+        )
 
 
+@traced
+@read_only
 def get_listing(listing_id):
     with get_conn() as conn:
-        row = conn.execute(
+        row = _fetch_one(
+            conn,
+            Listing,
             """
             SELECT
                 id,
@@ -182,15 +375,73 @@ def get_listing(listing_id):
                 allow_pickup,
                 allow_live,
                 allow_fresh,
-                approx_time
+                approx_time,
+                available_date,
+                expired_at
             FROM listings
             WHERE id = ?
             """,
             (listing_id,),
-        ).fetchone()
-    return _row_to_dict(row)
+        )
+    return row
 
 
+@traced
+def rollover_listings(today=None):
+    today = (today or local_today()).isoformat()
+    with get_conn() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        expired = conn.execute(
+            """
+            UPDATE listings
+            SET expired_at = CURRENT_TIMESTAMP
+            WHERE expired_at IS NULL
+                AND available_date < ?
+                AND (
+                    available_date < date(?, '-1 day')
+                    OR (slot_next_morning = 0 AND slot_next_evening = 0)
+                )
+            """,
+            (today, today),
+        ).rowcount
+        rolled = conn.execute(
+            """
+            UPDATE listings
+            SET
+                slot_today_morning = slot_next_morning,
+                slot_today_evening = slot_next_evening,
+                slot_next_morning = 0,
+                slot_next_evening = 0,
+                available_date = ?
+            WHERE expired_at IS NULL AND available_date < ?
+            """,
+            (today, today),
+        ).rowcount
+        if expired:
+            conn.execute(
+                """
+                DELETE FROM listing_scores
+                WHERE NOT EXISTS (
+                    SELECT 1
+                    FROM listings
+                    WHERE listings.id = listing_scores.listing_id
+                        AND listings.expired_at IS NULL
+                )
+                """
+            )
+        if expired or rolled:
+            conn.execute(
+                """
+                INSERT INTO rollup_state (name, last_seq)
+                VALUES (?, 1)
+                ON CONFLICT(name) DO UPDATE SET last_seq = last_seq + 1
+                """,
+                (LISTING_ROLLOVER,),
+            )
+    return {"expired": expired, "rolled": rolled}
+
+
+@traced
 def create_request(
     listing_id,
     restaurant_id,
@@ -233,10 +484,273 @@ def create_request(
                 notes,
             ),
         )
-    return cursor.lastrowid
+        request_id = cursor.lastrowid
+        _record_request_event(conn, request_id, None, status)
+        _add_slot_usage(
+            conn,
+            listing_id,
+            time_slot,
+            preferred_time_window,
+            quantity_kg,
+        )
+    REQUESTS_CREATED.inc()
+    return request_id
+
+
+def _add_slot_usage(conn, listing_id, time_slot, time_window, quantity_kg):
+    day = slot_date(time_slot, local_today()).isoformat()
+    period = slot_period(time_slot)
+    conn.execute(
+        """
+        INSERT INTO slot_usage (
+            farm_id,
+            slot_date,
+            period,
+            time_window,
+            committed_kg,
+            order_count
+        )
+        SELECT farm_id, ?, ?, ?, ?, 1
+        FROM listings
+        WHERE id = ?
+        ON CONFLICT(farm_id, slot_date, period, time_window) DO UPDATE SET
+            committed_kg = committed_kg + excluded.committed_kg,
+            order_count = order_count + 1
+        """,
+        (day, period, time_window or "", quantity_kg, listing_id),
+    )
+    conn.execute(
+        """
+        INSERT INTO listing_slot_usage (listing_id, slot_date, period, committed_kg)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(listing_id, slot_date, period) DO UPDATE SET
+            committed_kg = committed_kg + excluded.committed_kg
+        """,
+        (listing_id, day, period, quantity_kg),
+    )
+
+
+@traced
+@read_only
+def list_slot_usage(farm_id, slot_dates):
+    slot_dates = [str(value) for value in slot_dates]
+    placeholders = ", ".join("?" for _ in slot_dates)
+    with get_conn() as conn:
+        rows = _fetch_all(
+            conn,
+            SlotUsage,
+            f"""
+            SELECT
+                farm_id,
+                slot_date,
+                period,
+                time_window,
+                committed_kg,
+                order_count
+            FROM slot_usage
+            WHERE farm_id = ? AND slot_date IN ({placeholders})
+            """,
+            [farm_id, *slot_dates],
+        )
+    return {(row.slot_date, row.period, row.time_window): row for row in rows}
+
+
+@traced
+@read_only
+def list_listing_slot_usage(listing_id, slot_dates):
+    slot_dates = [str(value) for value in slot_dates]
+    placeholders = ", ".join("?" for _ in slot_dates)
+    with get_conn() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT slot_date, period, committed_kg
+            FROM listing_slot_usage
+            WHERE listing_id = ? AND slot_date IN ({placeholders})
+            """,
+            [listing_id, *slot_dates],
+        ).fetchall()
+    return {(row["slot_date"], row["period"]): row["committed_kg"] for row in rows}
+
+
+def _requests_select(
+    table,
+    restaurant_id=None,
+    farm_id=None,
+    status=None,
+    statuses=None,
+):
+    columns = ", ".join(f"{table}.{column}" for column in REQUEST_COLUMNS)
+    sql = f"""
+        SELECT {columns}
+        FROM {table}
+        JOIN listings ON listings.id = {table}.listing_id
+    """
+    conditions = []
+    params = []
+    if restaurant_id is not None:
+        conditions.append(f"{table}.restaurant_id = ?")
+        params.append(restaurant_id)
+    if farm_id is not None:
+        conditions.append("listings.farm_id = ?")
+        params.append(farm_id)
+    if status is not None:
+        conditions.append(f"{table}.status = ?")
+        params.append(status)
+    if statuses is not None:
+        statuses = list(statuses)
+        placeholders = ", ".join("?" for _ in statuses)
+        conditions.append(f"{table}.status IN ({placeholders})")
+        params.extend(statuses)
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    return sql, params
+
+
+def _requests_query(restaurant_id=None, farm_id=None, status=None, statuses=None):
+    sql, params = _requests_select(
+        "requests",
+        restaurant_id,
+        farm_id,
+        status,
+        statuses,
+    )
+    sql += " ORDER BY requests.updated_at DESC, requests.id DESC"
+    return sql, params
+
+
+def _paginate(sql, params, limit=None, offset=0):
+    if limit is None and not offset:
+        return sql, params
+    sql += " LIMIT ? OFFSET ?"
+    return sql, [*params, -1 if limit is None else limit, offset]
+
+
+@traced
+@read_only
+def list_requests(
+    restaurant_id=None,
+    farm_id=None,
+    status=None,
+    statuses=None,
+    limit=None,
+    offset=0,
+):
+    sql, params = _requests_query(restaurant_id, farm_id, status, statuses)
+    sql, params = _paginate(sql, params, limit, offset)
+    with get_conn() as conn:
+        return _fetch_all(conn, RequestRow, sql, params)
+
+
+@traced
+@read_only
+def list_requests_columns(
+    restaurant_id=None,
+    farm_id=None,
+    status=None,
+    statuses=None,
+    batch_size=COLUMN_BATCH_SIZE,
+    as_numpy=False,
+):
+    sql, params = _requests_query(restaurant_id, farm_id, status, statuses)
+    with get_conn() as conn:
+        return _fetch_columns(conn, sql, params, batch_size, as_numpy)
+
+
+@traced
+@read_only
+def list_request_history(
+    restaurant_id=None,
+    farm_id=None,
+    status=None,
+    statuses=None,
+    limit=None,
+    offset=0,
+):
+    hot_sql, hot_params = _requests_select(
+        "requests",
+        restaurant_id,
+        farm_id,
+        status,
+        statuses,
+    )
+    archive_sql, archive_params = _requests_select(
+        "requests_archive",
+        restaurant_id,
+        farm_id,
+        status,
+        statuses,
+    )
+    sql = f"""
+        SELECT * FROM ({hot_sql} UNION ALL {archive_sql})
+        ORDER BY updated_at DESC, id DESC
+    """
+    sql, params = _paginate(sql, [*hot_params, *archive_params], limit, offset)
+    with get_conn() as conn:
+        return _fetch_all(conn, RequestRow, sql, params)
+
+
+@traced
+@read_only
+def get_archived_request(request_id):
+    with get_conn() as conn:
+        return _fetch_one(
+            conn,
+            RequestRow,
+            f"""
+            SELECT {", ".join(REQUEST_COLUMNS)}
+            FROM requests_archive
+            WHERE id = ?
+            """,
+            (request_id,),
+        )
 
 
-def list_requests(restaurant_id=None, farm_id=None, status=None):
+@traced
+def archive_completed_requests(older_than_days, batch_size=ARCHIVE_BATCH_SIZE):
+    columns = ", ".join(REQUEST_COLUMNS)
+    archived = 0
+    while True:
+        with get_conn() as conn:
+            request_ids = [
+                row["id"]
+                for row in conn.execute(
+                    """
+                    SELECT id
+                    FROM requests
+                    WHERE status = ? AND updated_at < datetime('now', ?)
+                    ORDER BY updated_at, id
+                    LIMIT ?
+                    """,
+                    (
+                        RequestStatus.COMPLETED.value,
+                        f"-{int(older_than_days)} days",
+                        batch_size,
+                    ),
+                ).fetchall()
+            ]
+            if not request_ids:
+                return archived
+            placeholders = ", ".join("?" for _ in request_ids)
+            conn.execute(
+                f"""
+                INSERT INTO requests_archive ({columns})
+                SELECT {columns}
+                FROM requests
+                WHERE id IN ({placeholders})
+                ORDER BY id
+                """,
+                request_ids,
+            )
+            conn.execute(
+                f"DELETE FROM requests WHERE id IN ({placeholders})",
+                request_ids,
+            )
+        archived += len(request_ids)
+
+
+@traced
+@read_only
+def list_requests_since(since_id, farm_id=None):
     sql = """
         SELECT
             requests.id,
@@ -255,28 +769,142 @@ def list_requests(restaurant_id=None, farm_id=None, status=None):
             requests.updated_at
         FROM requests
         JOIN listings ON listings.id = requests.listing_id
+        WHERE requests.id > ?
+    """
+    params = [since_id]
+    if farm_id is not None:
+        sql += " AND listings.farm_id = ?"
+        params.append(farm_id)
+    sql += " ORDER BY requests.id"
+    with get_conn() as conn:
+        return _fetch_all(conn, RequestRow, sql, params)
+
+
+@traced
+@read_only
+def count_requests_since(since_id, farm_id=None):
+    sql = """
+        SELECT COUNT(*) AS total
+        FROM requests
+        JOIN listings ON listings.id = requests.listing_id
+        WHERE requests.id > ?
+    """
+    params = [since_id]
+    if farm_id is not None:
+        sql += " AND listings.farm_id = ?"
+        params.append(farm_id)
+    with get_conn() as conn:
+        row = conn.execute(sql, params).fetchone()
+    return row["total"]
+
+
+@traced
+@read_only
+def latest_request_id(farm_id=None):
+    sql = """
+        SELECT COALESCE(MAX(requests.id), 0) AS latest
+        FROM requests
+        JOIN listings ON listings.id = requests.listing_id
     """
-    conditions = []
     params = []
-    if restaurant_id is not None:
-        conditions.append("requests.restaurant_id = ?")
-        params.append(restaurant_id)
     if farm_id is not None:
-        conditions.append("listings.farm_id = ?")
+        sql += " WHERE listings.farm_id = ?"
         params.append(farm_id)
-    if status is not None:
-        conditions.append("requests.status = ?")
-        params.append(status)
-    if conditions:
-        sql += " WHERE " + " AND ".join(conditions)
-    sql += " ORDER BY requests.updated_at DESC, requests.id DESC"
     with get_conn() as conn:
-        rows = conn.execute(sql, params).fetchall()
-    return [dict(row) for row in rows]
+        row = conn.execute(sql, params).fetchone()
+    return row["latest"]
+
+
+@traced
+def wait_for_requests(since_id, farm_id=None, timeout=30.0, poll_interval=0.5):
+    new_requests = list_requests_since(since_id, farm_id=farm_id)
+    if new_requests:
+        return new_requests
+    deadline = time.monotonic() + timeout
+    conn = connect()
+    try:
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return []
+            time.sleep(min(poll_interval, remaining))
+            current = conn.execute("PRAGMA data_version").fetchone()[0]
+            if current == version:
+                continue
+            version = current
+            new_requests = list_requests_since(since_id, farm_id=farm_id)
+            if new_requests:
+                return new_requests
+    finally:
+        conn.close()
+
+
+def _begin_immediate(conn):
+    # The group-commit writer already holds a write transaction.
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+
+
+def _record_request_event(conn, request_id, from_status, to_status):
+    conn.execute(
+        """
+        INSERT INTO request_events (request_id, from_status, to_status)
+        VALUES (?, ?, ?)
+        """,
+        (request_id, from_status, to_status),
+    )
+
+
+@traced
+@read_only
+def list_ready_deliveries(farm_id=None):
+    sql = """
+        SELECT
+            requests.id,
+            farms.id,
+            requests.time_slot,
+            requests.quantity_kg,
+            listings.fish_name,
+            requests.restaurant_id,
+            restaurants.name,
+            restaurants.location_text,
+            restaurants.maps_url,
+            restaurants.lat,
+            restaurants.lng,
+            farms.lat,
+            farms.lng
+        FROM requests
+        JOIN listings ON listings.id = requests.listing_id
+        JOIN farms ON farms.id = listings.farm_id
+        LEFT JOIN restaurants ON restaurants.id = requests.restaurant_id
+        WHERE requests.status = ? AND requests.delivery_method = ?
+    """
+    params = [RequestStatus.READY.value, "Delivery"]
+    if farm_id is not None:
+        sql += " AND listings.farm_id = ?"
+        params.append(farm_id)
+    sql += " ORDER BY requests.id"
+    with get_conn() as conn:
+        return _fetch_all(conn, DeliveryStop, sql, params)
 
 
+@traced
 def update_request_status(request_id, new_status):
+    new_status = RequestStatus(new_status).value
+    started = time.perf_counter()
     with get_conn() as conn:
+        _begin_immediate(conn)
+        row = conn.execute(
+            "SELECT status FROM requests WHERE id = ?",
+            (request_id,),
+        ).fetchone()
+        if row is None:
+            return
+        if not can_transition(row["status"], new_status):
+            raise ValueError(
+                f"invalid status transition: {row['status']} -> {new_status}"
+            )
         conn.execute(
             """
             UPDATE requests
@@ -285,11 +913,182 @@ def update_request_status(request_id, new_status):
             """,
             (new_status, request_id),
         )
+        _record_request_event(conn, request_id, row["status"], new_status)
+        if new_status == RequestStatus.COMPLETED.value:
+            _apply_sales_rollups(conn)
+    TRANSITION_SECONDS.observe(time.perf_counter() - started)
+    REQUEST_TRANSITIONS.inc(1, new_status)
 
 
-def get_request(request_id):
+@traced
+def bulk_update_request_status(request_ids, new_status):
+    new_status = RequestStatus(new_status).value
+    request_ids = list(dict.fromkeys(request_ids))
+    if not request_ids:
+        return []
+    placeholders = ", ".join("?" for _ in request_ids)
+    started = time.perf_counter()
+    with get_conn() as conn:
+        _begin_immediate(conn)
+        current = {
+            row["id"]: row["status"]
+            for row in conn.execute(
+                f"SELECT id, status FROM requests WHERE id IN ({placeholders})",
+                request_ids,
+            ).fetchall()
+        }
+        results = []
+        valid = []
+        for request_id in request_ids:
+            status = current.get(request_id)
+            if status is None:
+                results.append(
+                    TransitionResult(request_id, False, "request not found")
+                )
+            elif can_transition(status, new_status):
+                results.append(TransitionResult(request_id, True))
+                valid.append((request_id, status))
+            else:
+                results.append(
+                    TransitionResult(
+                        request_id,
+                        False,
+                        f"invalid status transition: {status} -> {new_status}",
+                    )
+                )
+        conn.executemany(
+            """
+            UPDATE requests
+            SET status = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+            """,
+            [(new_status, request_id) for request_id, _ in valid],
+        )
+        conn.executemany(
+            """
+            INSERT INTO request_events (request_id, from_status, to_status)
+            VALUES (?, ?, ?)
+            """,
+            [(request_id, status, new_status) for request_id, status in valid],
+        )
+        if valid and new_status == RequestStatus.COMPLETED.value:
+            _apply_sales_rollups(conn)
+    TRANSITION_SECONDS.observe(time.perf_counter() - started)
+    if valid:
+        REQUEST_TRANSITIONS.inc(len(valid), new_status)
+    return results
+
+
+@traced
+@read_only
+def events_since(seq=0, limit=None):
+    sql = """
+        SELECT seq, request_id, from_status, to_status, created_at
+        FROM request_events
+        WHERE seq > ?
+        ORDER BY seq
+    """
+    params = [seq]
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    with get_conn() as conn:
+        return _fetch_all(conn, RequestEvent, sql, params)
+
+
+@traced
+@read_only
+def list_request_events(request_id):
+    with get_conn() as conn:
+        rows = _fetch_all(
+            conn,
+            RequestEvent,
+            """
+            SELECT seq, request_id, from_status, to_status, created_at
+            FROM request_events
+            WHERE request_id = ?
+            ORDER BY seq
+            """,
+            (request_id,),
+        )
+    return rows
+
+
+@traced
+@read_only
+def get_requests(request_ids):
+    request_ids = list(request_ids)
+    placeholders = ", ".join("?" for _ in request_ids)
+    with get_conn() as conn:
+        return _fetch_all(
+            conn,
+            RequestRow,
+            f"""
+            SELECT
+                id,
+                listing_id,
+                restaurant_id,
+                status,
+                quantity_kg,
+                preferred_size_text,
+                fish_condition,
+                time_slot,
+                delivery_method,
+                preferred_time_window,
+                notes,
+                distance_km,
+                created_at,
+                updated_at
+            FROM requests
+            WHERE id IN ({placeholders})
+            ORDER BY id
+            """,
+            request_ids,
+        )
+
+
+@traced
+@read_only
+def requests_version():
     with get_conn() as conn:
         row = conn.execute(
+            """
+            SELECT
+                COALESCE((SELECT MAX(seq) FROM request_events), 0)
+                + COALESCE((SELECT MAX(archive_seq) FROM requests_archive), 0)
+                AS version
+            """
+        ).fetchone()
+    return row["version"]
+
+
+@traced
+@read_only
+def listings_version():
+    with get_conn() as conn:
+        row = conn.execute(
+            """
+            SELECT
+                (SELECT COALESCE(MAX(id), 0) FROM listings) AS max_id,
+                (SELECT COUNT(*) FROM listings WHERE expired_at IS NULL) AS live,
+                (
+                    SELECT COALESCE(MAX(last_seq), 0)
+                    FROM rollup_state
+                    WHERE name = ?
+                ) AS rollovers
+            """,
+            (LISTING_ROLLOVER,),
+        ).fetchone()
+    return f"{row['max_id']}-{row['live']}-{row['rollovers']}"
+
+
+@traced
+@read_only
+def get_request(request_id):
+    with get_conn() as conn:
+        row = _fetch_one(
+            conn,
+            RequestRow,
             """
             SELECT
                 id,
@@ -310,10 +1109,11 @@ def get_request(request_id):
             WHERE id = ?
             """,
             (request_id,),
-        ).fetchone()
-    return _row_to_dict(row)
+        )
+    return row
 
 
+@traced
 def create_review(request_id, farm_id, restaurant_id, stars, comment):
     with get_conn() as conn:
         cursor = conn.execute(
@@ -326,6 +1126,8 @@ def create_review(request_id, farm_id, restaurant_id, stars, comment):
     return cursor.lastrowid
 
 
+@traced
+@read_only
 def avg_rating_for_farm(farm_id):
     with get_conn() as conn:
         row = conn.execute(
@@ -341,14 +1143,312 @@ def avg_rating_for_farm(farm_id):
     return float(row["avg_stars"])
 
 
+@traced
+@read_only
 def get_review_by_request(request_id):
     with get_conn() as conn:
-        row = conn.execute(
+        row = _fetch_one(
+            conn,
+            Review,
             """
             SELECT id, request_id, farm_id, restaurant_id, stars, comment
             FROM reviews
             WHERE request_id = ?
             """,
             (request_id,),
-        ).fetchone()
-    return _row_to_dict(row)
+        )
+    return row
+
+
+@traced
+@read_only
+def list_score_inputs(listing_id=None, farm_id=None):
+    sql = """
+        SELECT
+            listings.id,
+            farms.id,
+            listings.quantity_kg,
+            listings.price_per_kg,
+            listings.slot_today_morning,
+            listings.slot_today_evening,
+            listings.slot_next_morning,
+            listings.slot_next_evening,
+            farms.lat,
+            farms.lng,
+            (
+                SELECT AVG(stars)
+                FROM reviews
+                WHERE reviews.farm_id = farms.id
+            )
+        FROM listings
+        JOIN farms ON farms.id = listings.farm_id
+    """
+    conditions = ["listings.expired_at IS NULL"]
+    params = []
+    if listing_id is not None:
+        conditions.append("listings.id = ?")
+        params.append(listing_id)
+    if farm_id is not None:
+        conditions.append("farms.id = ?")
+        params.append(farm_id)
+    sql += " WHERE " + " AND ".join(conditions)
+    with get_conn() as conn:
+        return _fetch_all(conn, ScoreInput, sql, params)
+
+
+@traced
+def save_listing_scores(scores):
+    with get_conn() as conn:
+        conn.executemany(
+            """
+            INSERT INTO listing_scores (restaurant_id, listing_id, score)
+            VALUES (?, ?, ?)
+            ON CONFLICT(restaurant_id, listing_id) DO UPDATE SET
+                score = excluded.score,
+                computed_at = CURRENT_TIMESTAMP
+            """,
+            scores,
+        )
+
+
+@traced
+@read_only
+def ranked_listing_ids(restaurant_id):
+    with get_conn() as conn:
+        rows = conn.execute(
+            """
+            SELECT listing_id
+            FROM listing_scores
+            WHERE restaurant_id = ?
+            ORDER BY score DESC, listing_id
+            """,
+            (restaurant_id,),
+        ).fetchall()
+    return [row["listing_id"] for row in rows]
+
+
+def _export_query(entity, since, until, statuses, farm_id, include_archived):
+    spec = EXPORT_ENTITIES[entity]
+    conditions = []
+    params = []
+    for name, value, key in (
+        ("since", since, "date_column"),
+        ("until", until, "date_column"),
+        ("statuses", statuses, "status_column"),
+        ("farm_id", farm_id, "farm_condition"),
+    ):
+        if value is not None and key not in spec:
+            raise ValueError(f"{entity} export does not support the {name} filter")
+    if since is not None:
+        conditions.append(f"{spec['date_column']} >= ?")
+        params.append(str(since))
+    if until is not None:
+        conditions.append(f"{spec['date_column']} < date(?, '+1 day')")
+        params.append(str(until))
+    if statuses is not None:
+        statuses = list(statuses)
+        placeholders = ", ".join("?" for _ in statuses)
+        conditions.append(f"{spec['status_column']} IN ({placeholders})")
+        params.extend(statuses)
+    if farm_id is not None:
+        conditions.append(spec["farm_condition"])
+        params.append(farm_id)
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    if entity == "requests":
+        columns = ", ".join(REQUEST_COLUMNS)
+        sql = f"SELECT {columns} FROM requests{where}"
+        if include_archived:
+            sql = (
+                f"SELECT * FROM ({sql} UNION ALL "
+                f"SELECT {columns} FROM requests_archive{where})"
+            )
+            params = params * 2
+    elif include_archived:
+        raise ValueError("only requests have an archive")
+    else:
+        sql = f"SELECT * FROM {spec['table']}{where}"
+    return f"{sql} ORDER BY id", params
+
+
+def iter_export_rows(
+    entity,
+    since=None,
+    until=None,
+    statuses=None,
+    farm_id=None,
+    include_archived=False,
+    batch_size=EXPORT_BATCH_SIZE,
+):
+    sql, params = _export_query(
+        entity,
+        since,
+        until,
+        statuses,
+        farm_id,
+        include_archived,
+    )
+    conn = connect_readonly()
+    try:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(sql, params)
+        yield tuple(column[0] for column in cursor.description)
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                return
+            yield from batch
+    finally:
+        conn.close()
+
+
+def _local_date_modifier():
+    offset = datetime.now(LOCAL_TIMEZONE).utcoffset()
+    return f"{int(offset.total_seconds()):+d} seconds"
+
+
+def _apply_sales_rollups(conn):
+    row = conn.execute(
+        "SELECT last_seq FROM rollup_state WHERE name = ?",
+        (SALES_ROLLUP,),
+    ).fetchone()
+    last_seq = row["last_seq"] if row else 0
+    high_seq = conn.execute(
+        "SELECT COALESCE(MAX(seq), 0) FROM request_events"
+    ).fetchone()[0]
+    if high_seq <= last_seq:
+        return 0
+    params = (_local_date_modifier(), last_seq, high_seq)
+    for table in ("requests", "requests_archive"):
+        completed = f"""
+            SELECT
+                CAST(listings.farm_id AS INTEGER) AS farm_id,
+                date(request_events.created_at, ?) AS sale_date,
+                {table}.quantity_kg AS kg,
+                {table}.quantity_kg * listings.price_per_kg AS revenue,
+                CAST(
+                    ROUND(
+                        (
+                            julianday(request_events.created_at)
+                            - julianday({table}.created_at)
+                        ) * 1440
+                    ) AS INTEGER
+                ) AS lead_minutes
+            FROM request_events
+            JOIN {table} ON {table}.id = request_events.request_id
+            JOIN listings ON listings.id = {table}.listing_id
+            WHERE request_events.seq > ?
+                AND request_events.seq <= ?
+                AND request_events.to_status = 'Completed'
+                AND request_events.from_status IS NOT 'Completed'
+        """
+        conn.execute(
+            f"""
+            INSERT INTO daily_farm_sales (farm_id, sale_date, kg, revenue, order_count)
+            SELECT farm_id, sale_date, SUM(kg), SUM(revenue), COUNT(*)
+            FROM ({completed})
+            GROUP BY farm_id, sale_date
+            ON CONFLICT(farm_id, sale_date) DO UPDATE SET
+                kg = kg + excluded.kg,
+                revenue = revenue + excluded.revenue,
+                order_count = order_count + excluded.order_count
+            """,
+            params,
+        )
+        conn.execute(
+            f"""
+            INSERT INTO daily_lead_times (farm_id, sale_date, lead_minutes, order_count)
+            SELECT farm_id, sale_date, lead_minutes, COUNT(*)
+            FROM ({completed})
+            GROUP BY farm_id, sale_date, lead_minutes
+            ON CONFLICT(farm_id, sale_date, lead_minutes) DO UPDATE SET
+                order_count = order_count + excluded.order_count
+            """,
+            params,
+        )
+    conn.execute(
+        """
+        INSERT INTO rollup_state (name, last_seq)
+        VALUES (?, ?)
+        ON CONFLICT(name) DO UPDATE SET last_seq = excluded.last_seq
+        """,
+        (SALES_ROLLUP, high_seq),
+    )
+    return high_seq - last_seq
+
+
+@traced
+def refresh_sales_rollups():
+    with get_conn() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        return _apply_sales_rollups(conn)
+
+
+def _median_from_counts(counts):
+    total = sum(count for _, count in counts)
+    middle = {(total - 1) // 2, total // 2}
+    picked = []
+    position = 0
+    for value, count in counts:
+        for index in sorted(middle):
+            if position <= index < position + count:
+                picked.append(value)
+        position += count
+    return sum(picked) / len(picked)
+
+
+@traced
+@read_only
+def list_daily_sales(farm_id=None, since=None, until=None):
+    group = "farm_id, sale_date" if farm_id is not None else "sale_date"
+    farm_column = "farm_id" if farm_id is not None else "NULL"
+    conditions = []
+    params = []
+    if farm_id is not None:
+        conditions.append("farm_id = ?")
+        params.append(farm_id)
+    if since is not None:
+        conditions.append("sale_date >= ?")
+        params.append(str(since))
+    if until is not None:
+        conditions.append("sale_date <= ?")
+        params.append(str(until))
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    with get_conn() as conn:
+        sales = _fetch_all(
+            conn,
+            DailySales,
+            f"""
+            SELECT {farm_column}, sale_date, SUM(kg), SUM(revenue), SUM(order_count)
+            FROM daily_farm_sales{where}
+            GROUP BY {group}
+            ORDER BY sale_date
+            """,
+            params,
+        )
+        lead_counts = {}
+        for row in conn.execute(
+            f"""
+            SELECT sale_date, lead_minutes, SUM(order_count) AS order_count
+            FROM daily_lead_times{where}
+            GROUP BY sale_date, lead_minutes
+            ORDER BY sale_date, lead_minutes
+            """,
+            params,
+        ):
+            lead_counts.setdefault(row["sale_date"], []).append(
+                (row["lead_minutes"], row["order_count"])
+            )
+    return [
+        DailySales(
+            day.farm_id,
+            day.sale_date,
+            day.kg,
+            day.revenue,
+            day.order_count,
+            _median_from_counts(lead_counts[day.sale_date])
+            if day.sale_date in lead_counts
+            else None,
+        )
+        for day in sales
+    ]
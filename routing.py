@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from fishlink import haversine_km
+
+
+MAX_TWO_OPT_PASSES = 50
+
+
+@dataclass
+class DeliveryRun:
+    time_slot: str
+    farm_id: int
+    depot: tuple[float, float] | None
+    stops: list = field(default_factory=list)
+    unlocated: list = field(default_factory=list)
+    distance_km: float = 0.0
+
+
+def _distance_matrix(points):
+    return [
+        [haversine_km(lat1, lng1, lat2, lng2) for lat2, lng2 in points]
+        for lat1, lng1 in points
+    ]
+
+
+def _path_length(path, dist):
+    return sum(dist[a][b] for a, b in zip(path, path[1:]))
+
+
+def _nearest_neighbour(dist, count):
+    path = [0]
+    remaining = set(range(1, count))
+    current = 0
+    while remaining:
+        row = dist[current]
+        current = min(remaining, key=row.__getitem__)
+        remaining.remove(current)
+        path.append(current)
+    return path
+
+
+def _two_opt(path, dist, max_passes=MAX_TWO_OPT_PASSES):
+    last = len(path) - 1
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, last):
+            a = path[i - 1]
+            b = path[i]
+            dist_a = dist[a]
+            dist_b = dist[b]
+            base = dist_a[b]
+            for j in range(i + 1, last + 1):
+                c = path[j]
+                if j < last:
+                    d = path[j + 1]
+                    delta = dist_a[c] + dist_b[d] - base - dist[c][d]
+                else:
+                    delta = dist_a[c] - base
+                if delta < -1e-9:
+                    path[i : j + 1] = path[i : j + 1][::-1]
+                    improved = True
+                    b = path[i]
+                    dist_b = dist[b]
+                    base = dist_a[b]
+        if not improved:
+            break
+    return path
+
+
+def plan_route(depot, stops, max_passes=MAX_TWO_OPT_PASSES):
+    if not stops:
+        return [], 0.0
+    points = [depot] + list(stops)
+    dist = _distance_matrix(points)
+    path = _two_opt(_nearest_neighbour(dist, len(points)), dist, max_passes)
+    return [index - 1 for index in path[1:]], _path_length(path, dist)
+
+
+def plan_delivery_runs(deliveries, max_passes=MAX_TWO_OPT_PASSES):
+    groups = defaultdict(list)
+    for delivery in deliveries:
+        groups[(delivery.time_slot, delivery.farm_id)].append(delivery)
+    runs = []
+    for (time_slot, farm_id), items in groups.items():
+        first = items[0]
+        located = []
+        unlocated = []
+        for item in items:
+            if item.restaurant_lat is None or item.restaurant_lng is None:
+                unlocated.append(item)
+            else:
+                located.append(item)
+        if first.farm_lat is None or first.farm_lng is None:
+            runs.append(DeliveryRun(time_slot, farm_id, None, located, unlocated))
+            continue
+        depot = (first.farm_lat, first.farm_lng)
+        order, distance_km = plan_route(
+            depot,
+            [(item.restaurant_lat, item.restaurant_lng) for item in located],
+            max_passes,
+        )
+        runs.append(
+            DeliveryRun(
+                time_slot,
+                farm_id,
+                depot,
+                [located[index] for index in order],
+                unlocated,
+                distance_km,
+            )
+        )
+    runs.sort(key=lambda run: (run.time_slot, str(run.farm_id)))
+    return runs
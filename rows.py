@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+from functools import cache
+
+from fishlink import FarmerListing, Request, RequestStatus
+
+
+class _Row:
+    __slots__ = ()
+
+    @classmethod
+    def row_factory(cls, cursor, row):
+        return cls(*row)
+
+    @classmethod
+    @cache
+    def field_names(cls) -> tuple[str, ...]:
+        return tuple(item.name for item in fields(cls))
+
+    def keys(self) -> tuple[str, ...]:
+        return self.field_names()
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.field_names()
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+
+@dataclass(frozen=True, slots=True)
+class Farm(_Row):
+    id: int
+    name: str
+    location_text: str
+    lat: float | None
+    lng: float | None
+    maps_url: str | None
+    contact: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class Restaurant(_Row):
+    id: int
+    name: str
+    location_text: str
+    lat: float | None
+    lng: float | None
+    maps_url: str | None
+    contact: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class Listing(_Row):
+    id: int
+    farm_id: str
+    fish_name: str | None
+    quantity_kg: float
+    price_per_kg: float
+    slot_today_morning: int
+    slot_today_evening: int
+    slot_next_morning: int
+    slot_next_evening: int
+    allow_delivery: int
+    allow_pickup: int
+    allow_live: int
+    allow_fresh: int
+    approx_time: str | None
+    available_date: str | None = None
+    expired_at: str | None = None
+
+    def to_farmer_listing(self, farm: Farm) -> FarmerListing:
+        return FarmerListing(
+            listing_id=str(self.id),
+            farmer_name=farm.name,
+            location=farm.location_text,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class RequestRow(_Row):
+    id: int
+    listing_id: int
+    restaurant_id: int
+    status: str
+    quantity_kg: float
+    preferred_size_text: str | None
+    fish_condition: str
+    time_slot: str
+    delivery_method: str
+    preferred_time_window: str | None
+    notes: str | None
+    distance_km: float | None
+    created_at: str
+    updated_at: str
+
+    def to_request(self, listing: FarmerListing) -> Request:
+        return Request(
+            request_id=str(self.id),
+            listing=listing,
+            distance_km=self.distance_km or 0.0,
+            status=RequestStatus(self.status),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class RequestEvent(_Row):
+    seq: int
+    request_id: int
+    from_status: str | None
+    to_status: str
+    created_at: str
+
+
+@dataclass(frozen=True, slots=True)
+class Review(_Row):
+    id: int
+    request_id: int
+    farm_id: int
+    restaurant_id: int
+    stars: int
+    comment: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class ListingCard(_Row):
+    id: int
+    farm_id: str
+    name: str
+    farm_location_text: str
+    farm_lat: float | None
+    farm_lng: float | None
+    farm_maps_url: str | None
+    farm_contact: str
+    fish_name: str | None
+    quantity_kg: float
+    price_per_kg: float
+    time_slots: list[str]
+    delivery_methods: list[str]
+    fish_conditions: list[str]
+    approx_time: str
+
+
+@dataclass(frozen=True, slots=True)
+class ScoreInput(_Row):
+    listing_id: int
+    farm_id: int
+    quantity_kg: float
+    price_per_kg: float
+    slot_today_morning: int
+    slot_today_evening: int
+    slot_next_morning: int
+    slot_next_evening: int
+    farm_lat: float | None
+    farm_lng: float | None
+    avg_stars: float | None
+
+
+@dataclass(frozen=True, slots=True)
+class DeliveryStop(_Row):
+    request_id: int
+    farm_id: int
+    time_slot: str
+    quantity_kg: float
+    fish_name: str | None
+    restaurant_id: int
+    restaurant_name: str | None
+    restaurant_location_text: str | None
+    restaurant_maps_url: str | None
+    restaurant_lat: float | None
+    restaurant_lng: float | None
+    farm_lat: float | None
+    farm_lng: float | None
+
+
+@dataclass(frozen=True, slots=True)
+class SlotUsage(_Row):
+    farm_id: int
+    slot_date: str
+    period: str
+    time_window: str
+    committed_kg: float
+    order_count: int
+
+
+@dataclass(frozen=True, slots=True)
+class DailySales(_Row):
+    farm_id: int | None
+    sale_date: str
+    kg: float
+    revenue: float
+    order_count: int
+    median_lead_minutes: float | None = None
@@ -0,0 +1,122 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+from metrics import SLOW_QUERIES
+
+
+SLOW_QUERY_MS_ENV_VAR = "FISHLINK_SLOW_QUERY_MS"
+SLOW_QUERY_LOG_ENV_VAR = "FISHLINK_SLOW_QUERY_LOG"
+DEFAULT_LOG_PATH = "fishlink-slow-queries.log"
+MAX_LOG_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+EXPLAINABLE_PREFIXES = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+logger = logging.getLogger("fishlink.slow_queries")
+logger.propagate = False
+
+_threshold = None
+_state = threading.local()
+
+
+def configure(threshold_ms=None, path=None):
+    global _threshold
+    if threshold_ms is None:
+        threshold_ms = os.environ.get(SLOW_QUERY_MS_ENV_VAR)
+    path = path or os.environ.get(SLOW_QUERY_LOG_ENV_VAR, DEFAULT_LOG_PATH)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    if threshold_ms in (None, ""):
+        _threshold = None
+        return
+    handler = RotatingFileHandler(
+        path,
+        maxBytes=MAX_LOG_BYTES,
+        backupCount=LOG_BACKUP_COUNT,
+        encoding="utf-8",
+    )
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.WARNING)
+    _threshold = float(threshold_ms) / 1000
+
+
+class QueryWatch:
+    def __init__(self):
+        self._stack = []
+        self._open_statement = None
+        self._slow = []
+
+    def enter(self, name):
+        self._close_statement()
+        self._stack.append(name)
+
+    def exit(self):
+        self._close_statement()
+        self._stack.pop()
+        if not self._stack and self._slow:
+            slow, self._slow = self._slow, []
+            for function, sql, seconds in slow:
+                _log(function, sql, seconds)
+
+    def on_statement(self, sql):
+        now = time.perf_counter()
+        self._close_statement(now)
+        name = self._stack[-1] if self._stack else "<direct>"
+        self._open_statement = (name, sql, now)
+
+    def _close_statement(self, now=None):
+        if self._open_statement is None:
+            return
+        name, sql, started = self._open_statement
+        self._open_statement = None
+        seconds = (now or time.perf_counter()) - started
+        if _threshold is not None and seconds >= _threshold:
+            self._slow.append((name, sql, seconds))
+
+
+def current_watch():
+    if _threshold is None:
+        return None
+    watch = getattr(_state, "watch", None)
+    if watch is None:
+        watch = _state.watch = QueryWatch()
+    return watch
+
+
+def explain_query_plan(sql):
+    if not sql.lstrip().upper().startswith(EXPLAINABLE_PREFIXES):
+        return []
+    from db import connect
+
+    conn = connect()
+    try:
+        return [
+            f"{row['id']} {row['parent']} {row['detail']}"
+            for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+        ]
+    finally:
+        conn.close()
+
+
+def _log(function, sql, seconds):
+    SLOW_QUERIES.inc(1, function)
+    try:
+        plan = explain_query_plan(sql)
+    except sqlite3.Error as exc:
+        plan = [f"unavailable: {exc}"]
+    lines = [
+        f"slow query {seconds * 1000:.1f} ms in {function}",
+        f"  sql: {' '.join(sql.split())}",
+    ]
+    if plan:
+        lines.append("  plan:")
+        lines.extend(f"    {line}" for line in plan)
+    logger.warning("\n".join(lines))
+
+
+configure()
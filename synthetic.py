@@ -0,0 +1,260 @@
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from db import get_conn, init_db
+from fishlink import RequestStatus, local_today
+
+
+STATUS_PATH = [status.value for status in RequestStatus]
+TIME_SLOTS = ["Today Morning", "Today Evening", "Next-day Morning", "Next-day Evening"]
+WINDOWS = {
+    "Morning": ["7–8", "8–9", "Any morning"],
+    "Evening": ["15–16", "16–17", "Any evening"],
+}
+FISH_NAMES = ["Tilapia", "Catfish", "Snakehead", "Pangasius", "Carp", "Mackerel"]
+INSERT_BATCH_SIZE = 10_000
+
+
+def scale_for(request_count):
+    return {
+        "farms": max(1, request_count // 100),
+        "listings": max(1, request_count // 20),
+        "restaurants": max(1, request_count // 200),
+        "requests": request_count,
+    }
+
+
+def _batched(rows, size=INSERT_BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _timestamp(value):
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def generate(
+    farms,
+    listings,
+    restaurants,
+    requests,
+    review_ratio=0.5,
+    with_events=True,
+    seed=0,
+    start=datetime(2026, 1, 1),
+    days=90,
+):
+    rng = random.Random(seed)
+    init_db()
+    with get_conn() as conn:
+        if conn.execute("SELECT 1 FROM farms LIMIT 1").fetchone() is not None:
+            raise ValueError("synthetic data requires an empty database")
+        conn.executemany(
+            """
+            INSERT INTO farms (id, name, location_text, lat, lng, maps_url, contact)
+            VALUES (?, ?, ?, ?, ?, '', '')
+            """,
+            (
+                (
+                    farm_id,
+                    f"Farm {farm_id}",
+                    f"Village {farm_id % 97}",
+                    11.0 + rng.uniform(0, 2.5),
+                    103.5 + rng.uniform(0, 2.5),
+                )
+                for farm_id in range(1, farms + 1)
+            ),
+        )
+        conn.executemany(
+            """
+            INSERT INTO restaurants (id, name, location_text, lat, lng, maps_url, contact)
+            VALUES (?, ?, ?, ?, ?, '', '')
+            """,
+            (
+                (
+                    restaurant_id,
+                    f"Restaurant {restaurant_id}",
+                    f"Street {restaurant_id}",
+                    11.5 + rng.uniform(-0.1, 0.1),
+                    104.9 + rng.uniform(-0.1, 0.1),
+                )
+                for restaurant_id in range(1, restaurants + 1)
+            ),
+        )
+        listing_farms = [rng.randint(1, farms) for _ in range(listings)]
+        available_date = local_today().isoformat()
+        for batch in _batched(
+            (
+                listing_id,
+                listing_farms[listing_id - 1],
+                rng.choice(FISH_NAMES),
+                float(rng.randint(10, 500)),
+                round(rng.uniform(1.5, 9.0), 2),
+                rng.randint(0, 1),
+                rng.randint(0, 1),
+                rng.randint(0, 1),
+                1,
+                1,
+                rng.randint(0, 1),
+                rng.randint(0, 1),
+                1,
+                "",
+                available_date,
+            )
+            for listing_id in range(1, listings + 1)
+        ):
+            conn.executemany(
+                """
+                INSERT INTO listings (
+                    id,
+                    farm_id,
+                    fish_name,
+                    quantity_kg,
+                    price_per_kg,
+                    slot_today_morning,
+                    slot_today_evening,
+                    slot_next_morning,
+                    slot_next_evening,
+                    allow_delivery,
+                    allow_pickup,
+                    allow_live,
+                    allow_fresh,
+                    approx_time,
+                    available_date
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                batch,
+            )
+
+        span_seconds = days * 24 * 3600
+        request_rows = []
+        event_rows = []
+        review_rows = []
+        for request_id in range(1, requests + 1):
+            listing_id = rng.randint(1, listings)
+            restaurant_id = rng.randint(1, restaurants)
+            status_index = rng.randrange(len(STATUS_PATH))
+            created = start + timedelta(seconds=rng.randrange(span_seconds))
+            updated = created
+            if with_events:
+                event_rows.append((request_id, None, STATUS_PATH[0], _timestamp(created)))
+            for step in range(1, status_index + 1):
+                updated += timedelta(minutes=rng.randint(10, 240))
+                if with_events:
+                    event_rows.append(
+                        (
+                            request_id,
+                            STATUS_PATH[step - 1],
+                            STATUS_PATH[step],
+                            _timestamp(updated),
+                        )
+                    )
+            time_slot = rng.choice(TIME_SLOTS)
+            request_rows.append(
+                (
+                    request_id,
+                    listing_id,
+                    restaurant_id,
+                    STATUS_PATH[status_index],
+                    float(rng.randint(1, 40)),
+                    rng.choice(["", "600-800", "700"]),
+                    rng.choice(["Live", "Chilled", "Frozen"]),
+                    time_slot,
+                    rng.choice(["Delivery", "Pickup"]),
+                    rng.choice(WINDOWS[time_slot.split()[-1]]),
+                    "",
+                    _timestamp(created),
+                    _timestamp(updated),
+                )
+            )
+            if (
+                STATUS_PATH[status_index] == RequestStatus.COMPLETED.value
+                and rng.random() < review_ratio
+            ):
+                review_rows.append(
+                    (
+                        request_id,
+                        listing_farms[listing_id - 1],
+                        restaurant_id,
+                        rng.randint(1, 5),
+                        "",
+                    )
+                )
+            if len(request_rows) >= INSERT_BATCH_SIZE:
+                _flush(conn, request_rows, event_rows, review_rows)
+        _flush(conn, request_rows, event_rows, review_rows)
+    return {
+        "farms": farms,
+        "listings": listings,
+        "restaurants": restaurants,
+        "requests": requests,
+    }
+
+
+def _flush(conn, request_rows, event_rows, review_rows):
+    conn.executemany(
+        """
+        INSERT INTO requests (
+            id,
+            listing_id,
+            restaurant_id,
+            status,
+            quantity_kg,
+            preferred_size_text,
+            fish_condition,
+            time_slot,
+            delivery_method,
+            preferred_time_window,
+            notes,
+            created_at,
+            updated_at
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        request_rows,
+    )
+    conn.executemany(
+        """
+        INSERT INTO request_events (request_id, from_status, to_status, created_at)
+        VALUES (?, ?, ?, ?)
+        """,
+        event_rows,
+    )
+    conn.executemany(
+        """
+        INSERT INTO reviews (request_id, farm_id, restaurant_id, stars, comment)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        review_rows,
+    )
+    request_rows.clear()
+    event_rows.clear()
+    review_rows.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fill the FishLink database with seeded synthetic data"
+    )
+    parser.add_argument("requests", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-events", action="store_true")
+    args = parser.parse_args()
+    counts = generate(
+        **scale_for(args.requests),
+        with_events=not args.no_events,
+        seed=args.seed,
+    )
+    print(", ".join(f"{name}: {count}" for name, count in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import json
+import threading
+import unittest
+from unittest import mock
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from api import make_server
+from fixtures import DatabaseTestCase
+from repo import create_farm, create_listing, upsert_restaurant
+
+
+class ApiTests(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.restaurant_id = upsert_restaurant("Harbor Bistro", "Downtown", None, None, "", "")
+        farm_id = create_farm("Farm A", "Port Town", None, None, "", "")
+        self.listing_id = create_listing(
+            farm_id, "Tilapia", 50.0, 3.0, 1, 0, 0, 0, 1, 0, 1, 1, ""
+        )
+        self.server = make_server(port=0)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def _call(self, method, path, body=None, headers=None):
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        request = Request(
+            self.base_url + path,
+            data=data,
+            method=method,
+            headers=headers or {},
+        )
+        try:
+            with urlopen(request) as response:
+                payload = response.read()
+                return response.status, json.loads(payload or b"null"), response.headers
+        except HTTPError as exc:
+            payload = exc.read()
+            return exc.code, json.loads(payload) if payload else None, exc.headers
+
+    def _create_request(self):
+        status, body, _ = self._call(
+            "POST",
+            "/requests",
+            {
+                "listing_id": self.listing_id,
+                "restaurant_id": self.restaurant_id,
+                "quantity_kg": 5.0,
+                "fish_condition": "Live",
+                "time_slot": "Today Morning",
+                "preferred_time_window": "Any morning",
+                "delivery_method": "Delivery",
+            },
+        )
+        self.assertEqual(status, 201)
+        return body["id"]
+
+    def test_listings_pagination_and_etag(self):
+        status, body, headers = self._call("GET", "/listings?limit=1")
+        self.assertEqual(status, 200)
+        self.assertEqual(len(body["items"]), 1)
+        self.assertEqual(body["next_offset"], 1)
+        etag = headers["ETag"]
+        status, body, _ = self._call(
+            "GET",
+            "/listings?limit=1",
+            headers={"If-None-Match": etag},
+        )
+        self.assertEqual(status, 304)
+        status, _, _ = self._call("GET", "/listings?limit=0")
+        self.assertEqual(status, 400)
+
+    def test_request_lifecycle_and_batch_transitions(self):
+        first = self._create_request()
+        second = self._create_request()
+        _, _, headers = self._call("GET", "/requests")
+        etag = headers["ETag"]
+
+        status, body, _ = self._call(
+            "POST",
+            f"/requests/{first}/status",
+            {"status": "Ready"},
+        )
+        self.assertEqual(status, 409)
+        status, body, _ = self._call(
+            "POST",
+            "/requests/status",
+            {"ids": [first, second], "status": "Accepted"},
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual([result["ok"] for result in body["results"]], [True, True])
+
+        status, body, _ = self._call(
+            "GET",
+            "/requests",
+            headers={"If-None-Match": etag},
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual({item["status"] for item in body["items"]}, {"Accepted"})
+        status, body, _ = self._call("GET", f"/requests?ids={first},{second}")
+        self.assertEqual([item["id"] for item in body["items"]], [first, second])
+        status, body, _ = self._call("GET", f"/requests/{first}/events")
+        self.assertEqual(len(body["items"]), 2)
+
+    def test_review_requires_completed_request(self):
+        request_id = self._create_request()
+        status, _, _ = self._call(
+            "POST",
+            "/reviews",
+            {"request_id": request_id, "stars": 5},
+        )
+        self.assertEqual(status, 409)
+        for next_status in ("Accepted", "Preparing", "Ready", "Completed"):
+            self._call("POST", f"/requests/{request_id}/status", {"status": next_status})
+        status, _, _ = self._call(
+            "POST",
+            "/reviews",
+            {"request_id": request_id, "stars": 5, "comment": "Great"},
+        )
+        self.assertEqual(status, 201)
+        status, body, _ = self._call("GET", f"/reviews?request_id={request_id}")
+        self.assertEqual(body["stars"], 5)
+
+    def test_metrics_endpoint(self):
+        self._create_request()
+        with urlopen(self.base_url + "/metrics") as response:
+            self.assertTrue(response.headers["Content-Type"].startswith("text/plain"))
+            text = response.read().decode("utf-8")
+        self.assertIn("# TYPE fishlink_requests_created_total counter", text)
+        self.assertIn('fishlink_repo_call_duration_seconds_count{function="create_request"}', text)
+
+    def test_malformed_bodies_get_json_errors(self):
+        status, body, _ = self._call("POST", "/reviews", [])
+        self.assertEqual(status, 400)
+        self.assertIn("error", body)
+        status, body, _ = self._call(
+            "POST",
+            "/requests/status",
+            {"ids": [[1]], "status": "Accepted"},
+        )
+        self.assertEqual(status, 400)
+
+    def test_new_requests_are_validated_like_the_order_form(self):
+        valid = {
+            "listing_id": self.listing_id,
+            "restaurant_id": self.restaurant_id,
+            "quantity_kg": 5.0,
+            "fish_condition": "Live",
+            "time_slot": "Today Morning",
+            "delivery_method": "Delivery",
+        }
+        for change in (
+            {"quantity_kg": -5},
+            {"quantity_kg": "5"},
+            {"time_slot": "garbage"},
+            {"time_slot": "Today Evening"},
+            {"fish_condition": "Smoked"},
+            {"delivery_method": "Pickup"},
+            {"restaurant_id": 999},
+            {"preferred_time_window": "15–16"},
+        ):
+            status, body, _ = self._call("POST", "/requests", {**valid, **change})
+            self.assertEqual(status, 400, change)
+            self.assertIn("error", body)
+
+        status, body, _ = self._call("POST", "/requests", {**valid, "quantity_kg": 50.0})
+        self.assertEqual(status, 201)
+        self.assertEqual(body["preferred_time_window"], "Any morning")
+        status, body, _ = self._call("POST", "/requests", valid)
+        self.assertEqual(status, 400)
+        self.assertIn("full", body["error"])
+
+        status, body, _ = self._call(
+            "POST",
+            "/requests/status",
+            {"ids": ["1"], "status": "Accepted"},
+        )
+        self.assertEqual(status, 400)
+
+    def test_unexpected_errors_return_500_json(self):
+        with mock.patch("api.events_since", side_effect=RuntimeError("boom")):
+            status, body, _ = self._call("GET", "/events")
+        self.assertEqual(status, 500)
+        self.assertEqual(body, {"error": "internal error"})
+
+    def test_unknown_route(self):
+        status, body, _ = self._call("GET", "/nope")
+        self.assertEqual(status, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
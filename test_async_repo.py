@@ -0,0 +1,39 @@
+import asyncio
+import unittest
+
+from async_repo import AsyncRepo
+from fixtures import DatabaseTestCase
+
+
+class AsyncRepoTests(DatabaseTestCase):
+    def test_async_calls_and_gather(self):
+        async def scenario():
+            async with AsyncRepo(max_workers=4) as arepo:
+                farm_ids = await asyncio.gather(
+                    *(
+                        arepo.create_farm(f"Farm {index}", "Port Town", None, None, "", "")
+                        for index in range(20)
+                    )
+                )
+                farms = await arepo.gather(
+                    *(("get_farm", farm_id) for farm_id in farm_ids)
+                )
+                listed = await arepo.list_farms()
+            return farm_ids, farms, listed
+
+        farm_ids, farms, listed = asyncio.run(scenario())
+        self.assertEqual(len(set(farm_ids)), 20)
+        self.assertEqual([farm.id for farm in farms], farm_ids)
+        self.assertEqual(len(listed), 20)
+
+    def test_unknown_function_is_rejected(self):
+        arepo = AsyncRepo(max_workers=1)
+        try:
+            with self.assertRaises(AttributeError):
+                arepo.drop_everything
+        finally:
+            arepo.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import glob
+import os
+import sqlite3
+import unittest
+from unittest import mock
+
+import backup
+from backup import (
+    BackupError,
+    backup_database,
+    check_integrity,
+    list_snapshots,
+    restore,
+    snapshot,
+    start_persistence,
+)
+from db import reset_memory_db
+from fixtures import DatabaseTestCase
+from repo import create_farm, get_farm, list_farms
+
+
+class BackupTests(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.backup_dir = os.path.join(self.tmp_dir, "snapshots")
+
+    def test_snapshot_retention_and_restore(self):
+        farm_id = create_farm("Farm A", "Port Town", None, None, "", "")
+        first = snapshot(self.backup_dir, keep=2, pages=1)
+        create_farm("Farm B", "Port Town", None, None, "", "")
+        snapshot(self.backup_dir, keep=2)
+        latest = snapshot(self.backup_dir, keep=2)
+
+        snapshots = list_snapshots(self.backup_dir)
+        self.assertEqual(len(snapshots), 2)
+        self.assertNotIn(first, snapshots)
+        self.assertEqual(snapshots[-1], latest)
+
+        create_farm("Farm C", "Port Town", None, None, "", "")
+        restore(snapshots[0])
+        self.assertEqual([farm["name"] for farm in list_farms()], ["Farm A", "Farm B"])
+        self.assertEqual(get_farm(farm_id)["name"], "Farm A")
+
+    def test_snapshot_directory_holds_only_database_files(self):
+        for _ in range(3):
+            snapshot(self.backup_dir, keep=1)
+        names = os.listdir(self.backup_dir)
+        self.assertEqual(len(names), 1)
+        self.assertTrue(names[0].endswith(".db"))
+
+    def test_integrity_check_rejects_corrupt_copy(self):
+        for index in range(200):
+            create_farm(f"Farm {index}", "Port Town", None, None, "", "")
+        path = snapshot(self.backup_dir)
+        with open(path, "r+b") as handle:
+            handle.seek(4096)
+            handle.write(b"\xff" * 4096)
+        with self.assertRaises(BackupError):
+            check_integrity(path)
+        with self.assertRaises(BackupError):
+            restore(path)
+        self.assertEqual(len(list_farms()), 200)
+
+    def test_memory_database_round_trips_through_disk(self):
+        persist_path = os.path.join(self.tmp_dir, "memory.db")
+        create_farm("Farm A", "Port Town", None, None, "", "")
+        backup_database(persist_path, quick_check=True)
+        reset_memory_db()
+
+        restore(persist_path)
+        self.assertEqual([farm["name"] for farm in list_farms()], ["Farm A"])
+
+
+    def test_restore_rejects_a_different_page_size(self):
+        create_farm("Farm A", "Port Town", None, None, "", "")
+        path = os.path.join(self.tmp_dir, "large-pages.db")
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA page_size = 8192")
+        conn.execute("CREATE TABLE farms (id INTEGER PRIMARY KEY)")
+        conn.commit()
+        conn.close()
+        with self.assertRaises(BackupError):
+            restore(path)
+        self.assertEqual(len(list_farms()), 1)
+
+    def test_persistence_sets_aside_an_unreadable_file(self):
+        persist_path = os.path.join(self.tmp_dir, "memory.db")
+        with open(persist_path, "wb") as handle:
+            handle.write(b"not a database" * 100)
+        with mock.patch.object(backup, "_persist_started", False), mock.patch(
+            "backup.atexit.register"
+        ):
+            self.assertTrue(start_persistence(persist_path, interval=3600))
+        self.assertFalse(os.path.exists(persist_path))
+        self.assertEqual(len(glob.glob(f"{persist_path}.rejected-*")), 1)
+        self.assertEqual(list_farms(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,26 +1,28 @@
 import glob
 import os
 import sqlite3
+import threading
+import time
 import unittest
 
-from db import ensure_latest_schema, get_conn
+from db import (
+    connect,
+    connect_readonly,
+    ensure_latest_schema,
+    get_conn,
+    init_db,
+    is_memory_db,
+    read_only,
+    remove_database,
+    reset_memory_db,
+)
+from fixtures import DatabaseTestCase
+from repo import create_farm, list_farms
 
 
-class DbSchemaTests(unittest.TestCase):
-    def setUp(self):
-        self.db_path = "fishlink_schema_test.db"
-        os.environ["FISHLINK_DB_PATH"] = self.db_path
-        for path in glob.glob(f"{self.db_path}.bak-*"):
-            os.remove(path)
-        if os.path.exists(self.db_path):
-            os.remove(self.db_path)
-
-    def tearDown(self):
-        for path in glob.glob(f"{self.db_path}.bak-*"):
-            os.remove(path)
-        if os.path.exists(self.db_path):
-            os.remove(self.db_path)
-        os.environ.pop("FISHLINK_DB_PATH", None)
+class DbSchemaTests(DatabaseTestCase):
+    on_disk = True
+    create_schema = False
 
     def test_ensure_latest_schema_recreates_old_db(self):
         with sqlite3.connect(self.db_path) as conn:
@@ -48,6 +50,119 @@ class DbSchemaTests(unittest.TestCase):
         self.assertIn("slot_today_morning", columns)
         self.assertIn("contact", farm_columns)
 
+    def test_ensure_latest_schema_does_not_write_to_current_db(self):
+        ensure_latest_schema()
+        writer = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            writer.execute("BEGIN IMMEDIATE")
+            started = time.perf_counter()
+            ensure_latest_schema()
+            self.assertLess(time.perf_counter() - started, 1)
+        finally:
+            writer.execute("ROLLBACK")
+            writer.close()
+
+
+class ReadOnlyConnectionTests(DatabaseTestCase):
+    on_disk = True
+
+    def test_readonly_connection_refuses_writes(self):
+        conn = connect_readonly()
+        try:
+            self.assertEqual(conn.execute("PRAGMA query_only").fetchone()[0], 1)
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute(
+                    "INSERT INTO farms (name, location_text) VALUES ('x', 'y')"
+                )
+        finally:
+            conn.close()
+
+    def test_open_reads_do_not_block_commits(self):
+        create_farm("Farm A", "Port Town", None, None, "", "")
+        conn = connect_readonly()
+        try:
+            cursor = conn.execute("SELECT id FROM farms")
+            cursor.fetchone()
+            started = time.perf_counter()
+            create_farm("Farm B", "Port Town", None, None, "", "")
+            self.assertLess(time.perf_counter() - started, 1)
+        finally:
+            conn.close()
+        self.assertEqual(len(list_farms()), 2)
+
+    def test_read_only_functions_use_cached_read_connection(self):
+        @read_only
+        def query_only_flag():
+            with get_conn() as conn:
+                return conn, conn.execute("PRAGMA query_only").fetchone()[0]
+
+        first, flag = query_only_flag()
+        second, _ = query_only_flag()
+        self.assertEqual(flag, 1)
+        self.assertIs(first, second)
+        with get_conn() as conn:
+            self.assertEqual(conn.execute("PRAGMA query_only").fetchone()[0], 0)
+
+    def test_reads_see_committed_writes_and_recreated_files(self):
+        self.assertEqual(list_farms(), [])
+        create_farm("Farm A", "Port Town", None, None, "", "")
+        self.assertEqual([farm.name for farm in list_farms()], ["Farm A"])
+
+        remove_database(self.db_path)
+        init_db()
+        self.assertEqual(list_farms(), [])
+
+
+class MemoryDatabaseTests(DatabaseTestCase):
+    def test_memory_paths_are_detected(self):
+        self.assertTrue(is_memory_db(self.db_path))
+        self.assertTrue(is_memory_db("file::memory:?cache=shared"))
+        self.assertTrue(is_memory_db("file:demo?mode=memory&cache=shared"))
+        self.assertFalse(is_memory_db("fishlink.db"))
+        self.assertFalse(is_memory_db("file:fishlink.db?mode=ro"))
+
+    def test_connections_share_data_and_reset_clears_it(self):
+        create_farm("Farm A", "Port Town", None, None, "", "")
+        self.assertEqual([farm.name for farm in list_farms()], ["Farm A"])
+        self.assertFalse(os.path.exists(self.db_name))
+
+        reset_memory_db()
+        init_db()
+        self.assertEqual(list_farms(), [])
+
+    def test_sessions_wait_for_an_open_write_transaction(self):
+        conn = connect()
+        conn.isolation_level = None
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("INSERT INTO farms (name, location_text) VALUES ('A', 'B')")
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(len(list_farms()))),
+            threading.Thread(
+                target=lambda: results.append(
+                    create_farm("Farm B", "Port Town", None, None, "", "")
+                )
+            ),
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+        self.assertEqual(results, [])
+        conn.execute("COMMIT")
+        conn.close()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 2)
+        self.assertEqual(len(list_farms()), 2)
+
+    def test_memory_read_connection_is_query_only(self):
+        conn = connect_readonly()
+        try:
+            self.assertEqual(conn.execute("PRAGMA query_only").fetchone()[0], 1)
+        finally:
+            conn.close()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,95 @@
+import csv
+import io
+import json
+import unittest
+
+from db import get_conn
+from export import export
+from fixtures import DatabaseTestCase
+from repo import (
+    archive_completed_requests,
+    create_farm,
+    create_listing,
+    create_request,
+    iter_export_rows,
+    update_request_status,
+)
+
+
+class ExportTests(DatabaseTestCase):
+    on_disk = True
+
+    def setUp(self):
+        super().setUp()
+        self.farm_a = create_farm("Farm A", "Port Town", None, None, "", "")
+        self.farm_b = create_farm("Farm B", "River Side", None, None, "", "")
+        self.request_ids = []
+        for farm_id in (self.farm_a, self.farm_a, self.farm_b):
+            listing_id = create_listing(
+                farm_id, "Tilapia", 50.0, 3.0, 1, 0, 0, 0, 1, 0, 1, 1, ""
+            )
+            self.request_ids.append(
+                create_request(
+                    listing_id, 1, 5.0, "", "Live", "Today Morning", "7–8", "Delivery", ""
+                )
+            )
+
+    def test_csv_export_with_filters(self):
+        first, second, _ = self.request_ids
+        update_request_status(second, "Accepted")
+        with get_conn() as conn:
+            conn.execute(
+                "UPDATE requests SET created_at = '2026-01-05 10:00:00' WHERE id = ?",
+                (first,),
+            )
+        output = io.StringIO()
+        count = export(
+            "requests",
+            output,
+            "csv",
+            farm_id=self.farm_a,
+            statuses=["Requested"],
+            since="2026-01-05",
+            until="2026-01-05",
+        )
+        rows = list(csv.reader(io.StringIO(output.getvalue())))
+        self.assertEqual(count, 1)
+        self.assertEqual(rows[0][:4], ["id", "listing_id", "restaurant_id", "status"])
+        self.assertEqual([row[0] for row in rows[1:]], [str(first)])
+
+    def test_jsonl_export_streams_in_batches_and_includes_archive(self):
+        first = self.request_ids[0]
+        for status in ("Accepted", "Preparing", "Ready", "Completed"):
+            update_request_status(first, status)
+        with get_conn() as conn:
+            conn.execute(
+                "UPDATE requests SET updated_at = '2020-01-01 00:00:00' WHERE id = ?",
+                (first,),
+            )
+        archive_completed_requests(30)
+
+        output = io.StringIO()
+        count = export("requests", output, "jsonl", include_archived=True, batch_size=1)
+        items = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(count, 3)
+        self.assertEqual([item["id"] for item in items], self.request_ids)
+        self.assertEqual(items[0]["status"], "Completed")
+
+        rows = iter_export_rows("listings", farm_id=self.farm_b)
+        self.assertIn("fish_name", next(rows))
+        self.assertEqual(len(list(rows)), 1)
+        with self.assertRaises(ValueError):
+            list(iter_export_rows("farms", statuses=["Completed"]))
+
+
+    def test_writers_commit_while_an_export_is_open(self):
+        rows = iter_export_rows("requests", batch_size=1)
+        next(rows)
+        next(rows)
+        farm_id = create_farm("Farm C", "Bay", None, None, "", "")
+        self.assertEqual(len(list(rows)), 2)
+        self.assertEqual(farm_id, self.farm_b + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
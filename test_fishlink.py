@@ -1,10 +1,15 @@
 import unittest
+from datetime import date
 
 from fishlink import (
     DELIVERY_RATE,
     FarmerListing,
     Request,
     RequestStatus,
+    can_transition,
+    haversine_km,
+    slot_date,
+    transition_many,
 )
 
 
@@ -53,6 +58,37 @@ class RequestModelTests(unittest.TestCase):
                 distance_km=2.0,
             )
 
+    def test_can_transition_accepts_values_and_members(self) -> None:
+        self.assertTrue(can_transition(RequestStatus.REQUESTED, RequestStatus.ACCEPTED))
+        self.assertTrue(can_transition("Ready", "Completed"))
+        self.assertFalse(can_transition("Requested", "Ready"))
+
+    def test_transition_many_reports_per_item_results(self) -> None:
+        requests = [
+            Request(request_id="req-5", listing=self.listing, distance_km=1.0),
+            Request(
+                request_id="req-6",
+                listing=self.listing,
+                distance_km=1.0,
+                status=RequestStatus.READY,
+            ),
+        ]
+        results = transition_many(requests, RequestStatus.ACCEPTED)
+        self.assertEqual([result.ok for result in results], [True, False])
+        self.assertEqual(results[1].request_id, "req-6")
+        self.assertIn("Ready -> Accepted", results[1].error)
+        self.assertEqual(requests[0].status, RequestStatus.ACCEPTED)
+        self.assertEqual(requests[1].status, RequestStatus.READY)
+
+    def test_haversine_km(self) -> None:
+        self.assertEqual(haversine_km(11.5, 104.9, 11.5, 104.9), 0.0)
+        self.assertAlmostEqual(haversine_km(0.0, 0.0, 0.0, 1.0), 111.19, places=1)
+
+    def test_slot_date_for_next_day_slots(self) -> None:
+        today = date(2026, 1, 31)
+        self.assertEqual(slot_date("Today Evening", today), today)
+        self.assertEqual(slot_date("Next-day Morning", today), date(2026, 2, 1))
+
 
 if __name__ == "__main__":
     unittest.main()
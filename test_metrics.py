@@ -0,0 +1,81 @@
+import os
+import unittest
+
+from fixtures import DatabaseTestCase
+from metrics import (
+    REPO_CALL_SECONDS,
+    REQUEST_TRANSITIONS,
+    REQUESTS_CREATED,
+    TRANSITION_SECONDS,
+    Histogram,
+    render_text,
+    write_textfile,
+)
+from repo import (
+    bulk_update_request_status,
+    create_farm,
+    create_listing,
+    create_request,
+    list_farms,
+    upsert_restaurant,
+)
+
+
+class MetricsTests(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.textfile_path = os.path.join(self.tmp_dir, "fishlink.prom")
+
+    def test_repo_calls_update_counters_and_histograms(self):
+        created = REQUESTS_CREATED.value()
+        accepted = REQUEST_TRANSITIONS.value("Accepted")
+        transitions = TRANSITION_SECONDS.count()
+        farm_calls = REPO_CALL_SECONDS.count("list_farms")
+
+        restaurant_id = upsert_restaurant("Harbor Bistro", "Downtown", None, None, "", "")
+        farm_id = create_farm("Farm A", "Port Town", None, None, "", "")
+        listing_id = create_listing(
+            farm_id, "Tilapia", 50.0, 3.0, 1, 0, 0, 0, 1, 0, 1, 1, ""
+        )
+        request_ids = [
+            create_request(
+                listing_id, restaurant_id, 5.0, "", "Live", "Today Morning", "7–8", "Delivery", ""
+            )
+            for _ in range(2)
+        ]
+        bulk_update_request_status(request_ids + [999], "Accepted")
+        list_farms()
+
+        self.assertEqual(REQUESTS_CREATED.value(), created + 2)
+        self.assertEqual(REQUEST_TRANSITIONS.value("Accepted"), accepted + 2)
+        self.assertEqual(TRANSITION_SECONDS.count(), transitions + 1)
+        self.assertEqual(REPO_CALL_SECONDS.count("list_farms"), farm_calls + 1)
+
+    def test_render_text_uses_prometheus_exposition_format(self):
+        histogram = Histogram(
+            "fishlink_test_seconds",
+            "Test histogram.",
+            ("name",),
+            buckets=(0.1, 1.0),
+        )
+        histogram.observe(0.05, 'a"b')
+        histogram.observe(0.5, 'a"b')
+        histogram.observe(5.0, 'a"b')
+
+        text = render_text()
+        self.assertIn("# TYPE fishlink_test_seconds histogram", text)
+        self.assertIn('fishlink_test_seconds_bucket{name="a\\"b",le="0.1"} 1', text)
+        self.assertIn('fishlink_test_seconds_bucket{name="a\\"b",le="1.0"} 2', text)
+        self.assertIn('fishlink_test_seconds_bucket{name="a\\"b",le="+Inf"} 3', text)
+        self.assertIn('fishlink_test_seconds_sum{name="a\\"b"} 5.55', text)
+        self.assertIn('fishlink_test_seconds_count{name="a\\"b"} 3', text)
+        self.assertIn("# TYPE fishlink_active_sessions gauge", text)
+        self.assertTrue(text.endswith("\n"))
+
+        write_textfile(self.textfile_path)
+        with open(self.textfile_path, encoding="utf-8") as handle:
+            self.assertIn("fishlink_requests_created_total", handle.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+from unittest import mock
+
+import quotes
+from fishlink import DELIVERY_RATE, haversine_km
+from quotes import (
+    RateCard,
+    invalidate_restaurant_quotes,
+    quote_farm_fees,
+    quote_listing_fees,
+)
+from rows import ListingCard, Restaurant
+
+
+def _listing(listing_id, farm_id, lat, lng):
+    return ListingCard(
+        listing_id,
+        farm_id,
+        f"Farm {farm_id}",
+        "",
+        lat,
+        lng,
+        "",
+        "",
+        "Tilapia",
+        10.0,
+        3.0,
+        ["Today Morning"],
+        ["Delivery"],
+        ["Live"],
+        "",
+    )
+
+
+class QuoteTests(unittest.TestCase):
+    def setUp(self):
+        self.restaurant = Restaurant(1, "Harbor Bistro", "", 11.5, 104.9, "", "")
+
+    def tearDown(self):
+        invalidate_restaurant_quotes(self.restaurant.id)
+
+    def test_default_rate_matches_flat_delivery_rate(self):
+        self.assertEqual(RateCard().fee(12.0), 12.0 * DELIVERY_RATE)
+
+    def test_tiers_minimum_and_farm_override(self):
+        card = RateCard(
+            base_rate=1.0,
+            minimum_fee=3.0,
+            tiers=((5.0, 2.0), (10.0, 1.5)),
+            farm_rates={"9": 0.5},
+        )
+        self.assertEqual(card.fee(1.0), 3.0)
+        self.assertEqual(card.fee(8.0), 5 * 2.0 + 3 * 1.5)
+        self.assertEqual(card.fee(12.0), 5 * 2.0 + 5 * 1.5 + 2 * 1.0)
+        self.assertEqual(card.fee(20.0, "9"), 10.0)
+
+    def test_listing_fees_quoted_per_farm_and_cached(self):
+        listings = [
+            _listing(1, "1", 11.6, 104.9),
+            _listing(2, "1", 11.6, 104.9),
+            _listing(3, "2", None, None),
+        ]
+        fees = quote_listing_fees(self.restaurant, listings)
+        expected = haversine_km(11.5, 104.9, 11.6, 104.9) * DELIVERY_RATE
+        self.assertEqual(set(fees), {1, 2})
+        self.assertAlmostEqual(fees[1], expected)
+        self.assertAlmostEqual(fees[2], expected)
+
+        moved_farm = [("1", 12.5, 104.9)]
+        self.assertAlmostEqual(
+            quote_farm_fees(self.restaurant, moved_farm)["1"], expected
+        )
+        self.assertNotAlmostEqual(
+            quote_farm_fees(self.restaurant, moved_farm, RateCard(version=2))["1"],
+            expected,
+        )
+        invalidate_restaurant_quotes(self.restaurant.id)
+        self.assertNotAlmostEqual(
+            quote_farm_fees(self.restaurant, moved_farm)["1"], expected
+        )
+
+    def test_changed_farm_rate_is_not_served_from_cache(self):
+        farms = [("1", 11.6, 104.9)]
+        distance_km = haversine_km(11.5, 104.9, 11.6, 104.9)
+        first = quote_farm_fees(
+            self.restaurant, farms, RateCard(farm_rates={"1": 1.0})
+        )
+        second = quote_farm_fees(
+            self.restaurant, farms, RateCard(farm_rates={"1": 2.0})
+        )
+        self.assertAlmostEqual(first["1"], distance_km)
+        self.assertAlmostEqual(second["1"], distance_km * 2.0)
+
+    def test_cache_keeps_most_recent_quotes(self):
+        farms = [(str(farm_id), 11.6, 104.9) for farm_id in range(5)]
+        with mock.patch.object(quotes, "QUOTE_CACHE_SIZE", 3):
+            quote_farm_fees(self.restaurant, farms)
+            quote_farm_fees(self.restaurant, farms[2:3])
+            quote_farm_fees(self.restaurant, [("9", 11.6, 104.9)])
+            self.assertEqual(
+                [key[1] for key in quotes._quote_cache], ["4", "2", "9"]
+            )
+
+    def test_no_quotes_without_restaurant_location(self):
+        restaurant = Restaurant(2, "No Map", "", None, None, "", "")
+        self.assertEqual(
+            quote_listing_fees(restaurant, [_listing(1, "1", 11.6, 104.9)]),
+            {},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+
+from fixtures import DatabaseTestCase
+from ranking import (
+    refresh_scores_for_farm,
+    refresh_scores_for_listing,
+    refresh_scores_for_restaurant,
+)
+from repo import (
+    create_farm,
+    create_listing,
+    create_review,
+    ranked_listing_ids,
+    upsert_restaurant,
+)
+
+
+class RankingTests(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.restaurant_id = upsert_restaurant(
+            "Harbor Bistro", "Downtown", 11.55, 104.92, "", ""
+        )
+
+    def _create_listing(self, farm_id, price_per_kg):
+        return create_listing(
+            farm_id,
+            "Tilapia",
+            50.0,
+            price_per_kg,
+            True,
+            False,
+            True,
+            False,
+            True,
+            True,
+            True,
+            True,
+            "",
+        )
+
+    def test_nearer_and_cheaper_listings_rank_first(self):
+        near_farm = create_farm("Near", "Phnom Penh", 11.56, 104.93, "", "")
+        far_farm = create_farm("Far", "Siem Reap", 13.36, 103.86, "", "")
+        far_listing = self._create_listing(far_farm, 4.0)
+        near_listing = self._create_listing(near_farm, 4.0)
+        cheap_near_listing = self._create_listing(near_farm, 2.0)
+
+        refresh_scores_for_restaurant(self.restaurant_id)
+        self.assertEqual(
+            ranked_listing_ids(self.restaurant_id),
+            [cheap_near_listing, near_listing, far_listing],
+        )
+
+    def test_scores_update_incrementally(self):
+        farm_a = create_farm("Farm A", "Phnom Penh", 11.56, 104.93, "", "")
+        farm_b = create_farm("Farm B", "Phnom Penh", 11.56, 104.93, "", "")
+        listing_a = self._create_listing(farm_a, 4.0)
+        refresh_scores_for_listing(listing_a)
+        listing_b = self._create_listing(farm_b, 4.0)
+        refresh_scores_for_listing(listing_b)
+        self.assertEqual(ranked_listing_ids(self.restaurant_id), [listing_a, listing_b])
+
+        create_review(1, farm_b, self.restaurant_id, 5, "")
+        refresh_scores_for_farm(farm_b)
+        self.assertEqual(ranked_listing_ids(self.restaurant_id), [listing_b, listing_a])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,39 +1,54 @@
-import os
+import importlib.util
+import threading
 import unittest
+from datetime import timedelta
 
-from db import init_db
+from db import get_conn, init_db
+from fishlink import local_today, slot_is_full
+from fixtures import DatabaseTestCase
 from repo import (
+    archive_completed_requests,
     avg_rating_for_farm,
+    bulk_update_request_status,
     create_farm,
     create_listing,
     create_request,
+    count_requests_since,
     create_review,
+    events_since,
+    get_archived_request,
     get_review_by_request,
     get_farm,
     get_listing,
     get_request,
     get_restaurant,
+    latest_request_id,
     list_farms,
+    list_listing_slot_usage,
     list_listings,
+    list_listings_columns,
+    list_daily_sales,
+    list_ready_deliveries,
+    list_request_events,
+    list_request_history,
     list_requests,
+    list_requests_columns,
+    list_requests_since,
+    list_restaurants,
+    list_slot_usage,
+    listings_version,
+    ranked_listing_ids,
+    refresh_sales_rollups,
+    rollover_listings,
+    save_listing_scores,
+    requests_version,
     update_request_status,
     upsert_restaurant,
+    wait_for_requests,
 )
 
 
-class RepoTests(unittest.TestCase):
-    def setUp(self):
-        self.db_path = "fishlink_test.db"
-        os.environ["FISHLINK_DB_PATH"] = self.db_path
-        if os.path.exists(self.db_path):
-            os.remove(self.db_path)
-        init_db()
-
-    def tearDown(self):
-        if os.path.exists(self.db_path):
-            os.remove(self.db_path)
-        os.environ.pop("FISHLINK_DB_PATH", None)
-
+class RepoTests(DatabaseTestCase):
     def test_restaurant_upsert_and_get(self):
         restaurant_id = upsert_restaurant(
             "Harbor Bistro",
@@ -44,7 +59,7 @@ class RepoTests(unittest.TestCase):
             "contact@harbor.test",
         )
         self.assertEqual(restaurant_id, 1)
-        restaurant = get_restaurant()
+        restaurant = get_restaurant(restaurant_id)
         self.assertEqual(restaurant["name"], "Harbor Bistro")
         self.assertEqual(restaurant["contact"], "contact@harbor.test")
 
@@ -113,6 +128,13 @@ class RepoTests(unittest.TestCase):
         self.assertEqual(len(filtered_by_farm), 1)
         filtered_by_status = list_requests(status="Accepted")
         self.assertEqual(len(filtered_by_status), 1)
+        filtered_by_statuses = list_requests(
+            farm_id=farm_id,
+            statuses=["Requested", "Accepted"],
+        )
+        self.assertEqual(len(filtered_by_statuses), 1)
+        self.assertEqual(list_requests(statuses=["Completed"]), [])
+        self.assertEqual(list_requests(statuses=[]), [])
 
         review_id = create_review(
             request_id,
@@ -127,6 +149,491 @@ class RepoTests(unittest.TestCase):
         review = get_review_by_request(request_id)
         self.assertEqual(review["stars"], 4)
 
+    def test_status_changes_are_logged_as_events(self):
+        farm_id = create_farm("Aiko Fisheries", "Port Town", None, None, "", "")
+        listing_id = create_listing(
+            farm_id,
+            "Mackerel",
+            50.0,
+            10.0,
+            True,
+            False,
+            False,
+            False,
+            True,
+            False,
+            False,
+            True,
+            "",
+        )
+        request_id = create_request(
+            listing_id,
+            1,
+            5.0,
+            "",
+            "Chilled",
+            "Today Morning",
+            "Any morning",
+            "Delivery",
+            "",
+        )
+        update_request_status(request_id, "Accepted")
+        update_request_status(request_id, "Preparing")
+
+        events = list_request_events(request_id)
+        self.assertEqual(
+            [(event["from_status"], event["to_status"]) for event in events],
+            [(None, "Requested"), ("Requested", "Accepted"), ("Accepted", "Preparing")],
+        )
+        seqs = [event["seq"] for event in events]
+        self.assertEqual(seqs, sorted(seqs))
+
+        newer = events_since(events[0]["seq"])
+        self.assertEqual([event["seq"] for event in newer], seqs[1:])
+        self.assertEqual(len(events_since(events[0]["seq"], limit=1)), 1)
+        self.assertEqual(events_since(seqs[-1]), [])
+
+    def _create_listing_for(self, farm_id):
+        return create_listing(
+            farm_id,
+            "Mackerel",
+            50.0,
+            10.0,
+            True,
+            False,
+            False,
+            False,
+            True,
+            False,
+            False,
+            True,
+            "",
+        )
+
+    def _create_request_for(self, listing_id):
+        return create_request(
+            listing_id,
+            1,
+            5.0,
+            "",
+            "Chilled",
+            "Today Morning",
+            "Any morning",
+            "Delivery",
+            "",
+        )
+
+    def test_requests_since_cursor_are_scoped_to_farm(self):
+        farm_a = create_farm("Farm A", "Port Town", None, None, "", "")
+        farm_b = create_farm("Farm B", "River Town", None, None, "", "")
+        listing_a = self._create_listing_for(farm_a)
+        listing_b = self._create_listing_for(farm_b)
+        first = self._create_request_for(listing_a)
+        self._create_request_for(listing_b)
+        second = self._create_request_for(listing_a)
+
+        self.assertEqual(count_requests_since(0), 3)
+        self.assertEqual(count_requests_since(0, farm_id=farm_a), 2)
+        self.assertEqual(count_requests_since(first, farm_id=farm_a), 1)
+        new = list_requests_since(first, farm_id=farm_a)
+        self.assertEqual([request["id"] for request in new], [second])
+        self.assertEqual(latest_request_id(farm_id=farm_a), second)
+        self.assertEqual(latest_request_id(farm_id=farm_b), second - 1)
+        self.assertEqual(latest_request_id(farm_id=999), 0)
+
+    def test_wait_for_requests_returns_on_new_request(self):
+        farm_id = create_farm("Farm A", "Port Town", None, None, "", "")
+        listing_id = self._create_listing_for(farm_id)
+        self.assertEqual(
+            wait_for_requests(0, farm_id=farm_id, timeout=0.05, poll_interval=0.01),
+            [],
+        )
+        timer = threading.Timer(0.05, self._create_request_for, (listing_id,))
+        timer.start()
+        try:
+            new = wait_for_requests(0, farm_id=farm_id, timeout=5.0, poll_interval=0.01)
+        finally:
+            timer.join()
+        self.assertEqual(len(new), 1)
+
+    def test_restaurants_are_separate_tenants(self):
+        first = upsert_restaurant("Harbor Bistro", "Downtown", None, None, "", "")
+        second = upsert_restaurant("River Grill", "Uptown", None, None, "", "")
+        self.assertNotEqual(first, second)
+        upsert_restaurant(
+            "Harbor Bistro & Bar",
+            "Downtown",
+            None,
+            None,
+            "",
+            "",
+            restaurant_id=first,
+        )
+        self.assertEqual(
+            [restaurant["name"] for restaurant in list_restaurants()],
+            ["Harbor Bistro & Bar", "River Grill"],
+        )
+
+        farm_id = create_farm("Farm A", "Port Town", None, None, "", "")
+        listing_id = self._create_listing_for(farm_id)
+        for restaurant_id in (first, second, second):
+            create_request(
+                listing_id,
+                restaurant_id,
+                5.0,
+                "",
+                "Chilled",
+                "Today Morning",
+                "Any morning",
+                "Delivery",
+                "",
+            )
+        self.assertEqual(len(list_requests(restaurant_id=first)), 1)
+        self.assertEqual(len(list_requests(restaurant_id=second)), 2)
+
+    def test_bulk_update_request_status(self):
+        farm_id = create_farm("Farm A", "Port Town", None, None, "", "")
+        listing_id = self._create_listing_for(farm_id)
+        first = self._create_request_for(listing_id)
+        second = self._create_request_for(listing_id)
+        update_request_status(second, "Accepted")
+
+        results = bulk_update_request_status([first, second, 999], "Accepted")
+        self.assertEqual(
+            [(result.request_id, result.ok) for result in results],
+            [(first, True), (second, False), (999, False)],
+        )
+        self.assertEqual(get_request(first)["status"], "Accepted")
+        self.assertEqual(
+            list_request_events(first)[-1]["from_status"],
+            "Requested",
+        )
+        self.assertEqual(len(list_request_events(second)), 2)
+
+    def test_concurrent_transitions_apply_once(self):
+        farm_id = create_farm("Farm A", "Port Town", None, None, "", "")
+        listing_id = self._create_listing_for(farm_id)
+        request_ids = [self._create_request_for(listing_id) for _ in range(200)]
+        for status in ("Accepted", "Preparing", "Ready"):
+            bulk_update_request_status(request_ids, status)
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.extend(
+                    bulk_update_request_status(request_ids, "Completed")
+                )
+            )
+            for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sum(result.ok for result in results), len(request_ids))
+        completed = [
+            event
+            for request_id in request_ids
+            for event in list_request_events(request_id)
+            if event["to_status"] == "Completed"
+        ]
+        self.assertEqual(len(completed), len(request_ids))
+        self.assertEqual({event["from_status"] for event in completed}, {"Ready"})
+
+    def test_columnar_reads_match_row_reads(self):
+        farm_id = create_farm("Farm A", "Port Town", None, None, "", "")
+        listing_id = self._create_listing_for(farm_id)
+        self._create_listing_for(farm_id)
+        for _ in range(5):
+            self._create_request_for(listing_id)
+
+        columns = list_requests_columns(farm_id=farm_id, batch_size=2)
+        rows = list_requests(farm_id=farm_id)
+        self.assertEqual(columns["id"], tuple(row["id"] for row in rows))
+        self.assertEqual(columns["quantity_kg"], (5.0,) * 5)
+        self.assertEqual(list_requests_columns(statuses=[])["id"], ())
+
+        listing_columns = list_listings_columns(batch_size=1)
+        self.assertEqual(len(listing_columns["id"]), 2)
+        self.assertEqual(listing_columns["fish_name"], ("Mackerel", "Mackerel"))
+
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "numpy not installed")
+    def test_columnar_reads_as_numpy(self):
+        farm_id = create_farm("Farm A", "Port Town", None, None, "", "")
+        self._create_request_for(self._create_listing_for(farm_id))
+        columns = list_requests_columns(as_numpy=True)
+        self.assertEqual(columns["quantity_kg"].sum(), 5.0)
+
+    def test_list_ready_deliveries(self):
+        restaurant_id = upsert_restaurant("Harbor Bistro", "Downtown", 11.5, 104.9, "", "")
+        farm_id = create_farm("Farm A", "Port Town", 11.6, 104.8, "", "")
+        listing_id = self._create_listing_for(farm_id)
+        ready = self._create_request_for(listing_id)
+        self._create_request_for(listing_id)
+        for status in ("Accepted", "Preparing", "Ready"):
+            update_request_status(ready, status)
+
+        deliveries = list_ready_deliveries(farm_id=farm_id)
+        self.assertEqual([stop.request_id for stop in deliveries], [ready])
+        self.assertEqual(deliveries[0].restaurant_id, restaurant_id)
+        self.assertEqual(deliveries[0].restaurant_lat, 11.5)
+        self.assertEqual(deliveries[0].farm_lat, 11.6)
+
+    def test_slot_usage_counts_committed_orders(self):
+        farm_id = create_farm("Farm A", "Port Town", None, None, "", "")
+        listing_id = self._create_listing_for(farm_id)
+        self._create_request_for(listing_id)
+        self._create_request_for(listing_id)
+        create_request(
+            listing_id,
+            1,
+            7.5,
+            "",
+            "Chilled",
+            "Next-day Evening",
+            "15–16",
+            "Pickup",
+            "",
+        )
+        today = local_today()
+        tomorrow = today + timedelta(days=1)
+
+        usage = list_slot_usage(farm_id, [today, tomorrow])
+        morning = usage[(today.isoformat(), "Morning", "Any morning")]
+        self.assertEqual((morning.committed_kg, morning.order_count), (10.0, 2))
+        evening = usage[(tomorrow.isoformat(), "Evening", "15–16")]
+        self.assertEqual((evening.committed_kg, evening.order_count), (7.5, 1))
+        self.assertEqual(
+            set(list_slot_usage(farm_id, [tomorrow])),
+            {(tomorrow.isoformat(), "Evening", "15–16")},
+        )
+
+        other_listing = self._create_listing_for(farm_id)
+        self.assertEqual(
+            list_listing_slot_usage(listing_id, [today, tomorrow]),
+            {
+                (today.isoformat(), "Morning"): 10.0,
+                (tomorrow.isoformat(), "Evening"): 7.5,
+            },
+        )
+        self.assertEqual(list_listing_slot_usage(other_listing, [today]), {})
+
+    def test_next_day_orders_count_against_the_slot_after_rollover(self):
+        farm_id = create_farm("Farm A", "Port Town", None, None, "", "")
+        listing_id = self._create_listing_for(farm_id)
+        create_request(
+            listing_id,
+            1,
+            50.0,
+            "",
+            "Chilled",
+            "Next-day Morning",
+            "7–8",
+            "Delivery",
+            "",
+        )
+        today = local_today()
+        tomorrow = today + timedelta(days=1)
+        self.assertFalse(
+            slot_is_full(
+                list_slot_usage(farm_id, [today]),
+                list_listing_slot_usage(listing_id, [today]),
+                today,
+                "Today Morning",
+                50.0,
+            )
+        )
+        # The next day, yesterday's "Next-day Morning" slot is "Today Morning".
+        self.assertTrue(
+            slot_is_full(
+                list_slot_usage(farm_id, [tomorrow]),
+                list_listing_slot_usage(listing_id, [tomorrow]),
+                tomorrow,
+                "Today Morning",
+                50.0,
+            )
+        )
+
+    def test_legacy_slot_labels_are_folded_into_periods(self):
+        farm_id = create_farm("Farm A", "Port Town", None, None, "", "")
+        today = local_today().isoformat()
+        with get_conn() as conn:
+            conn.execute("DROP TABLE slot_usage")
+            conn.execute(
+                """
+                CREATE TABLE slot_usage (
+                    farm_id INTEGER NOT NULL,
+                    slot_date TEXT NOT NULL,
+                    time_slot TEXT NOT NULL,
+                    time_window TEXT NOT NULL,
+                    committed_kg REAL NOT NULL DEFAULT 0,
+                    order_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (farm_id, slot_date, time_slot, time_window)
+                )
+                """
+            )
+            conn.executemany(
+                "INSERT INTO slot_usage VALUES (?, ?, ?, '7–8', ?, ?)",
+                [
+                    (farm_id, today, "Today Morning", 5.0, 1),
+                    (farm_id, today, "Next-day Morning", 7.0, 2),
+                    (farm_id, today, "Today Evening", 3.0, 1),
+                ],
+            )
+        init_db()
+
+        usage = list_slot_usage(farm_id, [today])
+        self.assertEqual(
+            set(usage),
+            {(today, "Morning", "7–8"), (today, "Evening", "7–8")},
+        )
+        morning = usage[(today, "Morning", "7–8")]
+        self.assertEqual((morning.committed_kg, morning.order_count), (12.0, 3))
+
+    def test_archive_moves_old_completed_requests(self):
+        farm_id = create_farm("Farm A", "Port Town", None, None, "", "")
+        listing_id = self._create_listing_for(farm_id)
+        old_done, new_done, active = (
+            self._create_request_for(listing_id) for _ in range(3)
+        )
+        for request_id in (old_done, new_done):
+            for status in ("Accepted", "Preparing", "Ready", "Completed"):
+                update_request_status(request_id, status)
+        review_id = create_review(old_done, farm_id, 1, 4, "ok")
+        with get_conn() as conn:
+            conn.execute(
+                """
+                UPDATE requests
+                SET updated_at = datetime('now', '-40 days')
+                WHERE id IN (?, ?)
+                """,
+                (old_done, active),
+            )
+        version = requests_version()
+
+        self.assertEqual(archive_completed_requests(30, batch_size=1), 1)
+        self.assertEqual(archive_completed_requests(30), 0)
+
+        self.assertGreater(requests_version(), version)
+        self.assertEqual(
+            {request.id for request in list_requests()},
+            {new_done, active},
+        )
+        self.assertIsNone(get_request(old_done))
+        archived = get_archived_request(old_done)
+        self.assertEqual(archived.status, "Completed")
+        self.assertEqual(get_review_by_request(old_done).id, review_id)
+        history = list_request_history(farm_id=farm_id)
+        self.assertEqual(
+            [request.id for request in history],
+            [new_done, active, old_done],
+        )
+        completed = list_request_history(status="Completed", limit=1, offset=1)
+        self.assertEqual([request.id for request in completed], [old_done])
+
+    def test_daily_sales_rollups(self):
+        farm_a = create_farm("Farm A", "Port Town", None, None, "", "")
+        farm_b = create_farm("Farm B", "River Side", None, None, "", "")
+        listing_a = self._create_listing_for(farm_a)
+        listing_b = self._create_listing_for(farm_b)
+        requests = [self._create_request_for(listing_a) for _ in range(3)]
+        requests.append(self._create_request_for(listing_b))
+        with get_conn() as conn:
+            for minutes, request_id in zip((30, 90, 60, 45), requests):
+                conn.execute(
+                    """
+                    UPDATE requests
+                    SET created_at = datetime('now', ?)
+                    WHERE id = ?
+                    """,
+                    (f"-{minutes} minutes", request_id),
+                )
+        for status in ("Accepted", "Preparing", "Ready"):
+            bulk_update_request_status(requests, status)
+        update_request_status(requests[0], "Completed")
+        with self.assertRaises(ValueError):
+            update_request_status(requests[0], "Completed")
+        bulk_update_request_status(requests[1:3], "Completed")
+        with get_conn() as conn:
+            conn.execute(
+                """
+                INSERT INTO request_events (request_id, from_status, to_status)
+                VALUES (?, 'Ready', 'Completed')
+                """,
+                (requests[3],),
+            )
+            conn.execute(
+                """
+                INSERT INTO request_events (request_id, from_status, to_status)
+                VALUES (?, 'Completed', 'Completed')
+                """,
+                (requests[3],),
+            )
+
+        today = local_today().isoformat()
+        farm_sales = list_daily_sales(farm_id=farm_a, since=today, until=today)
+        self.assertEqual(len(farm_sales), 1)
+        day = farm_sales[0]
+        self.assertEqual((day.farm_id, day.sale_date), (farm_a, today))
+        self.assertEqual((day.kg, day.revenue, day.order_count), (15.0, 150.0, 3))
+        self.assertEqual(day.median_lead_minutes, 60)
+        self.assertEqual(list_daily_sales(farm_id=farm_b), [])
+
+        self.assertEqual(refresh_sales_rollups(), 2)
+        self.assertEqual(refresh_sales_rollups(), 0)
+        total = list_daily_sales()[0]
+        self.assertIsNone(total.farm_id)
+        self.assertEqual(total.order_count, 4)
+        self.assertEqual(total.median_lead_minutes, 52.5)
+
+    def test_rollover_moves_next_day_slots_and_expires_stale_listings(self):
+        farm_id = create_farm("Farm A", "Port Town", None, None, "", "")
+        today = local_today()
+        current = self._create_listing_for(farm_id)
+        rolling = create_listing(
+            farm_id, "Carp", 20.0, 4.0, 1, 0, 0, 1, 1, 0, 1, 1, ""
+        )
+        finished = self._create_listing_for(farm_id)
+        abandoned = create_listing(
+            farm_id, "Carp", 20.0, 4.0, 0, 0, 1, 1, 1, 0, 1, 1, ""
+        )
+        with get_conn() as conn:
+            conn.executemany(
+                "UPDATE listings SET available_date = ? WHERE id = ?",
+                [
+                    ((today - timedelta(days=1)).isoformat(), rolling),
+                    ((today - timedelta(days=1)).isoformat(), finished),
+                    ((today - timedelta(days=3)).isoformat(), abandoned),
+                ],
+            )
+        request_id = self._create_request_for(finished)
+        save_listing_scores([(1, listing_id, 0.5) for listing_id in (current, finished)])
+        version = listings_version()
+
+        self.assertEqual(rollover_listings(today), {"expired": 2, "rolled": 1})
+        self.assertEqual(rollover_listings(today), {"expired": 0, "rolled": 0})
+
+        self.assertNotEqual(listings_version(), version)
+        self.assertEqual(
+            [listing.id for listing in list_listings()],
+            [current, rolling],
+        )
+        rolled = get_listing(rolling)
+        self.assertEqual(rolled.available_date, today.isoformat())
+        self.assertEqual(
+            (
+                rolled.slot_today_morning,
+                rolled.slot_today_evening,
+                rolled.slot_next_morning,
+                rolled.slot_next_evening,
+            ),
+            (0, 1, 0, 0),
+        )
+        self.assertIsNotNone(get_listing(finished).expired_at)
+        self.assertEqual(ranked_listing_ids(1), [current])
+        self.assertEqual([request.id for request in list_requests()], [request_id])
+
 
 if __name__ == "__main__":
     unittest.main()
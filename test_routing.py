@@ -0,0 +1,59 @@
+import random
+import unittest
+
+from routing import plan_delivery_runs, plan_route
+from rows import DeliveryStop
+
+
+def _stop(request_id, time_slot, farm_id, lat, lng):
+    return DeliveryStop(
+        request_id,
+        farm_id,
+        time_slot,
+        5.0,
+        "Tilapia",
+        request_id,
+        f"Restaurant {request_id}",
+        "",
+        "",
+        lat,
+        lng,
+        11.0,
+        104.0,
+    )
+
+
+class RoutingTests(unittest.TestCase):
+    def test_plan_route_visits_points_along_a_line_in_order(self):
+        stops = [(11.0, 104.4), (11.0, 104.1), (11.0, 104.3), (11.0, 104.2)]
+        order, distance_km = plan_route((11.0, 104.0), stops)
+        self.assertEqual(order, [1, 3, 2, 0])
+        self.assertAlmostEqual(distance_km, 43.7, places=0)
+
+    def test_two_opt_never_worse_than_nearest_neighbour(self):
+        rng = random.Random(3)
+        stops = [(rng.uniform(10, 12), rng.uniform(103, 105)) for _ in range(60)]
+        order, optimised = plan_route((11.0, 104.0), stops)
+        _, nearest_only = plan_route((11.0, 104.0), stops, max_passes=0)
+        self.assertEqual(sorted(order), list(range(60)))
+        self.assertLessEqual(optimised, nearest_only + 1e-9)
+
+    def test_runs_grouped_by_slot_and_farm(self):
+        deliveries = [
+            _stop(1, "Today Morning", 1, 11.0, 104.2),
+            _stop(2, "Today Evening", 1, 11.0, 104.1),
+            _stop(3, "Today Morning", 1, 11.0, 104.1),
+            _stop(4, "Today Morning", 1, None, None),
+        ]
+        runs = plan_delivery_runs(deliveries)
+        self.assertEqual(
+            [(run.time_slot, run.farm_id) for run in runs],
+            [("Today Evening", 1), ("Today Morning", 1)],
+        )
+        morning = runs[1]
+        self.assertEqual([stop.request_id for stop in morning.stops], [3, 1])
+        self.assertEqual([stop.request_id for stop in morning.unlocated], [4])
+
+
+if __name__ == "__main__":
+    unittest.main()
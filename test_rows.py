@@ -0,0 +1,56 @@
+import unittest
+
+from fishlink import FarmerListing, RequestStatus
+from rows import Farm, Listing, RequestRow
+
+
+class RowModelTests(unittest.TestCase):
+    def setUp(self):
+        self.farm = Farm(1, "Aiko Fisheries", "Port Town", None, None, "", "")
+
+    def test_rows_support_mapping_access(self):
+        self.assertEqual(self.farm["name"], "Aiko Fisheries")
+        self.assertEqual(self.farm.get("lat"), None)
+        self.assertEqual(self.farm.get("missing", "x"), "x")
+        self.assertIn("contact", self.farm)
+        self.assertEqual(dict(self.farm)["location_text"], "Port Town")
+        with self.assertRaises(KeyError):
+            self.farm["missing"]
+
+    def test_rows_are_slotted_and_frozen(self):
+        self.assertFalse(hasattr(self.farm, "__dict__"))
+        with self.assertRaises(AttributeError):
+            self.farm.name = "Other"
+
+    def test_conversion_to_domain_models(self):
+        listing = Listing(
+            7, "1", "Mackerel", 10.0, 2.5, 1, 0, 0, 0, 1, 0, 0, 1, None
+        )
+        farmer_listing = listing.to_farmer_listing(self.farm)
+        self.assertEqual(
+            farmer_listing,
+            FarmerListing("7", "Aiko Fisheries", "Port Town"),
+        )
+        row = RequestRow(
+            3,
+            7,
+            1,
+            "Ready",
+            5.0,
+            None,
+            "Chilled",
+            "Today Morning",
+            "Delivery",
+            None,
+            None,
+            None,
+            "2026-01-01 00:00:00",
+            "2026-01-01 00:00:00",
+        )
+        request = row.to_request(farmer_listing)
+        self.assertEqual(request.status, RequestStatus.READY)
+        self.assertEqual(request.distance_km, 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
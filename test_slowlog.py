@@ -0,0 +1,46 @@
+import os
+import unittest
+
+import slowlog
+from fixtures import DatabaseTestCase
+from metrics import SLOW_QUERIES
+from repo import avg_rating_for_farm, create_farm, list_farms
+
+
+class SlowQueryLogTests(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.log_path = os.path.join(self.tmp_dir, "slow-queries.log")
+
+    def tearDown(self):
+        slowlog.configure()
+
+    def _read_log(self):
+        with open(self.log_path, encoding="utf-8") as handle:
+            return handle.read()
+
+    def test_logs_slow_statements_with_function_and_plan(self):
+        farm_id = create_farm("Farm A", "Port Town", None, None, "", "")
+        slowlog.configure(threshold_ms=0, path=self.log_path)
+        logged = SLOW_QUERIES.value("avg_rating_for_farm")
+
+        avg_rating_for_farm(farm_id)
+
+        text = self._read_log()
+        self.assertIn("in avg_rating_for_farm", text)
+        self.assertIn(f"FROM reviews WHERE farm_id = {farm_id}", text)
+        self.assertIn("plan:", text)
+        self.assertIn("idx_reviews_farm", text)
+        self.assertEqual(SLOW_QUERIES.value("avg_rating_for_farm"), logged + 1)
+
+    def test_fast_statements_and_disabled_log_are_skipped(self):
+        slowlog.configure(threshold_ms=60_000, path=self.log_path)
+        list_farms()
+        self.assertEqual(self._read_log(), "")
+
+        slowlog.configure()
+        self.assertIsNone(slowlog.current_watch())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+
+from db import init_db, reset_memory_db
+from fixtures import DatabaseTestCase
+from repo import list_farms, list_listings, list_requests, requests_version
+from synthetic import STATUS_PATH, generate, scale_for
+
+
+class SyntheticDataTests(DatabaseTestCase):
+    def test_generate_scaled_dataset(self):
+        counts = scale_for(1000)
+        generate(**counts, seed=1)
+        self.assertEqual(len(list_farms()), counts["farms"])
+        self.assertEqual(len(list_listings()), counts["listings"])
+        requests = list_requests()
+        self.assertEqual(len(requests), 1000)
+        self.assertEqual({request.status for request in requests}, set(STATUS_PATH))
+        self.assertGreaterEqual(requests_version(), 1000)
+
+    def test_generate_is_seeded(self):
+        generate(**scale_for(200), seed=5)
+        first = [(request.listing_id, request.status) for request in list_requests()]
+        reset_memory_db()
+        init_db()
+        generate(**scale_for(200), seed=5)
+        second = [(request.listing_id, request.status) for request in list_requests()]
+        self.assertEqual(first, second)
+
+    def test_generate_requires_empty_database(self):
+        generate(**scale_for(100))
+        with self.assertRaises(ValueError):
+            generate(**scale_for(100))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+
+from fixtures import DatabaseTestCase
+from repo import create_farm, get_farm, list_farms
+from tracing import section, start_trace, stop_trace
+
+
+class TracingTests(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+
+    def tearDown(self):
+        stop_trace()
+
+    def test_trace_collects_queries_calls_and_sections(self):
+        farm_id = create_farm("Farm A", "Port Town", None, None, "", "")
+        trace = start_trace()
+        with section("screen"):
+            list_farms()
+            for _ in range(3):
+                get_farm(farm_id)
+        stop_trace()
+
+        summary = trace.summary()
+        self.assertEqual(summary["query_count"], 4)
+        calls = {name: count for name, count, _ in summary["calls_by_function"]}
+        self.assertEqual(calls, {"list_farms": 1, "get_farm": 3})
+        self.assertEqual([name for name, _ in summary["sections"]], ["screen"])
+        slowest_sql = [sql for _, sql, _ in summary["slowest_statements"]]
+        self.assertIn(
+            "SELECT id, name, location_text, lat, lng, maps_url, contact "
+            f"FROM farms WHERE id = {farm_id}",
+            slowest_sql,
+        )
+        self.assertGreater(summary["db_seconds"], 0.0)
+
+    def test_no_trace_by_default(self):
+        list_farms()
+        self.assertIsNone(stop_trace())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import sqlite3
+import threading
+import time
+import unittest
+
+import writer
+from db import get_conn
+from fixtures import DatabaseTestCase
+from metrics import GROUP_COMMIT_BATCH_SIZE
+from repo import create_farm, create_listing, get_request, list_requests
+from writer import GroupCommitWriter
+
+
+class GroupCommitWriterTests(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.farm_id = create_farm("Farm A", "Port Town", None, None, "", "")
+        self.listing_id = create_listing(
+            self.farm_id, "Tilapia", 50.0, 3.0, 1, 0, 0, 0, 1, 0, 1, 1, ""
+        )
+
+    def _request_args(self):
+        return (
+            self.listing_id, 1, 5.0, "", "Live", "Today Morning", "7–8", "Delivery", ""
+        )
+
+    def test_queued_writes_share_transactions(self):
+        batches = GROUP_COMMIT_BATCH_SIZE.count()
+        with GroupCommitWriter(max_delay=0.05) as writer:
+            futures = [
+                writer.submit("create_request", *self._request_args())
+                for _ in range(50)
+            ]
+            request_ids = [future.result() for future in futures]
+            results = writer.bulk_update_request_status(request_ids[:10], "Accepted")
+
+        self.assertEqual(len(set(request_ids)), 50)
+        self.assertEqual(len(list_requests()), 50)
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(get_request(request_ids[0]).status, "Accepted")
+        self.assertLess(GROUP_COMMIT_BATCH_SIZE.count() - batches, 50)
+
+    def test_single_caller_does_not_wait_for_the_batch_delay(self):
+        with GroupCommitWriter(max_delay=1.0) as writer:
+            started = time.perf_counter()
+            for _ in range(3):
+                writer.create_request(*self._request_args())
+            self.assertLess(time.perf_counter() - started, 1.0)
+
+    def test_failed_write_is_isolated_and_threads_get_results(self):
+        request_ids = []
+        with GroupCommitWriter() as writer:
+            bad = writer.submit("create_review", 1, self.farm_id, 1, 9, "")
+            threads = [
+                threading.Thread(
+                    target=lambda: request_ids.append(
+                        writer.create_request(*self._request_args())
+                    )
+                )
+                for _ in range(20)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            with self.assertRaises(sqlite3.IntegrityError):
+                bad.result()
+            with self.assertRaises(ValueError):
+                writer.submit("list_requests")
+        self.assertEqual(sorted(request_ids), [row.id for row in list_requests()][::-1])
+
+    def _score(self, restaurant_id, listing_id):
+        with get_conn() as conn:
+            row = conn.execute(
+                """
+                SELECT score FROM listing_scores
+                WHERE restaurant_id = ? AND listing_id = ?
+                """,
+                (restaurant_id, listing_id),
+            ).fetchone()
+        return None if row is None else row["score"]
+
+    def test_writes_refresh_listing_scores(self):
+        restaurant_id = writer.upsert_restaurant("Bistro", "Downtown", None, None, "", "")
+        before = self._score(restaurant_id, self.listing_id)
+        self.assertIsNotNone(before)
+
+        listing_id = writer.create_listing(
+            self.farm_id, "Catfish", 20.0, 2.0, 1, 0, 0, 0, 1, 0, 1, 1, ""
+        )
+        self.assertIsNotNone(self._score(restaurant_id, listing_id))
+
+        request_id = writer.create_request(*self._request_args())
+        writer.create_review(
+            request_id=request_id,
+            farm_id=self.farm_id,
+            restaurant_id=restaurant_id,
+            stars=5,
+            comment="",
+        )
+        self.assertGreater(self._score(restaurant_id, self.listing_id), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
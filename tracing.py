@@ -0,0 +1,144 @@
+import functools
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from metrics import DB_LOCKED_ERRORS, REPO_CALL_SECONDS
+from slowlog import current_watch
+
+
+_state = threading.local()
+
+
+class Trace:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.calls = []
+        self.statements = []
+        self.sections = []
+        self._stack = []
+        self._open_statement = None
+
+    def enter(self, name):
+        self._close_statement()
+        self._stack.append((name, time.perf_counter()))
+
+    def exit(self):
+        self._close_statement()
+        name, started = self._stack.pop()
+        self.calls.append((name, time.perf_counter() - started, len(self._stack)))
+
+    def on_statement(self, sql):
+        now = time.perf_counter()
+        self._close_statement(now)
+        name = self._stack[-1][0] if self._stack else "<direct>"
+        self._open_statement = [name, " ".join(sql.split()), now]
+
+    def _close_statement(self, now=None):
+        if self._open_statement is None:
+            return
+        name, sql, started = self._open_statement
+        self._open_statement = None
+        self.statements.append((name, sql, (now or time.perf_counter()) - started))
+
+    @contextmanager
+    def section(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sections.append((name, time.perf_counter() - started))
+
+    def summary(self, slowest=5):
+        self._close_statement()
+        by_function = defaultdict(lambda: [0, 0.0])
+        for name, seconds, _ in self.calls:
+            by_function[name][0] += 1
+            by_function[name][1] += seconds
+        return {
+            "query_count": len(self.statements),
+            "db_seconds": sum(
+                seconds for _, seconds, depth in self.calls if depth == 0
+            ),
+            "total_seconds": time.perf_counter() - self.started,
+            "slowest_statements": sorted(
+                self.statements,
+                key=lambda statement: statement[2],
+                reverse=True,
+            )[:slowest],
+            "calls_by_function": sorted(
+                ((name, count, seconds) for name, (count, seconds) in by_function.items()),
+                key=lambda item: item[2],
+                reverse=True,
+            ),
+            "sections": list(self.sections),
+        }
+
+
+def current_trace():
+    return getattr(_state, "trace", None)
+
+
+def start_trace():
+    trace = Trace()
+    _state.trace = trace
+    return trace
+
+
+def stop_trace():
+    trace = current_trace()
+    _state.trace = None
+    return trace
+
+
+@contextmanager
+def section(name):
+    trace = current_trace()
+    if trace is None:
+        yield
+        return
+    with trace.section(name):
+        yield
+
+
+def statement_callback():
+    trace = current_trace()
+    watch = current_watch()
+    if watch is None:
+        return trace.on_statement if trace is not None else None
+    if trace is None:
+        return watch.on_statement
+
+    def callback(sql):
+        trace.on_statement(sql)
+        watch.on_statement(sql)
+
+    return callback
+
+
+def traced(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        trace = current_trace()
+        watch = current_watch()
+        if trace is not None:
+            trace.enter(func.__name__)
+        if watch is not None:
+            watch.enter(func.__name__)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except sqlite3.OperationalError as exc:
+            if "locked" in str(exc):
+                DB_LOCKED_ERRORS.inc(1, func.__name__)
+            raise
+        finally:
+            REPO_CALL_SECONDS.observe(time.perf_counter() - started, func.__name__)
+            if watch is not None:
+                watch.exit()
+            if trace is not None:
+                trace.exit()
+
+    return wrapper
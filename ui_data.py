@@ -0,0 +1,66 @@
+from repo import list_farms, list_listings
+from rows import ListingCard
+
+
+def listing_time_slots(listing):
+    time_slots = []
+    if listing.slot_today_morning:
+        time_slots.append("Today Morning")
+    if listing.slot_today_evening:
+        time_slots.append("Today Evening")
+    if listing.slot_next_morning:
+        time_slots.append("Next-day Morning")
+    if listing.slot_next_evening:
+        time_slots.append("Next-day Evening")
+    return time_slots
+
+
+def listing_delivery_methods(listing):
+    delivery_methods = []
+    if listing.allow_delivery:
+        delivery_methods.append("Delivery")
+    if listing.allow_pickup:
+        delivery_methods.append("Pickup")
+    return delivery_methods
+
+
+def listing_fish_conditions(listing):
+    conditions = []
+    if listing.allow_live:
+        conditions.append("Live")
+    if listing.allow_fresh:
+        conditions.append("Chilled")
+    return conditions
+
+
+def build_listing_cards(listing_conditions=None):
+    listing_conditions = listing_conditions or {}
+    farms = {str(farm.id): farm for farm in list_farms()}
+    listings = []
+    for listing in list_listings():
+        farm = farms.get(str(listing.farm_id))
+        if not farm:
+            continue
+        conditions = listing_conditions.get(listing.id)
+        if conditions is None:
+            conditions = listing_fish_conditions(listing)
+        listings.append(
+            ListingCard(
+                id=listing.id,
+                farm_id=listing.farm_id,
+                name=farm.name,
+                farm_location_text=farm.location_text,
+                farm_lat=farm.lat,
+                farm_lng=farm.lng,
+                farm_maps_url=farm.maps_url,
+                farm_contact=farm.contact or "",
+                fish_name=listing.fish_name,
+                quantity_kg=listing.quantity_kg,
+                price_per_kg=listing.price_per_kg,
+                time_slots=listing_time_slots(listing),
+                delivery_methods=listing_delivery_methods(listing),
+                fish_conditions=conditions,
+                approx_time=listing.approx_time or "",
+            )
+        )
+    return listings
@@ -0,0 +1,211 @@
+import inspect
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+import repo
+from db import pin_thread_connection
+from metrics import GROUP_COMMIT_BATCH_SIZE
+from ranking import (
+    refresh_scores_for_farm,
+    refresh_scores_for_listing,
+    refresh_scores_for_restaurant,
+)
+
+
+GROUP_COMMIT_ENV_VAR = "FISHLINK_GROUP_COMMIT"
+DEFAULT_MAX_BATCH = 256
+DEFAULT_MAX_DELAY_SECONDS = 0.002
+WRITE_FUNCTIONS = (
+    "bulk_update_request_status",
+    "create_farm",
+    "create_listing",
+    "create_request",
+    "create_review",
+    "save_listing_scores",
+    "update_request_status",
+    "upsert_restaurant",
+)
+
+_STOP = object()
+
+
+class GroupCommitConnection(sqlite3.Connection):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class GroupCommitWriter:
+    def __init__(
+        self,
+        max_batch=DEFAULT_MAX_BATCH,
+        max_delay=DEFAULT_MAX_DELAY_SECONDS,
+    ):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._last_batch_size = 1
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run,
+            name="fishlink-writer",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def submit(self, name, *args, **kwargs):
+        if name not in WRITE_FUNCTIONS:
+            raise ValueError(f"{name} is not a group-commit write")
+        if self._closed:
+            raise RuntimeError("writer is closed")
+        future = Future()
+        self._queue.put((future, getattr(repo, name), args, kwargs))
+        return future
+
+    def call(self, name, *args, **kwargs):
+        return self.submit(name, *args, **kwargs).result()
+
+    def __getattr__(self, name):
+        if name not in WRITE_FUNCTIONS:
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+
+        call.__name__ = name
+        return call
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _run(self):
+        conn = pin_thread_connection(factory=GroupCommitConnection)
+        conn.isolation_level = None
+        try:
+            stopping = False
+            while not stopping:
+                batch, stopping = self._next_batch()
+                if batch:
+                    self._commit(conn, batch)
+        finally:
+            conn.close()
+
+    def _next_batch(self):
+        item = self._queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            # Only wait for as many writes as the last batch had; callers
+            # blocked on their results cannot add more until this one commits.
+            remaining = deadline - time.monotonic()
+            try:
+                item = (
+                    self._queue.get(timeout=remaining)
+                    if remaining > 0 and len(batch) < self._last_batch_size
+                    else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        self._last_batch_size = len(batch)
+        return batch, False
+
+    def _commit(self, conn, batch):
+        done = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for future, func, args, kwargs in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT write")
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as exc:
+                    conn.execute("ROLLBACK TO write")
+                    conn.execute("RELEASE write")
+                    future.set_exception(exc)
+                else:
+                    conn.execute("RELEASE write")
+                    done.append((future, result))
+            conn.execute("COMMIT")
+        except sqlite3.Error as exc:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for future, _, _, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        GROUP_COMMIT_BATCH_SIZE.observe(len(batch))
+        for future, result in done:
+            future.set_result(result)
+
+
+_default_writer = None
+_default_lock = threading.Lock()
+
+
+def default_writer():
+    global _default_writer
+    if not os.environ.get(GROUP_COMMIT_ENV_VAR):
+        return None
+    with _default_lock:
+        if _default_writer is None:
+            _default_writer = GroupCommitWriter()
+    return _default_writer
+
+
+def _write_function(name, after=None):
+    signature = inspect.signature(getattr(repo, name))
+
+    def call(*args, **kwargs):
+        writer = default_writer()
+        if writer is None:
+            result = getattr(repo, name)(*args, **kwargs)
+        else:
+            result = writer.call(name, *args, **kwargs)
+        if after is not None:
+            after(result, signature.bind(*args, **kwargs).arguments)
+        return result
+
+    call.__name__ = name
+    return call
+
+
+def _refresh_listing_scores(listing_id, arguments):
+    refresh_scores_for_listing(listing_id)
+
+
+def _refresh_restaurant_scores(restaurant_id, arguments):
+    refresh_scores_for_restaurant(restaurant_id)
+
+
+def _refresh_farm_scores(review_id, arguments):
+    refresh_scores_for_farm(arguments["farm_id"])
+
+
+bulk_update_request_status = _write_function("bulk_update_request_status")
+create_listing = _write_function("create_listing", _refresh_listing_scores)
+create_request = _write_function("create_request")
+create_review = _write_function("create_review", _refresh_farm_scores)
+update_request_status = _write_function("update_request_status")
+upsert_restaurant = _write_function("upsert_restaurant", _refresh_restaurant_scores)